@@ -44,16 +44,11 @@ class BasicFusion(BaseTestCase):
             op1_alias += '_1'
             op2_alias += '_2'
 
-        op1_model, op2_model, block_model, op1_shapes, op2_shapes, block_shapes = \
-            generate_models_for_testcase(op1, op2, self.input_shape, self.config, self.implement)
-        testcase[op1_alias] = {
-            'model': op1_model,
-            'shapes': op1_shapes,
-        }
-        testcase[op2_alias] = {
-            'model': op2_model,
-            'shapes': op2_shapes,
-        }
+        # the single-op models are shared by all testcases with the same op and input shape
+        block_model, block_shapes, op1_output_shape = \
+            generate_block_model(op1, op2, self.input_shape, self.config, self.implement)
+        testcase[op1_alias] = self.single_op_models.get(op1, self.input_shape, self.config, self.implement)
+        testcase[op2_alias] = self.single_op_models.get(op2, op1_output_shape, self.config, self.implement)
         testcase['block'] = {
             'model': block_model,
             'shapes': block_shapes,
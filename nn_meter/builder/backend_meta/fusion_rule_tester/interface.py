@@ -40,19 +40,26 @@ class BaseTestCase:
                         'shapes': shapes
                     }
                 except:
-                    from .utils import generate_single_model
-                    model, shapes = generate_single_model(op, self.input_shape, self.config, self.implement)
-                    testcase[op] = {
-                        'model': model,
-                        'shapes': shapes
-                    }
+                    testcase[op] = self.single_op_models.get(op, self.input_shape, self.config, self.implement)
         return testcase
 
+    @property
+    def single_op_models(self):
+        """ the cache of the single-op models shared by testcases, given by the `single_op_models` argument. Defaults to a cache
+        private to the testcase.
+        """
+        if self._kwargs.get('single_op_models') is None:
+            from .utils import SingleOpModelCache
+            self._kwargs['single_op_models'] = SingleOpModelCache(self.workspace_path)
+        return self._kwargs['single_op_models']
+
     def save_testcase(self):
         from .utils import save_model
         testcase = self.generate_testcase()
 
         for op, model in testcase.items():
+            if isinstance(model['model'], str): # the shared single-op model has been saved
+                continue
             model_path = os.path.join(self.workspace_path, self.name + '_' + op)
             model_path = save_model(model, model_path, self.implement)
             testcase[op]['model'] = model_path
@@ -93,17 +100,23 @@ class BaseTestCase:
         pass
 
 
-def generate_testcases():
+def generate_testcases(workers = None):
     """generate testcases and save the testcase models and testcase json file in the workspace
     Users could edit the configurations of testcases in <workspace-path>/configs/ruletest_config.yaml.
     The config will take effect after the the config file is saved and closed.
+
+    @params:
+
+    workers (int): the number of processes to generate the testcase models in parallel. Defaults to None, i.e., the
+        `GENERATE_WORKERS` in the ruletest configs, and the testcases are generated in the current process if it is 0.
     """
     from nn_meter.builder import builder_config
     config = builder_config.get_module('ruletest')
+    workers = workers if workers is not None else (config.get('GENERATE_WORKERS') or 0)
 
     from .test_fusion_rule import FusionRuleTester
     tester = FusionRuleTester()
-    testcases = tester.generate()
+    testcases = tester.generate(workers=workers)
 
     # save information to json file
     workspace_path = config['WORKSPACE']
@@ -124,7 +137,7 @@ def detect_fusion_rule(profiled_testcases):
     """
     if isinstance(profiled_testcases, str):
         with open(profiled_testcases, 'r') as fp:
-            profiled_testcases = read_profiled_results(json.load(fp))
+            profiled_testcases = read_profiled_results(json.load(fp), inplace=True)
 
     from .test_fusion_rule import FusionRuleTester
     tester = FusionRuleTester()
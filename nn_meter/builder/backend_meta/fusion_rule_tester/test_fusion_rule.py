@@ -1,14 +1,49 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import os
+import logging
+import multiprocessing
 import networkx as nx
+from .utils import SingleOpModelCache
 from .generate_testcase import generate_testcases
 from nn_meter.builder import builder_config
-
-config = builder_config.get_module('ruletest')
+from nn_meter.builder.utils import init_generate_worker
+logging = logging.getLogger("nn-Meter")
+
+_worker = {}
+
+
+def _init_worker(settings, shared_models):
+    # the builder config is not initialized in the spawned workers
+    for module, value in settings.items():
+        builder_config.set_module(value, module)
+    config = builder_config.get_module('ruletest')
+    init_generate_worker(builder_config.get('IMPLEMENT', 'ruletest'))
+    _worker['testcases'] = generate_testcases()
+    _worker['single_op_models'] = SingleOpModelCache(os.path.join(config['WORKSPACE'], 'testcases'), shared_models)
+
+
+def _generate_testcase(name, testcases = None, single_op_models = None):
+    """ generate and save the models of the testcase `name`, and return `(name, testcase, error)`. The testcase classes and the
+    single-op model cache default to those of the worker.
+    """
+    config = builder_config.get_module('ruletest')
+    testcases = _worker['testcases'] if testcases is None else testcases
+    single_op_models = _worker['single_op_models'] if single_op_models is None else single_op_models
+    try:
+        return name, testcases[name](config, single_op_models=single_op_models).save_testcase(), None
+    except Exception as e:
+        return name, None, str(e)
+    finally:
+        if builder_config.get('IMPLEMENT', 'ruletest') == 'tensorflow':
+            # release the graphs of the testcase, so that a long-lived worker does not grow with the generated testcases
+            import tensorflow as tf
+            tf.keras.backend.clear_session()
 
 
 class FusionRuleTester:
     def __init__(self):
+        self.config = builder_config.get_module('ruletest')
         self._testcases = generate_testcases()
 
     def _build_dep_dag(self):
@@ -21,13 +56,45 @@ class FusionRuleTester:
 
         self._dag = list(nx.topological_sort(dag))
 
-    def generate(self):
+    def generate(self, workers = 0):
+        """ generate and save the models of all testcases, and return the information of the testcases. If `workers > 0`, the
+        testcases are generated in a process pool, where each worker imports the framework once. The results are collected by
+        the calling process, and the failed testcases are logged in `<workspace>/results/generate_error.log`.
+        """
         testcases = {}
-
-        for name, cls in self._testcases.items():
-            testcases[name] = cls(config).save_testcase()
-
-        return testcases
+        error_save_path = os.path.join(self.config['WORKSPACE'], 'results', 'generate_error.log')
+        os.makedirs(os.path.dirname(error_save_path), exist_ok=True)
+
+        if workers > 0 and len(self._testcases) > 1:
+            # spawn the workers, as forking a process with the framework imported is unsafe. The single-op models are shared
+            # among the workers by a manager.
+            manager = multiprocessing.get_context("spawn").Manager()
+            shared_models = manager.dict()
+            single_op_models = SingleOpModelCache(os.path.join(self.config['WORKSPACE'], 'testcases'), shared_models)
+            pool = multiprocessing.get_context("spawn").Pool(
+                workers, initializer=_init_worker, initargs=(builder_config.get_settings(), shared_models))
+            results = pool.imap_unordered(_generate_testcase, self._testcases)
+        else:
+            manager, pool = None, None
+            single_op_models = SingleOpModelCache(os.path.join(self.config['WORKSPACE'], 'testcases'))
+            results = (_generate_testcase(name, self._testcases, single_op_models) for name in self._testcases)
+        try:
+            for name, testcase, error in results:
+                if error is None:
+                    testcases[name] = testcase
+                else:
+                    logging.info(f"Failed to generate testcase {name}.")
+                    open(error_save_path, 'a').write(f"{name}: {error}\n")
+            logging.info(f"Generated {len(single_op_models)} single-op models shared by "
+                         f"{len(testcases)} testcases.")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+                manager.shutdown()
+
+        # keep the order of the testcases in the config
+        return {name: testcases[name] for name in self._testcases if name in testcases}
 
     def analyze(self, profile_results):
         self._build_dep_dag()
@@ -46,10 +113,10 @@ class FusionRuleTester:
                     obey = False
 
             if obey:
-                rule = rule_cls(config)
+                rule = rule_cls(self.config)
                 rule.load_latency(profile_results[name])
                 obey = rule.test()
-                if config['DETAIL']:
+                if self.config['DETAIL']:
                     latency = {key: str(value) for key, value in rule.latency.items()}
                     result[name]['latency'] = latency
 
@@ -2,9 +2,15 @@
 # Licensed under the MIT license.
 import os
 import sys
+import json
+import time
+import zlib
 import yaml
+import logging
 import importlib
 
+logging = logging.getLogger("nn-Meter")
+
 __BUILTIN_OPERATORS__ = {
     # builtin_name: module_name
     "conv": "Conv",
@@ -121,6 +127,28 @@ def generate_models_for_testcase(op1, op2, input_shape, config, implement):
     return op1_model, op2_model, block_model, op1_shapes, op2_shapes, block_shapes
 
 
+def generate_block_model(op1, op2, input_shape, config, implement):
+    """ build the model of the block `op1` -> `op2`, and return the model, its input shapes and the output shape of `op1`
+    """
+    if implement == 'tensorflow':
+        from .build_tf_models import TwoOpModel
+        from nn_meter.builder.nn_modules.tf_networks.utils import get_inputs_by_shapes
+    elif implement == 'torch':
+        from .build_torch_models import TwoOpModel
+        from nn_meter.builder.nn_modules.torch_networks.utils import get_inputs_by_shapes
+    else:
+        raise NotImplementedError('You must choose one implementation of kernel from "tensorflow" or "pytorch"')
+
+    layer1, op1_output_shape, op1_is_two_inputs = get_operator_by_name(op1, input_shape, config, implement)
+    layer2, _, op2_is_two_inputs = get_operator_by_name(op2, op1_output_shape, config, implement)
+
+    block_model = TwoOpModel(layer1, layer2, op1_is_two_inputs, op2_is_two_inputs)
+    block_shapes = [input_shape] * (1 + op1_is_two_inputs) + [op1_output_shape] * op2_is_two_inputs
+    block_model(get_inputs_by_shapes(block_shapes))
+
+    return block_model, block_shapes, op1_output_shape
+
+
 def generate_single_model(op, input_shape, config, implement):
     if implement == 'tensorflow':
         from .build_tf_models import SingleOpModel
@@ -140,6 +168,85 @@ def generate_single_model(op, input_shape, config, implement):
     return model, shapes
 
 
+def _is_generating(marker):
+    """ whether the process of the in-progress marker `"generating by <pid>"` is still alive. The processes sharing the models
+    run on the same host. On Windows, where `os.kill` could not check a process, the process is assumed to be alive.
+    """
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(int(marker.rsplit(' ', 1)[-1]), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SingleOpModelCache:
+    """ the single-op models shared by testcases. A single-op model is generated and saved once for each (op, input shape, config,
+    implement) in `workspace_path`, and all testcases with the op refer to the same model file, so that the model is profiled
+    once by `profile_models`. If `shared` is given, e.g., a dict of `multiprocessing.Manager`, the models are shared among the
+    processes generating testcases in parallel. Each model is generated by the first process requiring it, which marks the model
+    as in progress in `shared`, and only the processes requiring the same model wait for it. If the marking process dies, one
+    of the waiting processes takes over the model.
+    """
+    def __init__(self, workspace_path, shared = None, poll_interval = 0.1):
+        self.workspace_path = workspace_path
+        self._models = {}
+        self._shared = shared
+        self._poll_interval = poll_interval
+
+    def _generate(self, key, op, input_shape, config, implement):
+        model, shapes = generate_single_model(op, input_shape, config, implement)
+        model_name = f"SingleOp_{op}_{'x'.join(map(str, input_shape))}_{zlib.crc32(key.encode()):08x}"
+        model_path = save_model({'model': model, 'shapes': shapes}, os.path.join(self.workspace_path, model_name), implement)
+        return {'model': model_path, 'shapes': [list(shape) for shape in shapes]}
+
+    def _get_shared(self, key, op, input_shape, config, implement):
+        marker = f"generating by {os.getpid()}"
+        while True:
+            # `setdefault` of the shared dict is atomic, thus only one process gets its own marker and generates the model
+            model = self._shared.setdefault(key, marker)
+            if model == marker:
+                try:
+                    model = self._generate(key, op, input_shape, config, implement)
+                except:
+                    # let the waiting processes generate the model themselves
+                    del self._shared[key]
+                    raise
+                self._shared[key] = model
+                return model
+            if isinstance(model, dict):
+                return model
+            if not _is_generating(model):
+                # the shared dict has no compare-and-set, thus the waiting processes race for a reclaim token of the stale marker
+                # by `setdefault`, and only the winner replaces the marker by its own
+                if self._shared.setdefault(f"{key} reclaimed from {model}", marker) == marker:
+                    logging.warning(f"The process {model[len('generating by '):]} generating a single-op model has died. "
+                                    f"Process {os.getpid()} takes over the model.")
+                    self._shared[key] = marker
+                    continue
+            time.sleep(self._poll_interval)
+
+    def get(self, op, input_shape, config, implement):
+        """ return the information of the saved single-op model as `{'model': <model-path>, 'shapes': <input-shapes>}`
+        """
+        key = json.dumps([op, list(input_shape), config, implement], sort_keys=True, default=str)
+        if key not in self._models:
+            if self._shared is None:
+                self._models[key] = self._generate(key, op, input_shape, config, implement)
+            else:
+                self._models[key] = self._get_shared(key, op, input_shape, config, implement)
+        model = self._models[key]
+        return {'model': model['model'], 'shapes': [list(shape) for shape in model['shapes']]}
+
+    def __len__(self):
+        if self._shared is None:
+            return len(self._models)
+        return sum(isinstance(model, dict) for model in self._shared.values())
+
+
 def save_model(model, model_path, implement):
     if implement == 'tensorflow':
         from tensorflow import keras
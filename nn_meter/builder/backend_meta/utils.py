@@ -3,6 +3,7 @@
 import math
 import copy
 from typing import List
+from statistics import NormalDist
 
 
 class ProfiledResults:
@@ -43,16 +44,39 @@ class ProfiledResults:
 
 
 class Latency:
-    def __init__(self, avg=0, std=0):
+    def __init__(self, avg=0, std=0, runs=None):
+        """
+        the latency value with its standard deviation. `runs` is the number of runs the latency is measured by, if known.
+        The string format is `"<avg> +- <std>"`, and `runs` is saved in a separate field of the profiled results.
+        """
         if isinstance(avg, str):
             avg, std = avg.split('+-')
             self.avg = float(avg)
             self.std = float(std)
+            self.runs = runs
         elif isinstance(avg, Latency):
-            self.avg, self.std = avg.avg, avg.std
+            self.avg, self.std, self.runs = avg.avg, avg.std, avg.runs
         else:
             self.avg = avg
             self.std = std
+            self.runs = runs
+
+    @staticmethod
+    def merge(latencies):
+        """ merge the latencies measured by several runs of the same model, weighted by their number of runs
+        """
+        runs = sum(latency.runs for latency in latencies)
+        avg = sum(latency.avg * latency.runs for latency in latencies) / runs
+        var = sum(latency.runs * (latency.std ** 2 + latency.avg ** 2) for latency in latencies) / runs - avg ** 2
+        return Latency(avg, math.sqrt(max(var, 0)), runs)
+
+    def relative_error(self, confidence=0.95):
+        """ the half width of the confidence interval of the mean latency, relative to the mean latency
+        """
+        if not self.runs or self.avg <= 0:
+            return math.inf
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        return z * self.std / math.sqrt(self.runs) / self.avg
 
     def __str__(self):
         return f'{self.avg} +- {self.std}'
@@ -90,34 +114,40 @@ def dump_profiled_results(results, detail = False, metrics = ["latency"]):
 
     @params
 
-    detail: if False, only metrics result will be dumped to the profiled results. Otherwise models information
-        will be dumpled, too.
+    detail: if False, only metrics result, the number of runs and the timeout and throttled marks will be dumped to the profiled
+        results. Otherwise models information will be dumpled, too.
     '''
     dumped_results = {}
     for module_key, module in results.items():
         dumped_results[module_key] = {}
         for model_key, model in module.items():
-            dumped_results[module_key][model_key] = {}
-            if detail:
-                for info_key, info in model.items():
-                    if info_key == 'latency':
-                        dumped_results[module_key][model_key]['latency'] = str(model['latency'])
-                    else:
-                        dumped_results[module_key][model_key][info_key] = info
-            else:
-                for info_key, info in model.items():
-                    if info_key in metrics:
-                        if info_key == 'latency':
-                            dumped_results[module_key][model_key]['latency'] = str(model['latency'])
-                        else:
-                            dumped_results[module_key][model_key][info_key] = model[info_key]
+            dumped_results[module_key][model_key] = dump_profiled_model(model, detail, metrics)
     return dumped_results
 
 
-def read_profiled_results(results):
-    results_copy = copy.deepcopy(results)
+def dump_profiled_model(model, detail = False, metrics = ["latency"]):
+    ''' convert Latency instance to string and return the profiled result of one model. Refer to `dump_profiled_results` for
+    the params.
+    '''
+    dumped_model = {}
+    for info_key, info in model.items():
+        if detail or info_key in metrics or info_key in ('timeout', 'throttled'):
+            dumped_model[info_key] = str(info) if info_key == 'latency' else info
+    latency = model.get('latency')
+    if 'latency' in metrics and isinstance(latency, Latency) and latency.runs is not None:
+        dumped_model['runs'] = latency.runs
+    return dumped_model
+
+
+def read_profiled_results(results, inplace = False):
+    """ parse the latency strings of the profiled results into `Latency`, with the number of runs in the `runs` field if saved. If
+    `inplace`, `results` is parsed in place instead of copied, e.g., when it is loaded from a json file just now.
+    """
+    results_copy = results if inplace else copy.deepcopy(results)
     for item in results_copy.values():
         for model in item.values():
             if 'latency' in model:
                 model['latency'] = Latency(model['latency'])
+                if model.get('runs') is not None:
+                    model['latency'].runs = model['runs']
     return results_copy
@@ -5,5 +5,6 @@ from .interface import (
     BaseProfiler,
     BaseParser,
     connect_backend,
+    connect_backends,
     list_backends
 )
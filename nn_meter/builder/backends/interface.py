@@ -2,6 +2,7 @@
 # Licensed under the MIT license.
 import os
 import sys
+import time
 import yaml
 import importlib
 
@@ -86,6 +87,26 @@ class BaseBackend:
         converted_model = model_path
         return converted_model
 
+    def convert_keras_model(self, model, model_name, save_path, input_shape = None):
+        """ convert the Keras model instance in memory to the type required by the backend inference, and return the path of
+        the converted model. Backends could override this method to convert the model without saving it as a SavedModel first.
+        By default, the model is saved to `<save_path>/<model_name>` and converted by ``self.convert_model()``.
+
+        @params:
+
+        model: the Keras model instance
+
+        model_name: the name of the converted model
+
+        save_path: folder to save the converted model
+
+        input_shape: the shape of input tensor for inference
+        """
+        from tensorflow import keras
+        model_path = os.path.join(save_path, model_name)
+        keras.models.save_model(model, model_path)
+        return self.convert_model(model_path, save_path, input_shape)
+
     def profile(self, converted_model, metrics = ['latency'], **kwargs):
         """
         run the model on the backend, return required metrics of the running results. nn-Meter only support latency
@@ -100,6 +121,56 @@ class BaseBackend:
         """
         return self.parser.parse(self.profiler.profile(converted_model, **kwargs)).results.get(metrics)
 
+    def profile_batch(self, converted_models, metrics = ['latency'], input_shapes = None, **kwargs):
+        """
+        run a batch of models on the backend and return a list of the required metrics for each model. If a model fails, the
+        exception is returned in its place. The default implementation runs ``self.profile()`` for each model. Backends could
+        override this method to profile all models in one run on the device, which amortizes the cost to push the models and
+        start the benchmark for small models.
+
+        @params:
+
+        converted_models: a list of model paths in type of backend required
+
+        metrics: a list of required metrics name. Defaults to ['latency']
+
+        input_shapes: a list of the input shapes of each model
+        """
+        input_shapes = input_shapes or [None] * len(converted_models)
+        results = []
+        for converted_model, input_shape in zip(converted_models, input_shapes):
+            try:
+                results.append(self.profile(converted_model, metrics, input_shape=input_shape, **kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def identity(self):
+        """ return a json serializable identity of the backend and the device. Kernels profiled by backends of the same identity
+        share the measurements in the kernel cache (refer to `nn_meter.builder.kernel_cache.KernelCache`). Backends could override
+        this method to identify the device by its hardware and software, instead of the serial id.
+        """
+        return {
+            "backend": f"{type(self).__module__}.{type(self).__name__}",
+            "device": (getattr(self, "configs", None) or {}).get("DEVICE_SERIAL", ""),
+        }
+
+    def cooldown(self):
+        """
+        the cooldown policy of the device, which is called before profiling each model (or each batch of models) by
+        ``profile_models``. Wait until the device is ready for the next measurement, and return True if the device is still
+        throttling, in which case the profiled results are flagged as ``throttled``. The default policy waits 0.2 seconds.
+        Backends could override this method by checking the state of the device.
+        """
+        time.sleep(0.2)
+        return False
+
+    def is_throttling(self):
+        """ return True if the device is throttling. It is checked after profiling to flag the results measured during
+        throttling.
+        """
+        return False
+
     def profile_model_file(self, model_path, save_path, input_shape = None, metrics = ['latency'], **kwargs):
         """ load model by model file path, convert model file, and run ``self.profile()``
         @params:
@@ -115,6 +186,13 @@ class BaseBackend:
         res = self.profile(converted_model, metrics, input_shape=input_shape, **kwargs)
         return res
 
+    def cancel(self):
+        """ cancel the running profiling job, e.g., when profiling a model takes longer than the time threshold in 
+        ``nn_meter.builder.profile_models``. This method is called from another thread than the profiling job.
+        """
+        if self.profiler_class:
+            self.profiler.cancel()
+
     def test_connection(self):
         """ check the status of backend interface connection.
         """
@@ -133,6 +211,11 @@ class BaseProfiler:
         output = ''
         return output
 
+    def cancel(self):
+        """ stop the running ``Profiler.profile()`` from another thread, e.g., by killing the benchmark process on the device.
+        """
+        pass
+
 
 class BaseParser:
     """
@@ -196,6 +279,42 @@ def connect_backend(backend_name):
     @params:
     backend_name: name of backend (subclass instance of `BaseBackend`). 
     """
+    backend_cls = _get_backend_class(backend_name)
+
+    # load configs from workspace
+    from nn_meter.builder import builder_config
+    configs = builder_config.get_module('backend')
+    return backend_cls(configs)
+
+
+def connect_backends(backend_name, devices = None):
+    """
+    Return a list of backend instances, one for each device, to profile models on a pool of devices in parallel by
+    `nn_meter.builder.profile_models`. The backend configs are loaded from the workspace the same way as `connect_backend`.
+
+    @params:
+    backend_name: name of backend (subclass instance of `BaseBackend`).
+
+    devices: a list of device serial ids, or a list of dicts updating the workspace configs for each device. If not
+        specified, the `DEVICE_SERIAL` in workspace configs is used, which could be a list of serial ids or a string of
+        serial ids separated by commas.
+    """
+    backend_cls = _get_backend_class(backend_name)
+
+    from nn_meter.builder import builder_config
+    configs = builder_config.get_module('backend')
+    if devices is None:
+        devices = configs['DEVICE_SERIAL'] or ''
+        if isinstance(devices, str):
+            devices = [serial.strip() for serial in devices.split(',')]
+    backends = []
+    for device in devices:
+        device_configs = dict(configs, **device) if isinstance(device, dict) else dict(configs, DEVICE_SERIAL=device)
+        backends.append(backend_cls(device_configs))
+    return backends
+
+
+def _get_backend_class(backend_name):
     if backend_name in __REG_BACKENDS__:
         backend_info = __REG_BACKENDS__[backend_name]
         sys.path.append(backend_info["package_location"])
@@ -207,12 +326,7 @@ def connect_backend(backend_name):
     module = backend_info["class_module"]
     name = backend_info["class_name"]
     backend_module = importlib.import_module(module)   
-    backend_cls = getattr(backend_module, name)
-
-    # load configs from workspace
-    from nn_meter.builder import builder_config
-    configs = builder_config.get_module('backend')
-    return backend_cls(configs)
+    return getattr(backend_module, name)
 
 
 def list_backends():
@@ -1,9 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import os
+import logging
 
 from ..interface import BaseBackend
 from nn_meter.utils.path import get_filename_without_ext
+logging = logging.getLogger("nn-Meter")
 
 
 class OpenVINOBackend(BaseBackend):
@@ -33,9 +35,19 @@ class OpenVINOBackend(BaseBackend):
         patched_pb_path = patch_frozenpb(pb_path, os.path.join(self.venv, 'bin/python'))
         return patched_pb_path
 
-    def profile(self, converted_model, metrics = ['latency'], input_shape = None):
+    def profile(self, converted_model, metrics = ['latency'], input_shape = None, **kwargs):
         """convert the model to the backend platform and run the model on the backend, return required metrics 
-        of the running results. We only support latency for metric by now.
+        of the running results. We only support latency for metric by now. `num_runs` and `min_secs` in kwargs are passed
+        to the profiler. The adaptive profiling is not supported, as the detailed counters report of benchmark_app has no
+        standard deviation of the runs, and the models run for the fixed number of runs instead.
         """
+        if kwargs.pop('adaptive', False):
+            logging.warning("Adaptive profiling is not supported by OpenVINO backends. The models run for the fixed number of runs.")
+        for name in ('target_error', 'confidence', 'min_runs', 'max_runs'):
+            kwargs.pop(name, None)
         self.profiler.load_graph(converted_model, self.tmp_dir)
-        return self.parser.parse(self.profiler.profile(input_shape)).results.get(metrics)
+        results = self.parser.parse(self.profiler.profile(input_shape, **kwargs)).results
+        latency = results.data.get('latency')
+        if latency is not None and kwargs.get('min_secs') is None:
+            latency.runs = kwargs.get('num_runs') or self.profiler._num_runs
+        return results.get(metrics)
@@ -1,6 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import os
+import signal
 import subprocess
 import numpy as np
 import shutil
@@ -14,8 +15,9 @@ from nn_meter.utils.pyutils import get_pyver
 class OpenVINOProfiler(BaseProfiler):
 
     device = None
+    _process = None
 
-    def __init__(self, venv, optimizer, runtime_dir, serial, graph_path='', _dst_graph_path='', data_type='FP16'):
+    def __init__(self, venv, optimizer, runtime_dir, serial, graph_path='', _dst_graph_path='', data_type='FP16', num_runs=50):
         self._graph_path = graph_path
         self._venv = venv
         self._optimizer = optimizer
@@ -23,12 +25,22 @@ class OpenVINOProfiler(BaseProfiler):
         self._runtime_dir = runtime_dir
         self._serial = serial
         self._data_type = data_type
+        self._num_runs = num_runs
 
     def load_graph(self, graph_path, dst_graph_path):
         self._graph_path = graph_path
         self._dst_graph_path = dst_graph_path
 
-    def profile(self, shapes, retry = 2, **kwargs):
+    def profile(self, shapes, retry = 2, num_runs = None, min_secs = None, **kwargs):
+        """ convert the frozen pb file to OpenVINO IR and run it by benchmark_app, return the detailed counters report
+
+        @params:
+
+        num_runs: override the number of runs of the profiler for this call.
+
+        min_secs: if set, benchmark_app runs the model for at least `min_secs` seconds, besides at least `num_runs` runs.
+        """
+        num_runs = self._num_runs if num_runs is None else num_runs
         interpreter_path = os.path.join(self._venv, 'bin/python')
         pyver = get_pyver(interpreter_path)
 
@@ -65,18 +77,25 @@ class OpenVINOProfiler(BaseProfiler):
                 f'-d {self.device} '
                 f'-report_type detailed_counters '
                 f'-report_folder {self._dst_graph_path} '
-                f'-niter 50 '
+                f'-niter {num_runs} '
                 f'-nireq 1 '
                 f'-api sync'
+                + (f' -t {min_secs}' if min_secs is not None else '')
             )
 
             while True:
                 try:
-                    subprocess.run(
+                    # run the benchmark in a new process group, which could be killed by ``cancel()``
+                    self._process = subprocess.Popen(
                         f'bash -c "{command}"',
                         shell=True,
-                        timeout=30,
+                        start_new_session=True,
                     )
+                    try:
+                        self._process.wait(timeout=30 + (min_secs or 0))
+                    except subprocess.TimeoutExpired:
+                        self.cancel()
+                        raise
                     output = open(os.path.join(self._dst_graph_path, 'benchmark_detailed_counters_report.csv'), 'r').read()
                     break
                 except subprocess.TimeoutExpired as e:
@@ -90,3 +109,14 @@ class OpenVINOProfiler(BaseProfiler):
                     retry -= 1
 
         return output
+
+    def cancel(self):
+        """ kill the running benchmark process
+        """
+        process = self._process
+        if process is not None and process.poll() is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError: # the process has exited
+                pass
+            process.wait()
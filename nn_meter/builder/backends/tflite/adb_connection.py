@@ -0,0 +1,126 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import time
+import shutil
+import logging
+import threading
+import subprocess
+logging = logging.getLogger("nn-Meter")
+
+
+class AdbConnection:
+    """
+    A pooled connection to an adb device. All profilers of the same device share one connection, which is created on first
+    use and kept for the lifetime of the process. The device is checked by a cheap `echo` command if it has been idle for
+    longer than `health_check_interval` seconds, and is reconnected automatically after the connection drops.
+
+    Use `AdbConnection.get(serial)` instead of the constructor to get the pooled connection.
+    """
+    health_check_interval = 60
+    _pool = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self, serial = '', host = "127.0.0.1", port = 5037):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self._device = None
+        self._last_used = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, serial = '', host = "127.0.0.1", port = 5037):
+        """ return the pooled connection of the device
+        """
+        key = (serial, host, port)
+        with cls._pool_lock:
+            if key not in cls._pool:
+                cls._pool[key] = cls(serial, host, port)
+            return cls._pool[key]
+
+    def __reduce__(self):
+        # the connection is pooled per process, so that backends could be sent to worker processes
+        return (AdbConnection.get, (self.serial, self.host, self.port))
+
+    def _connect(self):
+        from ppadb.client import Client as AdbClient
+        client = AdbClient(host=self.host, port=self.port)
+        if self.serial:
+            device = client.device(self.serial)
+        else:
+            devices = client.devices()
+            device = devices[0] if devices else None
+        if device is None:
+            raise RuntimeError(f"Adb device {self.serial} is not found.")
+        return device
+
+    def _is_healthy(self, device):
+        try:
+            return device.shell("echo ok").strip() == "ok"
+        except (OSError, RuntimeError):
+            return False
+
+    @property
+    def device(self):
+        """ the ppadb device, connected or checked if necessary
+        """
+        with self._lock:
+            if self._device is None:
+                self._device = self._connect()
+            elif time.time() - self._last_used > self.health_check_interval and not self._is_healthy(self._device):
+                logging.info(f"Adb device {self.serial} is not responding. Reconnecting...")
+                self._device = self._connect()
+            self._last_used = time.time()
+            return self._device
+
+    def reset(self):
+        """ drop the connection, the device will be reconnected when used next time
+        """
+        with self._lock:
+            self._device = None
+
+    def run(self, func):
+        """ return `func(device)`. If the connection drops, reconnect the device and call `func` again.
+        """
+        try:
+            result = func(self.device)
+        except (OSError, RuntimeError) as e:
+            logging.info(f"Connection to adb device {self.serial} dropped: {e}. Reconnecting...")
+            self.reset()
+            result = func(self.device)
+        self._last_used = time.time()
+        return result
+
+    def shell(self, cmd, **kwargs):
+        return self.run(lambda device: device.shell(cmd, **kwargs))
+
+    def push(self, src, dest):
+        return self.run(lambda device: device.push(src, dest))
+
+    def pull(self, src, dest):
+        return self.run(lambda device: device.pull(src, dest))
+
+
+def benchmark_connection(serial = '', num_calls = 50, cmd = "echo ok", host = "127.0.0.1", port = 5037):
+    """ measure the mean milliseconds of running `cmd` on the device by the pooled `AdbConnection`, by a new adb client and
+    device lookup for each call, and by an `adb shell` process for each call (if the `adb` executable is found). The latter two
+    were used by the TFLite profiler before the connection was pooled. Return a dict of the milliseconds of each method.
+    """
+    def measure(func):
+        func() # warm up
+        start = time.perf_counter()
+        for _ in range(num_calls):
+            func()
+        return (time.perf_counter() - start) / num_calls * 1000
+
+    connection = AdbConnection.get(serial, host, port)
+    results = {
+        "pooled": measure(lambda: connection.shell(cmd)),
+        "per_call_client": measure(lambda: AdbConnection(serial, host, port)._connect().shell(cmd)),
+    }
+    adb = shutil.which("adb")
+    if adb is not None:
+        adb_cmd = [adb] + (["-s", serial] if serial else []) + ["shell", cmd]
+        results["per_call_process"] = measure(lambda: subprocess.run(adb_cmd, stdout=subprocess.DEVNULL, check=True))
+    logging.result(f"Adb device {serial}: " + ", ".join(f"{name} {ms:.2f} ms/call" for name, ms in results.items()))
+    return results
@@ -41,13 +41,13 @@ class TFLiteCPULatencyParser(BaseParser):
         return nodes
 
     def _parse_total_latency(self, content):
-        total_latency_regex = r'Timings \(microseconds\): count=[\d.e-]+ first=[\d.e-]+ curr=[\d.e-]+ min=[\d.e-]+ max=[\d.e-]+ avg=([\d.e-]+) std=([\d.e-]+)'
+        total_latency_regex = r'Timings \(microseconds\): count=([\d.e-]+) first=[\d.e-]+ curr=[\d.e-]+ min=[\d.e-]+ max=[\d.e-]+ avg=([\d.e-]+) std=([\d.e-]+)'
 
         total_latency = Latency()
         match = re.search(total_latency_regex, content, re.MULTILINE)
         if match:
             # convert microseconds to millisecond
-            total_latency = Latency(float(match[1]) / 1000, float(match[2]) / 1000)
+            total_latency = Latency(float(match[2]) / 1000, float(match[3]) / 1000, int(float(match[1])))
 
         return total_latency
     
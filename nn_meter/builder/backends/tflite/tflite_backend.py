@@ -1,9 +1,14 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import os
+import math
+import time
 import shutil
 import logging
+from statistics import NormalDist
 from ..interface import BaseBackend
+from .tflite_profiler import split_batch_output
+from nn_meter.builder.backend_meta.utils import Latency
 from nn_meter.utils.path import get_filename_without_ext
 logging = logging.getLogger("nn-Meter")
 
@@ -22,6 +27,50 @@ class TFLiteBackend(BaseBackend):
             'serial': self.configs['DEVICE_SERIAL'],
             'dst_kernel_path': self.configs['KERNEL_PATH']
         })
+        self._cooldown_policy = None
+        self._identity = None
+
+    def identity(self):
+        """ identify the device by its build fingerprint, so that the devices of the same model and system share the kernel
+        measurements, together with the benchmark settings of the profiler
+        """
+        if self._identity is None:
+            from .adb_connection import AdbConnection
+            connection = AdbConnection.get(self.configs['DEVICE_SERIAL'])
+            self._identity = {
+                "backend": type(self).__name__,
+                "device": connection.shell("getprop ro.build.fingerprint").strip(),
+                "benchmark_model_path": self.configs['BENCHMARK_MODEL_PATH'],
+                "num_threads": self.profiler._num_threads,
+                "num_runs": self.profiler._num_runs,
+                "warm_ups": self.profiler._warm_ups,
+            }
+        return self._identity
+
+    @property
+    def cooldown_policy(self):
+        """ the thermal-aware cooldown policy of the adb device, or None if `COOLDOWN_TEMPERATURE` is not set in the configs
+        """
+        if self._cooldown_policy is None and self.configs.get('COOLDOWN_TEMPERATURE'):
+            from .adb_connection import AdbConnection
+            from .thermal import AdbCooldownPolicy
+            self._cooldown_policy = AdbCooldownPolicy(AdbConnection.get(self.configs['DEVICE_SERIAL']),
+                                                      max_temperature=self.configs['COOLDOWN_TEMPERATURE'],
+                                                      max_wait=self.configs.get('COOLDOWN_MAX_WAIT', 60))
+        return self._cooldown_policy
+
+    def cooldown(self):
+        """ wait while the device is hot or its cpu frequency is capped. If `COOLDOWN_TEMPERATURE` is not set in the configs,
+        wait 0.2 seconds as the default policy.
+        """
+        if self.cooldown_policy is None:
+            return super().cooldown()
+        return self.cooldown_policy.cooldown()
+
+    def is_throttling(self):
+        if self.cooldown_policy is None:
+            return False
+        return self.cooldown_policy.is_throttling()
 
     def convert_model(self, model_path, save_path, input_shape=None):
         """convert the Keras model instance to ``.tflite`` and return model path
@@ -29,20 +78,131 @@ class TFLiteBackend(BaseBackend):
         import tensorflow as tf
         model_name = get_filename_without_ext(model_path)
         model = tf.keras.models.load_model(model_path)
+        converted_model = self.convert_keras_model(model, model_name, save_path, input_shape)
+        shutil.rmtree(model_path)
+        return converted_model
+
+    def convert_keras_model(self, model, model_name, save_path, input_shape=None):
+        """convert the Keras model instance in memory to ``.tflite`` and return model path
+        """
+        import tensorflow as tf
         converter = tf.lite.TFLiteConverter.from_keras_model(model)
         tflite_model = converter.convert()
         converted_model = os.path.join(save_path, model_name + '.tflite')
-        open(converted_model, 'wb').write(tflite_model)
-        shutil.rmtree(model_path)
+        with open(converted_model, 'wb') as fp:
+            fp.write(tflite_model)
         return converted_model
 
+    def profile(self, converted_model, metrics = ['latency'], input_shape = None, adaptive = False, target_error = 0.02,
+                confidence = 0.95, min_runs = 10, max_runs = 500, **kwargs):
+        """run the ``.tflite`` model on the device and return the required metrics. The number of runs is recorded in
+        ``latency.runs``.
+
+        @params:
+
+        adaptive: if True, run the benchmark in chunks until the half width of the confidence interval of the mean latency
+            is smaller than ``target_error`` relative to the mean latency, or ``max_runs`` runs have been done. The first chunk
+            has ``min_runs`` runs, and the size of the following chunks is estimated by the measured standard deviation. Stable
+            kernels stop early while noisy kernels get more runs. The minimum seconds of benchmark_model are disabled for the
+            chunks, so each chunk runs exactly the required times. Otherwise, the model runs for the fixed ``num_runs`` of the
+            profiler.
+
+        target_error: the target relative error of the mean latency in adaptive mode
+
+        confidence: the confidence level of the confidence interval in adaptive mode
+
+        min_runs, max_runs: the minimum and maximum number of runs in adaptive mode
+        """
+        if not adaptive:
+            results = self.parser.parse(self.profiler.profile(converted_model, **kwargs)).results
+            latency = results.data.get('latency')
+            if latency is not None and latency.runs is None:
+                latency.runs = kwargs.get('num_runs') or self.profiler._num_runs
+            return results.get(metrics)
+
+        clean = kwargs.pop('clean', True)
+        preserve = kwargs.pop('preserve', False)
+        kwargs.pop('num_runs', None)
+        kwargs.pop('min_secs', None)
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        latencies, runs = [], min_runs
+        try:
+            while True:
+                # the model is pushed only once, and only the first chunk needs the full warm up
+                output = self.profiler.profile(converted_model, preserve=preserve or bool(latencies), clean=False,
+                                               num_runs=runs, warm_ups=None if not latencies else 1, min_secs=0, **kwargs)
+                results = self.parser.parse(output).results
+                latency = results.data['latency']
+                if latency.runs is None:
+                    latency.runs = runs
+                latencies.append(latency)
+                merged = Latency.merge(latencies)
+                if merged.runs >= max_runs or merged.relative_error(confidence) <= target_error:
+                    break
+                # estimate the total runs needed to reach the target error by the measured standard deviation
+                needed = math.ceil((z * merged.std / (target_error * merged.avg)) ** 2) if merged.avg > 0 else max_runs
+                runs = max(min(needed - merged.runs, max_runs - merged.runs), min(min_runs, max_runs - merged.runs))
+        finally:
+            if clean:
+                self.profiler.remove_model(converted_model)
+        logging.info(f"Profiled {converted_model} by {merged.runs} runs, relative error {merged.relative_error(confidence):.4f}")
+        results.set('latency', merged)
+        return results.get(metrics)
+
+    def compare_adaptive_profiling(self, converted_models, **kwargs):
+        """ profile each ``.tflite`` model both by the fixed number of runs and in adaptive mode, and return a list of dicts of the
+        number of runs, the latency and the wall-clock seconds on the device of both modes for each model. The total seconds of
+        both modes are logged, to measure the device time saved by adaptive profiling on the target device.
+
+        @params:
+
+        kwargs: the params of adaptive mode passed to ``profile``, e.g., ``target_error``, ``min_runs`` and ``max_runs``
+        """
+        comparison = []
+        for converted_model in converted_models:
+            start = time.time()
+            fixed = self.profile(converted_model, preserve=False, clean=False)['latency']
+            fixed_secs = time.time() - start
+            self.cooldown()
+            start = time.time()
+            adaptive = self.profile(converted_model, adaptive=True, preserve=True, clean=False, **kwargs)['latency']
+            adaptive_secs = time.time() - start
+            self.profiler.remove_model(converted_model)
+            comparison.append({
+                "model": converted_model,
+                "fixed_runs": fixed.runs, "fixed_latency": fixed.avg, "fixed_secs": fixed_secs,
+                "adaptive_runs": adaptive.runs, "adaptive_latency": adaptive.avg, "adaptive_secs": adaptive_secs,
+            })
+            self.cooldown()
+        fixed_secs = sum(item["fixed_secs"] for item in comparison)
+        adaptive_secs = sum(item["adaptive_secs"] for item in comparison)
+        logging.result(f"Profiled {len(comparison)} models in {fixed_secs:.1f} s by fixed runs and in {adaptive_secs:.1f} s in "
+                       f"adaptive mode ({(1 - adaptive_secs / fixed_secs) * 100 if fixed_secs else 0:.1f}% saved).")
+        return comparison
+
+    def profile_batch(self, converted_models, metrics = ['latency'], input_shapes = None, **kwargs):
+        """run a batch of ``.tflite`` models in one benchmark loop on the device, and parse the output of each model
+        """
+        if kwargs.get('adaptive'):
+            # the number of runs is decided for each model in adaptive mode
+            return super().profile_batch(converted_models, metrics, input_shapes, **kwargs)
+        outputs = split_batch_output(self.profiler.profile_batch(converted_models, **kwargs))
+        results = []
+        for converted_model in converted_models:
+            model_name = os.path.basename(converted_model)
+            if model_name in outputs:
+                profiled_results = self.parser.parse(outputs[model_name]).results
+                latency = profiled_results.data.get('latency')
+                if latency is not None and latency.runs is None:
+                    latency.runs = self.profiler._num_runs
+                results.append(profiled_results.get(metrics))
+            else:
+                results.append(RuntimeError(f"No profiled output of model {model_name} in the batch."))
+        return results
+
     def test_connection(self):
         """check the status of backend interface connection, ideally including open/close/check_healthy...
         """
-        from ppadb.client import Client as AdbClient
-        client = AdbClient(host="127.0.0.1", port=5037)
-        if self.configs['DEVICE_SERIAL']:
-            device = client.device(self.configs['DEVICE_SERIAL'])
-        else:
-            device = client.devices()[0]
-        logging.keyinfo(device.shell("echo hello backend !"))
+        from .adb_connection import AdbConnection
+        connection = AdbConnection.get(self.configs['DEVICE_SERIAL'])
+        logging.keyinfo(connection.shell("echo hello backend !"))
@@ -1,9 +1,33 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import os
+from .adb_connection import AdbConnection
 from ..interface import BaseProfiler
 
 
+BATCH_BEGIN_MARKER = "[nn-Meter batch begin]"
+BATCH_END_MARKER = "[nn-Meter batch end]"
+CANCEL_FILE_NAME = ".nn_meter_cancel"
+PID_FILE_NAME = ".nn_meter_pid"
+
+
+def split_batch_output(content):
+    """ split the combined output of `TFLiteProfiler.profile_batch` and return a dict of the output of each model, with the model
+    file name as the key
+    """
+    outputs = {}
+    model_name, lines = None, []
+    for line in content.splitlines():
+        if line.startswith(BATCH_BEGIN_MARKER):
+            model_name, lines = line[len(BATCH_BEGIN_MARKER):].strip(), []
+        elif line.startswith(BATCH_END_MARKER) and model_name is not None:
+            outputs[model_name] = "\n".join(lines)
+            model_name = None
+        elif model_name is not None:
+            lines.append(line)
+    return outputs
+
+
 class TFLiteProfiler(BaseProfiler):
     use_gpu = None
 
@@ -23,48 +47,110 @@ class TFLiteProfiler(BaseProfiler):
         self._num_threads = num_threads
         self._num_runs = num_runs
         self._warm_ups = warm_ups
+        self._connection = AdbConnection.get(serial)
+        self._cancelled = False
+
+    def _benchmark_cmd(self, remote_graph_path, taskset = '70', close_xnnpack = False, num_runs = None, warm_ups = None,
+                       min_secs = None):
+        taskset_cmd = f'taskset {taskset}' if taskset else ''
+        kernel_cmd = f'--kernel_path={self._dst_kernel_path}' if self._dst_kernel_path else ''
+        close_xnnpack_cmd = f'--use_xnnpack=false' if close_xnnpack else ''
+        # benchmark_model runs at least `--min_secs` (1s by default) and `--warmup_min_secs` (0.5s by default) besides the
+        # number of runs, thus both are set to make the number of runs exact
+        min_secs_cmd = f'--min_secs={min_secs} --warmup_min_secs={min_secs}' if min_secs is not None else ''
+        return f' {taskset_cmd} {self._benchmark_model_path} {kernel_cmd} {close_xnnpack_cmd} {min_secs_cmd}' \
+               f' --num_threads={self._num_threads}' \
+               f' --num_runs={self._num_runs if num_runs is None else num_runs}' \
+               f' --warmup_runs={self._warm_ups if warm_ups is None else warm_ups}' \
+               f' --graph={remote_graph_path}' \
+               f' --enable_op_profiling=true' \
+               f' --use_gpu={"true" if self.use_gpu else "false"}'
 
-    def profile(self, graph_path, preserve = False, clean = True, taskset = '70', close_xnnpack = False, **kwargs):
+    def _job_file(self, name):
+        """ the path of the cancel or pid file of this host process on the device
+        """
+        return os.path.join(self._dst_graph_path, f'{name}.{os.getpid()}')
+
+    def _background_cmd(self, cmd):
+        """ run `cmd` in the background of the device shell and wait for it, with its pid saved for `cancel`
+        """
+        return f'{cmd} & echo $! > {self._job_file(PID_FILE_NAME)}; wait $!'
+
+    def profile(self, graph_path, preserve = False, clean = True, taskset = '70', close_xnnpack = False, num_runs = None,
+                warm_ups = None, min_secs = None, **kwargs):
         """
         @params:
         preserve: tflite file exists in remote dir. No need to push it again.
         clean: remove tflite file after running.
+        num_runs, warm_ups: override the number of runs and warm up runs of the profiler for this call.
+        min_secs: the minimum seconds of the runs and of the warm up runs. Defaults to None, i.e., the defaults of benchmark_model,
+            which run small models for more than `num_runs` times.
         """
         model_name = os.path.basename(graph_path)
         remote_graph_path = os.path.join(self._dst_graph_path, model_name)
-        taskset_cmd = f'taskset {taskset}' if taskset else ''
-        kernel_cmd = f'--kernel_path={self._dst_kernel_path}' if self._dst_kernel_path else ''
-        close_xnnpack_cmd = f'--use_xnnpack=false' if close_xnnpack else ''
 
-        from ppadb.client import Client as AdbClient
-        client = AdbClient(host="127.0.0.1", port=5037)
+        try:
+            if not preserve:
+                self._connection.push(graph_path, remote_graph_path)
+            benchmark_cmd = self._benchmark_cmd(remote_graph_path, taskset, close_xnnpack, num_runs, warm_ups, min_secs)
+            res = self._connection.shell(
+                f'{self._background_cmd(benchmark_cmd)}; rm -f {self._job_file(CANCEL_FILE_NAME)} {self._job_file(PID_FILE_NAME)}'
+            )
+        finally:
+            if clean:
+                self.remove_model(graph_path)
+
+        return res
+
+    def remove_model(self, graph_path):
+        """ remove the tflite file from the device, and from the host if the device serial is specified
+        """
+        self._connection.shell(f"rm {os.path.join(self._dst_graph_path, os.path.basename(graph_path))}")
         if self._serial:
-            device = client.device(self._serial)
-        else:
-            device = client.devices()[0]
+            os.remove(graph_path)
 
-        if not preserve:
-            device.push(graph_path, remote_graph_path)
+    def profile_batch(self, graph_paths, preserve = False, clean = True, taskset = '70', close_xnnpack = False, **kwargs):
+        """
+        run a batch of models by a loop on the device in one shell command, and return the combined output. The output of
+        each model is enclosed by the begin and end markers with the model name, and could be split by `split_batch_output`.
+
+        @params:
+        preserve: tflite files exist in remote dir. No need to push them again.
+        clean: remove tflite files after running. The files on the device are always removed, while the files on the host are
+            removed only if the batch succeeds, so that the models could still be profiled one by one after a failed batch.
+        """
+        model_names = [os.path.basename(graph_path) for graph_path in graph_paths]
+        remote_graph_paths = [os.path.join(self._dst_graph_path, model_name) for model_name in model_names]
+
+        pushed = remote_graph_paths if preserve else []
         try:
-            taskset_cmd = f'taskset {taskset}' if taskset else '' 
-            kernel_cmd = f'--kernel_path={self._dst_kernel_path}' if self._dst_kernel_path else ''
-            close_xnnpack_cmd = f'--use_xnnpack=false' if close_xnnpack else ''
-            res = device.shell(f' {taskset_cmd} {self._benchmark_model_path} {kernel_cmd} {close_xnnpack_cmd}' \
-                               f' {close_xnnpack_cmd}' \
-                               f' --num_threads={self._num_threads}' \
-                               f' --num_runs={self._num_runs}' \
-                               f' --warmup_runs={self._warm_ups}' \
-                               f' --graph={remote_graph_path}' \
-                               f' --enable_op_profiling=true' \
-                               f' --use_gpu={"true" if self.use_gpu else "false"}')
-        except:
-            raise
+            if not preserve:
+                for graph_path, remote_graph_path in zip(graph_paths, remote_graph_paths):
+                    self._connection.push(graph_path, remote_graph_path)
+                    pushed.append(remote_graph_path)
+            benchmark_cmd = self._benchmark_cmd(os.path.join(self._dst_graph_path, '$model'), taskset, close_xnnpack)
+            cancel_file = self._job_file(CANCEL_FILE_NAME)
+            self._cancelled = False
+            res = self._connection.shell(
+                f'rm -f {cancel_file}; for model in {" ".join(model_names)}; do [ -e {cancel_file} ] && break; '
+                f'echo "{BATCH_BEGIN_MARKER} $model"; {self._background_cmd(f"{benchmark_cmd} 2>&1")}; '
+                f'echo "{BATCH_END_MARKER} $model"; done; rm -f {cancel_file} {self._job_file(PID_FILE_NAME)}'
+            )
+            if self._cancelled:
+                raise RuntimeError("The batch is cancelled.")
         finally:
-            if clean:
-                if self._serial:
-                    os.system(f"adb -s {self._serial} shell rm {remote_graph_path}")
-                    os.remove(graph_path)
-                else:
-                    os.system(f"adb shell rm {remote_graph_path}")
+            if clean and pushed:
+                self._connection.shell(f"rm {' '.join(pushed)}")
 
+        if clean and self._serial:
+            for graph_path in graph_paths:
+                os.remove(graph_path)
         return res
+
+    def cancel(self):
+        """ kill the benchmark started by this profiler on the device, and stop the loop of a running batch. Only the pid saved
+        by this profiler is killed, so the benchmarks of other jobs on the same device keep running.
+        """
+        self._cancelled = True
+        pid_file = self._job_file(PID_FILE_NAME)
+        self._connection.shell(f'touch {self._job_file(CANCEL_FILE_NAME)}; [ -e {pid_file} ] && kill $(cat {pid_file})')
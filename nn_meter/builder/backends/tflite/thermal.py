@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import re
+import time
+import logging
+logging = logging.getLogger("nn-Meter")
+
+
+# print "zone <zone type> <temperature>" for each thermal zone, "cooling <cooling device type> <cur state>" for each cooling
+# device, and "cpu <scaling max freq> <cpuinfo max freq>" for each cpu
+_THERMAL_STATE_CMD = (
+    'for z in /sys/class/thermal/thermal_zone*; do echo "zone $(cat $z/type) $(cat $z/temp)"; done 2>/dev/null; '
+    'for d in /sys/class/thermal/cooling_device*; do echo "cooling $(cat $d/type) $(cat $d/cur_state)"; done 2>/dev/null; '
+    'for c in /sys/devices/system/cpu/cpu[0-9]*/cpufreq; do '
+    'echo "cpu $(cat $c/scaling_max_freq) $(cat $c/cpuinfo_max_freq)"; done 2>/dev/null'
+)
+
+
+def parse_thermal_state(content, zone_pattern = None, cooling_pattern = 'cpu'):
+    """ parse the output of the thermal state command. Return `(temperature, capped)`, where `temperature` is the highest
+    temperature in Celsius of the thermal zones whose type matches `zone_pattern` (or of all zones if none matches), and
+    `capped` is True if the cpu frequency is capped by thermal throttling. `temperature` is None if no thermal zone is readable.
+
+    The cpu is capped if any cooling device whose type matches `cooling_pattern` (e.g., `thermal-cpufreq-0`) is in a non-zero
+    state. On devices without readable cpu cooling devices, the cpu is capped if the `scaling_max_freq` of any cpu is below its
+    `cpuinfo_max_freq`.
+    """
+    temperatures, matched, cooling_states, capped_freqs = [], [], [], []
+    for line in content.splitlines():
+        items = line.split()
+        try:
+            if len(items) == 3 and items[0] == 'zone':
+                temperature = float(items[2])
+                # thermal zones report millidegree Celsius on most devices
+                temperature = temperature / 1000 if abs(temperature) > 200 else temperature
+                if not 0 < temperature < 150: # disabled or bogus sensors
+                    continue
+                temperatures.append(temperature)
+                if zone_pattern and re.search(zone_pattern, items[1], re.IGNORECASE):
+                    matched.append(temperature)
+            elif len(items) == 3 and items[0] == 'cooling':
+                if re.search(cooling_pattern, items[1], re.IGNORECASE):
+                    cooling_states.append(int(items[2]) > 0)
+            elif len(items) == 3 and items[0] == 'cpu':
+                capped_freqs.append(int(items[1]) < int(items[2]))
+        except ValueError:
+            continue
+    temperatures = matched or temperatures
+    capped = any(cooling_states) if cooling_states else any(capped_freqs)
+    return (max(temperatures) if temperatures else None), capped
+
+
+class AdbCooldownPolicy:
+    """
+    The cooldown policy of adb devices. Before profiling the next model, the policy waits only while the device is
+    throttling, i.e., the temperature of the cpu thermal zones is above `max_temperature`, or the cpu frequency is capped by
+    the thermal framework (refer to `parse_thermal_state`). The device is polled every `poll_interval` seconds for at most
+    `max_wait` seconds.
+
+    @params:
+
+    connection: the `AdbConnection` of the device
+
+    max_temperature: the temperature threshold in Celsius
+
+    max_wait: the maximum seconds to wait for the device to cool down
+
+    poll_interval: the seconds between two polls of the thermal state
+
+    zone_pattern: the regex of the thermal zone types to watch. All thermal zones are watched if none matches.
+
+    cooling_pattern: the regex of the cooling device types that cap the cpu frequency
+    """
+    def __init__(self, connection, max_temperature = 50, max_wait = 60, poll_interval = 1,
+                 zone_pattern = 'cpu|soc|tsens|cluster', cooling_pattern = 'cpu'):
+        self._connection = connection
+        self.max_temperature = max_temperature
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.zone_pattern = zone_pattern
+        self.cooling_pattern = cooling_pattern
+
+    def is_throttling(self):
+        """ read the thermal state of the device and return True if the device is throttling
+        """
+        temperature, capped = parse_thermal_state(self._connection.shell(_THERMAL_STATE_CMD), self.zone_pattern,
+                                                  self.cooling_pattern)
+        return capped or (temperature is not None and temperature > self.max_temperature)
+
+    def cooldown(self):
+        """ wait until the device is not throttling, and return True if it is still throttling after `max_wait` seconds
+        """
+        start = time.time()
+        while self.is_throttling():
+            if time.time() - start >= self.max_wait:
+                logging.warning(f"Adb device {self._connection.serial} is still throttling after {self.max_wait} seconds. "
+                                f"Continue profiling and flag the results as throttled.")
+                return True
+            time.sleep(self.poll_interval)
+        if time.time() - start > 0.5:
+            logging.info(f"Adb device {self._connection.serial} cooled down in {time.time() - start:.1f} seconds.")
+        return False
@@ -0,0 +1,112 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import os
+import json
+import time
+import hashlib
+import logging
+logging = logging.getLogger("nn-Meter")
+
+
+def _canonical(value):
+    # numpy scalars and arrays are converted to python values, so that equal configs always have the same key
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+
+def make_kernel_key(kernel_type, config, identity, profile_kwargs = None):
+    """ return the key of a kernel of the predictor build in the kernel cache, with the implementation and the batch size in the
+    predictor build configs. The kernel generator and `profile_models` both use this key, so that the kernels skipped in
+    generation are the kernels found when profiling.
+    """
+    from nn_meter.builder import builder_config
+    return KernelCache.make_key(kernel_type, config, builder_config.get('IMPLEMENT', 'predbuild'),
+                                builder_config.get('BATCH_SIZE', 'predbuild'), identity, profile_kwargs)
+
+
+class KernelCache:
+    """
+    A content-addressed cache of profiled kernels, shared across builder runs and workspaces. A kernel measurement is keyed by
+    the sha256 of the canonical json of the kernel type, the kernel config, the implementation, the batch size, the identity of
+    the backend and device (refer to `BaseBackend.identity()`), and the profiling arguments. Each measurement is stored in its
+    own file `<cache_dir>/<key[:2]>/<key[2:]>.json`, thus multiple builder processes could share the cache.
+
+    @params:
+
+    cache_dir (str): the folder of the cache. Defaults to `<nn-Meter user data folder>/kernel_cache`.
+
+    expire_days (float): the measurements older than `expire_days` days are ignored. Defaults to None, i.e., never expire.
+    """
+    def __init__(self, cache_dir = None, expire_days = None):
+        if cache_dir is None:
+            from nn_meter.utils.config_manager import get_user_data_folder
+            cache_dir = os.path.join(get_user_data_folder(), "kernel_cache")
+        self.cache_dir = cache_dir
+        self.expire_days = expire_days
+
+    @staticmethod
+    def make_key(kernel_type, config, implement, batch_size, identity, profile_kwargs = None):
+        """ return the key of a kernel measurement
+        """
+        content = json.dumps({
+            "kernel_type": kernel_type,
+            "config": config,
+            "implement": implement,
+            "batch_size": batch_size,
+            "identity": identity,
+            "profile_kwargs": profile_kwargs or {},
+        }, sort_keys=True, separators=(",", ":"), default=_canonical)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key[2:] + ".json")
+
+    def _expired(self, record):
+        return self.expire_days is not None and time.time() - record.get("time", 0) > self.expire_days * 86400
+
+    def get(self, key):
+        """ return the record of the key, or None if the key is not cached or the record is expired
+        """
+        try:
+            with open(self._path(key), "r") as fp:
+                record = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        return None if self._expired(record) else record
+
+    def put(self, key, record):
+        """ save the record of the key. The record is a json serializable dict, e.g., `{"shapes": ..., "latency": ...}`.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = dict(record, time=time.time())
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as fp:
+            json.dump(record, fp, default=_canonical)
+        os.replace(temp_path, path)
+
+    def clear(self, older_than_days = None):
+        """ remove the records older than `older_than_days` days, or all records if `older_than_days` is None. Return the number
+        of removed records.
+        """
+        count = 0
+        if not os.path.isdir(self.cache_dir):
+            return count
+        for folder in os.listdir(self.cache_dir):
+            folder = os.path.join(self.cache_dir, folder)
+            if not os.path.isdir(folder):
+                continue
+            for filename in os.listdir(folder):
+                path = os.path.join(folder, filename)
+                if older_than_days is not None:
+                    try:
+                        with open(path, "r") as fp:
+                            if time.time() - json.load(fp).get("time", 0) <= older_than_days * 86400:
+                                continue
+                    except (OSError, ValueError):
+                        pass
+                os.remove(path)
+                count += 1
+        logging.info(f"Removed {count} records from the kernel cache {self.cache_dir}.")
+        return count
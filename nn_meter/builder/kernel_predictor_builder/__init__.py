@@ -1,4 +1,5 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 from .data_sampler import generate_config_sample, BaseConfigSampler
-from .predictor_builder import build_predictor_by_data, BaseFeatureParser, collect_kernel_data
\ No newline at end of file
+from .predictor_builder import build_predictor_by_data, build_predictors_by_data, PredictorTrainer, BaseFeatureParser, collect_kernel_data, \
+    register_regressor, list_regressors, benchmark_regressors
\ No newline at end of file
@@ -0,0 +1,61 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import logging
+import numpy as np
+logging = logging.getLogger("nn-Meter")
+
+
+def tree_disagreement(predictor, features):
+    ''' return the disagreement of the trees of a random forest on each feature vector, i.e., the standard deviation of the
+    predictions of the individual trees relative to their mean. The relative value is used as the predictor is evaluated by
+    relative errors.
+    '''
+    if not hasattr(predictor, "estimators_"):
+        raise ValueError("Active sampling requires a fitted tree ensemble predictor, such as `RandomForestRegressor`.")
+    features = np.asarray(features, dtype=float)
+    predicts = np.stack([tree.predict(features) for tree in predictor.estimators_])
+    return predicts.std(axis=0) / np.maximum(np.abs(predicts.mean(axis=0)), 1e-6)
+
+
+def active_config_sampling(kernel_type, sampler, predictor, sample_num, exclude_configs = None, pool_size = None):
+    '''
+    Sample a large pool of candidate configs from the prior distribution, which only costs the sampling itself, and return the
+    `sample_num` candidates that the trees of `predictor` disagree most on. Profiling these configs reduces the uncertainty of
+    the predictor most.
+
+    @params
+
+    kernel_type (str): type of the kernel
+
+    sampler (subclass instance of BaseConfigSampler): the config sampler of the kernel
+
+    predictor: the fitted random forest predictor of the kernel
+
+    sample_num (int): the number of configs to return
+
+    exclude_configs (list, optional): the configs that have been profiled, which are excluded from the candidates
+
+    pool_size (int, optional): the number of candidates. Defaults to `max(50 * sample_num, 1000)`.
+    '''
+    from nn_meter.builder.kernel_predictor_builder.predictor_builder.extract_feature import get_feature_parser
+    feature_parser = get_feature_parser(kernel_type)
+    pool_size = pool_size or max(50 * sample_num, 1000)
+
+    # remove duplicated candidates and the configs profiled before
+    seen = set(map(tuple, feature_parser.get_features_by_configs(exclude_configs or []).tolist()))
+    pool = sampler.prior_config_sampling(pool_size)
+    pool_features = feature_parser.get_features_by_configs(pool)
+    keep = []
+    for i, feature in enumerate(map(tuple, pool_features.tolist())):
+        if feature not in seen:
+            seen.add(feature)
+            keep.append(i)
+    if not keep:
+        return []
+    candidates, features = [pool[i] for i in keep], pool_features[keep]
+
+    scores = tree_disagreement(predictor, features)
+    top = np.argsort(-scores, kind="stable")[:sample_num]
+    logging.info(f"Select {len(top)} of {len(candidates)} candidate configs for {kernel_type} by tree disagreement, "
+                 f"with scores from {scores[top[-1]]:.4f} to {scores[top[0]]:.4f}.")
+    return [candidates[i] for i in top]
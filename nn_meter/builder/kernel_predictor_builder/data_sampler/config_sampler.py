@@ -5,6 +5,9 @@ from .finegrained_sampler import *
 
 
 class BaseConfigSampler:
+    # the method to draw the points for prior sampling, chosen from ['random', 'sobol', 'lhs']. It is set by the predictor
+    # builder, and could be ignored by customized samplers.
+    prior_sampling = 'random'
 
     def prior_config_sampling(self, sample_num):
         ''' utilize the prior data to define the configuration sampling from the prior distribution.
@@ -20,7 +23,7 @@ class BaseConfigSampler:
 class ConvSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        return sampling_conv(sample_num)
+        return sampling_conv(sample_num, method=self.prior_sampling)
 
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_conv(configs, sample_num)
@@ -29,7 +32,7 @@ class ConvSampler(BaseConfigSampler):
 class DwConvSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        return sampling_dwconv(sample_num)
+        return sampling_dwconv(sample_num, method=self.prior_sampling)
 
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_dwconv(configs, sample_num)
@@ -38,7 +41,7 @@ class DwConvSampler(BaseConfigSampler):
 class PoolingSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        return sampling_pooling(sample_num)
+        return sampling_pooling(sample_num, method=self.prior_sampling)
 
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_pooling(configs, sample_num)
@@ -48,7 +51,8 @@ class FCSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
         # half samples have fixed cout as 1000, other samples have random cout
-        return sampling_fc(int(sample_num * 0.5), fix_cout = 1000) + sampling_fc(int(sample_num * 0.5), fix_cout = False)
+        return sampling_fc(int(sample_num * 0.5), fix_cout = 1000, method = self.prior_sampling) + \
+               sampling_fc(int(sample_num * 0.5), fix_cout = False, method = self.prior_sampling)
 
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_fc(configs, sample_num)
@@ -57,7 +61,7 @@ class FCSampler(BaseConfigSampler):
 class ConcatSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        return sampling_concats(sample_num)
+        return sampling_concats(sample_num, method=self.prior_sampling)
 
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_concats(configs, sample_num)
@@ -66,7 +70,7 @@ class ConcatSampler(BaseConfigSampler):
 class CinEvenSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        return sampling_hw_cin_even(sample_num)
+        return sampling_hw_cin_even(sample_num, method=self.prior_sampling)
 
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_hw_cin_even(configs, sample_num)
@@ -75,7 +79,7 @@ class CinEvenSampler(BaseConfigSampler):
 class GlobalAvgPoolSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        cfgs = sampling_hw_cin(sample_num)
+        cfgs = sampling_hw_cin(sample_num, method=self.prior_sampling)
         new_hws = [3] * (sample_num // 2 + 1) + [7] * (sample_num // 2 + 1)
         new_hws = new_hws[:len(cfgs)]
         import random; random.shuffle(new_hws)
@@ -89,7 +93,7 @@ class GlobalAvgPoolSampler(BaseConfigSampler):
 class HwCinSampler(BaseConfigSampler):
 
     def prior_config_sampling(self, sample_num):
-        return sampling_hw_cin(sample_num)
+        return sampling_hw_cin(sample_num, method=self.prior_sampling)
     
     def finegrained_config_sampling(self, configs, sample_num):
         return finegrained_sampling_hw_cin(configs, sample_num)
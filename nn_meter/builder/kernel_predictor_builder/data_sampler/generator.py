@@ -5,14 +5,42 @@ import json
 import random
 import string
 import logging
+import multiprocessing
 from nn_meter.builder import builder_config
-from nn_meter.builder.utils import merge_info
+from nn_meter.builder.utils import merge_info, init_generate_worker
 from .utils import get_sampler_for_kernel, generate_model_for_kernel
 logging = logging.getLogger("nn-Meter")
 
 
+def _generate_kernel(task):
+    """ generate and save the model of one kernel config, and return `(id, kernel_info, error)`. If a backend is given for a
+    tensorflow kernel, the Keras model is converted by the backend in memory, and only the converted model is saved.
+    """
+    id, kernel_type, kernel_cfg, model_path, implement, batch_size, backend = task
+    try:
+        fused = backend is not None and implement == 'tensorflow'
+        model, input_tensor_shape, config = generate_model_for_kernel(
+            kernel_type, kernel_cfg, save_path=model_path,
+            implement=implement, batch_size=batch_size, save=not fused
+        )
+        if not fused:
+            return id, {'model': model_path, 'shapes': input_tensor_shape, 'config': config}, None
+        converted_model = backend.convert_keras_model(model, os.path.basename(model_path), os.path.dirname(model_path),
+                                                      input_tensor_shape)
+        return id, {'model': converted_model, 'converted_model': converted_model, 'shapes': input_tensor_shape,
+                    'config': config}, None
+    except Exception as e:
+        return id, None, str(e)
+    finally:
+        if implement == 'tensorflow':
+            # release the graph of the kernel, so that a long-lived worker does not grow with the generated kernels
+            import tensorflow as tf
+            tf.keras.backend.clear_session()
+
+
 class KernelGenerator:
-    def __init__(self, kernel_type, sample_num, mark = ""):
+    def __init__(self, kernel_type, sample_num, mark = "", workers = None, backend = None, kernel_cache = None,
+                 prior_sampling = 'random', profile_kwargs = None):
         self.kernel_type = kernel_type
         self.sample_num = sample_num
         self.workspace_path = builder_config.get('WORKSPACE', 'predbuild')
@@ -23,38 +51,69 @@ class KernelGenerator:
         self.batch_size = builder_config.get('BATCH_SIZE', 'predbuild')
         self.model_suffix = "" if self.implement == 'tensorflow' else ".onnx"
         self.mark = mark
+        self.backend = backend
+        self.kernel_cache = kernel_cache
+        self.profile_kwargs = profile_kwargs
+        self.prior_sampling = prior_sampling
+        self.workers = workers if workers is not None else (builder_config.get('GENERATE_WORKERS', 'predbuild') or 0)
         os.makedirs(self.case_save_path, exist_ok=True)
 
-    def generate_config(self, sampling_mode = 'prior', configs = None):
-        sampled_cfgs = get_sampler_for_kernel(self.kernel_type, self.sample_num, sampling_mode, configs)
+    def generate_config(self, sampling_mode = 'prior', configs = None, predictor = None):
+        sampled_cfgs = get_sampler_for_kernel(self.kernel_type, self.sample_num, sampling_mode, configs, predictor,
+                                              prior_sampling=self.prior_sampling)
         for i in range(len(sampled_cfgs)):
             random_id = ''.join(random.choice(string.ascii_uppercase + string.digits) for _ in range(6))
             self.kernels[random_id] = {}
             self.kernels[random_id]['config'] = sampled_cfgs[i]
 
     def generate_kernel_by_cfg(self):
-        """ generate tensorflow models for sampled data
+        """ generate tensorflow models for sampled data. If `self.workers > 0`, the models are generated in a process pool,
+        where each worker imports the framework once.
         """
         kernel_type = self.kernel_type
         logging.info(f"building kernel for {kernel_type}...")
         count = 0
         error_save_path = os.path.join(self.workspace_path, 'results', 'generate_error.log')
-        for id, value in self.kernels.items():
-            model_path = os.path.join(self.case_save_path, ("_".join([kernel_type, self.mark, id]) + self.model_suffix))
-            kernel_cfg = value['config']
-            try:
-                _, input_tensor_shape, config = generate_model_for_kernel(
-                    kernel_type, kernel_cfg, save_path=model_path,
-                    implement=self.implement, batch_size=self.batch_size
-                )
-                self.kernels[id] = {
-                    'model': model_path,
-                    'shapes': input_tensor_shape,
-                    'config': config
-                }
-                count += 1
-            except Exception as e:
-                open(os.path.join(self.workspace_path, "results", "generate_error.log"), 'a').write(f"{id}: {e}\n")
+        os.makedirs(os.path.dirname(error_save_path), exist_ok=True)
+        tasks = [
+            (id, kernel_type, value['config'],
+             os.path.join(self.case_save_path, ("_".join([kernel_type, self.mark, id]) + self.model_suffix)),
+             self.implement, self.batch_size, self.backend)
+            for id, value in self.kernels.items()
+        ]
+        if self.kernel_cache is not None and self.backend is not None:
+            # the kernels measured before are not generated, and their latency will be read from the cache when profiling
+            from nn_meter.builder.kernel_cache import make_kernel_key
+            identity, uncached = self.backend.identity(), []
+            for task in tasks:
+                id, _, kernel_cfg, model_path = task[:4]
+                key = make_kernel_key(kernel_type, kernel_cfg, identity, self.profile_kwargs)
+                record = self.kernel_cache.get(key)
+                if record is None:
+                    uncached.append(task)
+                else:
+                    self.kernels[id] = {'model': model_path, 'shapes': record['shapes'], 'config': kernel_cfg}
+                    count += 1
+            logging.info(f"{len(tasks) - len(uncached)} {kernel_type} kernels are found in the kernel cache.")
+            tasks = uncached
+        if self.workers > 0 and len(tasks) > 1:
+            # spawn the workers, as forking a process with the framework imported is unsafe
+            pool = multiprocessing.get_context("spawn").Pool(self.workers, initializer=init_generate_worker, initargs=(self.implement, ))
+            results = pool.imap_unordered(_generate_kernel, tasks)
+        else:
+            pool, results = None, map(_generate_kernel, tasks)
+        try:
+            for id, kernel_info, error in results:
+                if error is None:
+                    self.kernels[id] = kernel_info
+                    count += 1
+                else:
+                    logging.info(f"Failed to generate {kernel_type} kernel {id} with config {self.kernels[id]['config']}.")
+                    open(error_save_path, 'a').write(f"{id}: {error}\n")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
 
         # save information to json file in incrementally mode
         info_save_path = os.path.join(self.workspace_path, "results", f"{kernel_type}_{self.mark}.json")
@@ -62,18 +121,19 @@ class KernelGenerator:
         os.makedirs(os.path.dirname(info_save_path), exist_ok=True)
         with open(info_save_path, 'w') as fp:
             json.dump(new_kernels_info, fp, indent=4)
-        logging.keyinfo(f"Generate {len(self.kernels)} kernels and save info to {info_save_path} " \
+        logging.keyinfo(f"Generate {count} of {len(self.kernels)} kernels and save info to {info_save_path} " \
                         f"Failed information are saved in {error_save_path} (if any).")
 
-    def run(self, sampling_mode = 'prior', configs = None):
+    def run(self, sampling_mode = 'prior', configs = None, predictor = None):
         """ sample N configurations for target kernel, generate tensorflow keras model files.
 
         @params
-        sampling_mode: path of the directory containing all experiment runs. choose from ['prior', 'finegrained']
-        configs: init configs for finegrained sampling
+        sampling_mode: path of the directory containing all experiment runs. choose from ['prior', 'finegrained', 'active']
+        configs: init configs for finegrained sampling, or the profiled configs to exclude in active sampling
+        predictor: the current predictor of the kernel for active sampling
         """
         # sample configs
-        self.generate_config(sampling_mode, configs)
+        self.generate_config(sampling_mode, configs, predictor)
         
         # for all sampled configurations, save kernels info and generate tensorflow model files 
         self.generate_kernel_by_cfg()
@@ -81,7 +141,9 @@ class KernelGenerator:
         return self.kernel_info
 
 
-def generate_config_sample(kernel_type, sample_num, mark = '', sampling_mode = 'prior', configs = None):
+def generate_config_sample(kernel_type, sample_num, mark = '', sampling_mode = 'prior', configs = None, workers = None,
+                           backend = None, kernel_cache = None, predictor = None, prior_sampling = 'random',
+                           profile_kwargs = None):
     """ Generate config sample and return sampled configs.
 
     @params
@@ -91,14 +153,37 @@ def generate_config_sample(kernel_type, sample_num, mark = '', sampling_mode = '
 
     mark (str, optional): the mark for the running results. Defaults to ''.
 
-    sampling_mode (str, optional): the sampling mode for config generation, supporting mode includes 'prior' and 'finegrained'.
-        Defaults to be 'prior'.
+    sampling_mode (str, optional): the sampling mode for config generation, supporting mode includes 'prior', 'finegrained' and
+        'active'. In 'active' mode, a large pool of candidate configs is sampled from the prior distribution, and the `sample_num`
+        configs that the trees of `predictor` disagree most on are returned. Defaults to be 'prior'.
 
     configs (list, optional): is required when the sampling_mode=='finegrained'. The fingrained samples will based on the config 
-        in `configs`. Defaults to None.
+        in `configs`. In 'active' mode, the configs in `configs` are excluded from the candidates. Defaults to None.
+
+    workers (int, optional): the number of processes to generate the kernel models in parallel. Defaults to None, i.e., the
+        `GENERATE_WORKERS` in the predictor build configs, and the models are generated in the current process if it is 0.
+
+    backend (subclass instance of BaseBackend, optional): if given, the tensorflow kernel models are converted by
+        `backend.convert_keras_model` right after generation, without saving the Keras models to disk. The path of the converted
+        model is set to both `model` and `converted_model` of the kernel, which could be profiled with `have_converted=True`.
+        Defaults to None.
+
+    kernel_cache (KernelCache, optional): if given together with `backend`, the kernels measured on the backend before are not
+        generated. Defaults to None.
+
+    profile_kwargs (dict, optional): the arguments to profile the kernels by `profile_models`, which are part of the keys of the
+        kernel cache. Defaults to None.
+
+    predictor (optional): is required when the sampling_mode=='active'. The fitted random forest predictor of the kernel.
+        Defaults to None.
+
+    prior_sampling (str, optional): the method to draw the points from the prior distribution in 'prior' and 'active' mode,
+        chosen from ['random', 'sobol', 'lhs']. 'sobol' and 'lhs' apply the inversed cdfs of the prior distribution to
+        low-discrepancy points, which cover the joint config space more evenly than i.i.d. random numbers. Defaults to 'random'.
 
     """
-    generator = KernelGenerator(kernel_type, sample_num, mark=mark)
-    kernels_info = generator.run(sampling_mode=sampling_mode, configs=configs)
+    generator = KernelGenerator(kernel_type, sample_num, mark=mark, workers=workers, backend=backend, kernel_cache=kernel_cache,
+                                prior_sampling=prior_sampling, profile_kwargs=profile_kwargs)
+    kernels_info = generator.run(sampling_mode=sampling_mode, configs=configs, predictor=predictor)
 
     return kernels_info
@@ -1,43 +1,43 @@
 import os
+import functools
 import pandas as pd
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
+@functools.lru_cache(maxsize=None)
+def read_zoo(filename):
+    ''' read the prior data in `filename` once per process, and return a dict of read-only numpy arrays for all columns. The
+    `read_*_zoo` functions return copies of the columns as `pd.Series`, the same as reading the csv file.
+    '''
+    zoo_df = pd.read_csv(os.path.join(BASE_DIR, filename))
+    columns = {}
+    for name in zoo_df.columns:
+        columns[name] = zoo_df[name].to_numpy()
+        columns[name].flags.writeable = False
+    return columns
+
+
+def _read_series(filename, *names):
+    zoo = read_zoo(filename)
+    return tuple(pd.Series(zoo[name], name=name, copy=True) for name in names)
+
+
 def read_conv_zoo(filename = "conv.csv"):
-    filename = os.path.join(BASE_DIR, filename)
-    conv_df = pd.read_csv(filename)
-    hws = conv_df["input_h"]
-    cins = conv_df["cin"]
-    couts = conv_df["cout"]
-    ks = conv_df["ks"]
-    strides = conv_df["stride"]
+    hws, cins, couts, ks, strides = _read_series(filename, "input_h", "cin", "cout", "ks", "stride")
     return hws, cins, couts, ks, strides
 
 
 def read_dwconv_zoo(filename = "dwconv.csv"):
-    filename = os.path.join(BASE_DIR, filename)
-    dwconv_df = pd.read_csv(filename)
-    hws = dwconv_df["input_h"]
-    cins = dwconv_df["cin"]
-    ks = dwconv_df["ks"]
-    strides = dwconv_df["stride"]
+    hws, cins, ks, strides = _read_series(filename, "input_h", "cin", "ks", "stride")
     return hws, cins, ks, strides
 
 
 def read_fc_zoo(filename = "fc.csv"):
-    filename = os.path.join(BASE_DIR, filename)
-    fc_df = pd.read_csv(filename)
-    cins = fc_df["cin"]
-    couts = fc_df["cout"]
+    cins, couts = _read_series(filename, "cin", "cout")
     return cins, couts
 
 
 def read_pool_zoo(filename = "pooling.csv"):
-    filename = os.path.join(BASE_DIR, filename)
-    pool_df = pd.read_csv(filename)
-    hws = pool_df["input_h"]
-    cins = pool_df["cin"]
-    ks = pool_df["ks"]
-    strides = pool_df["stride"]
+    hws, cins, ks, strides = _read_series(filename, "input_h", "cin", "ks", "stride")
     return hws, cins, ks, strides
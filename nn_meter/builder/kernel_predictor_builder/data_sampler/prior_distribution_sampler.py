@@ -1,28 +1,120 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import random
+import functools
 import numpy as np
 from .prior_config_lib.utils import *
 
 
-def inverse_transform_sampling(data, n_bins = 40, n_samples = 1000):
-    ''' calculate inversed cdf, for sampling by possibility
+def unit_samples(count, dims, method = 'random'):
+    ''' draw `count` points from the unit hypercube [0, 1)^dims, with one column for each sampled dimension.
+
+    @params:
+    count: the number of points.
+    dims: the number of dimensions.
+    method: choose from ['random', 'sobol', 'lhs']. 'random' draws i.i.d. uniform numbers, while 'sobol' (scrambled Sobol
+        sequence) and 'lhs' (Latin hypercube) draw low-discrepancy points, which cover the joint space more evenly.
+    '''
+    if method == 'random':
+        return np.random.rand(count, dims)
+    from scipy.stats import qmc
+    seed = np.random.randint(2 ** 31) # follow the seed of numpy
+    if method == 'sobol':
+        # the first `count` of 2^m points of the scrambled sequence. The balance properties of the Sobol sequence only hold for
+        # a power of two `count`, while the points of other counts are still spread more evenly than i.i.d. random numbers
+        m = int(np.ceil(np.log2(max(count, 1))))
+        return qmc.Sobol(d=dims, scramble=True, seed=seed).random_base2(m)[:count]
+    if method == 'lhs':
+        return qmc.LatinHypercube(d=dims, seed=seed).random(count)
+    raise ValueError(f"Unsupported prior sampling method: {method}. Choose from ['random', 'sobol', 'lhs'].")
+
+
+def inverse_cdf(data, n_bins = 40):
+    ''' calculate the inversed cdf of the histogram of data, which is returned as the interpolation points
+    `(cum_values, bin_edges)`
     '''
-    import scipy.interpolate as interpolate
     hist, bin_edges = np.histogram(data, bins=n_bins, density=True)
     cum_values = np.zeros(bin_edges.shape)
     cum_values[1:] = np.cumsum(hist*np.diff(bin_edges))
-    inv_cdf = interpolate.interp1d(cum_values, bin_edges)
-    r = np.random.rand(n_samples)
-    data = inv_cdf(r)
-    ndata = [int(x) for x in data]
-    return ndata
+    return cum_values, bin_edges
+
+
+@functools.lru_cache(maxsize=None)
+def get_prior_distribution(filename, column, n_bins = 40):
+    ''' return the inversed cdf of `column` in the prior data `prior_config_lib/<filename>`. The inversed cdf is calculated once
+    per process.
+    '''
+    return inverse_cdf(read_zoo(filename)[column], n_bins)
+
+
+def apply_inverse_cdf(inv_cdf, n_samples = 1000, uniforms = None):
+    ''' apply the inversed cdf `(cum_values, bin_edges)` to `uniforms`, or to `n_samples` random numbers if `uniforms` is None.
+    Return the samples as an integer array.
+    '''
+    cum_values, bin_edges = inv_cdf
+    r = np.random.rand(n_samples) if uniforms is None else uniforms
+    return np.interp(r, cum_values, bin_edges).astype(int)
+
+
+def inverse_transform_sampling(data, n_bins = 40, n_samples = 1000, uniforms = None):
+    ''' calculate inversed cdf, for sampling by possibility. If `uniforms` is given, the inversed cdf is applied to `uniforms`
+    instead of `n_samples` random numbers.
+    '''
+    return apply_inverse_cdf(inverse_cdf(data, n_bins), n_samples, uniforms).tolist()
+
+
+def sample_based_on_distribution(data, count, uniforms = None):
+    ''' use data to calculate a inversed cdf, and sample `count` data from such distribution. If `uniforms` is given, the
+    samples are the inversed cdf of `uniforms`.
+    '''
+    return inverse_transform_sampling(data, n_samples=count, uniforms=uniforms)
+
+
+def sample_based_on_prior(filename, column, count, uniforms = None):
+    ''' sample `count` data from the cached distribution of `column` in the prior data `prior_config_lib/<filename>`. If
+    `uniforms` is given, the samples are the inversed cdf of `uniforms`. Return the samples as an integer array.
+    '''
+    return apply_inverse_cdf(get_prior_distribution(filename, column), count, uniforms)
+
+
+def sample_based_on_values(data, count, uniforms = None):
+    ''' sample `count` data from the empirical distribution of `data`. If `uniforms` is None, `data` is repeated and shuffled,
+    otherwise the samples are the empirical quantiles of `uniforms`.
+    '''
+    data = np.asarray(data)
+    if uniforms is None:
+        return np.random.permutation(np.tile(data, count // len(data) + 1))[:count]
+    return np.sort(data)[(np.asarray(uniforms) * len(data)).astype(int)]
+
+
+def frequent_settings(count, settings):
+    ''' return the frequently used configuration values, where `settings` is a list of `(value, ratio)`, and each value is
+    repeated `int(count * ratio)` times
+    '''
+    return np.concatenate([np.full(int(count * ratio), value) for value, ratio in settings])
 
 
-def sample_based_on_distribution(data, count):
-    ''' use data to calculate a inversed cdf, and sample `count` data from such distribution
+def shuffle_settings(data, method = 'random', start = 0):
+    ''' shuffle the sampled data mixed with frequent settings in place. For low-discrepancy points, the joint coverage of the
+    points would be broken by shuffling each dimension independently, thus only the frequent settings from index `start` are
+    shuffled.
     '''
-    return inverse_transform_sampling(data, n_samples=count)
+    if method == 'random':
+        np.random.shuffle(data)
+    else:
+        np.random.shuffle(data[start:])
+    return data
+
+
+def snap_to_valid_values(data, cdata):
+    ''' convert sampled data to the nearest valid configuration value in `cdata` by a binary search, and return an array. If a
+    value is in the middle of two valid values, the smaller one is chosen.
+    '''
+    data = np.asarray(data)
+    cdata = np.sort(np.asarray(cdata))
+    index = np.clip(np.searchsorted(cdata, data), 1, len(cdata) - 1)
+    lower, upper = cdata[index - 1], cdata[index]
+    return np.where(data - lower <= upper - data, lower, upper)
 
 
 def data_validation(data, cdata):
@@ -32,56 +124,48 @@ def data_validation(data, cdata):
     data: the origin data value.
     cdata: valid configuration value.
     '''
-    newlist = []
-    for da in cdata:
-        value = [abs(da - x) for x in data]
-        newlist.append(value)
+    return snap_to_valid_values(data, cdata).tolist()
+
 
-    newlist = list(np.asarray(newlist).T)    
-    cda = [list(d).index(min(d)) for d in newlist]
-    redata = [cdata[x] for x in cda]
-    return redata
+def build_configs(**columns):
+    ''' build the config dicts in bulk from the sampled columns, where the keyword is the name of the configuration. The
+    number of configs is the length of the shortest column.
+    '''
+    names = list(columns.keys())
+    values = [np.asarray(column).tolist() for column in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
 
 
-def sampling_conv(count):
-    ''' 
-    Sampling configs for conv kernels based on conv_zoo, which contains configuration values from existing model zoo for conv kernel. 
-    The values are stored in prior_config_lib/conv.csv.
+def sampling_conv(count, method = 'random'):
+    '''
+    Sampling configs for conv kernels based on conv_zoo, which contains configuration values from existing model zoo for conv kernel.
+    The values are stored in prior_config_lib/conv.csv. `method` is the method to draw the points before applying the inversed
+    cdfs, refer to `unit_samples` for details.
     Returned params include: (hw, cin, cout, kernel_size, strides)
     '''
-    hws, cins, couts, kernel_sizes, strides = read_conv_zoo()
-    new_cins = sample_based_on_distribution(cins, count)
-    new_couts = sample_based_on_distribution(couts, count)
+    points = unit_samples(count, 5, method)
+    new_cins = sample_based_on_prior("conv.csv", "cin", count, points[:, 0])
+    new_couts = sample_based_on_prior("conv.csv", "cout", count, points[:, 1])
 
     # 70% of sampled data are from prior distribution
     count1 = int(count * 0.7)
-    new_hws = sample_based_on_distribution(hws, count1)
-    new_kernel_sizes = sample_based_on_distribution(kernel_sizes, count1)
-    new_strides = sample_based_on_distribution(strides, count1)
-
-    new_kernel_sizes = data_validation(new_kernel_sizes, [1, 3, 5, 7])
-    new_strides = data_validation(new_strides, [1, 2, 4])
-    new_hws = data_validation(new_hws, [1, 3, 7, 8, 13, 14, 27, 28, 32, 56, 112, 224])
-    
+    new_hws = sample_based_on_prior("conv.csv", "input_h", count1, points[:count1, 2])
+    new_kernel_sizes = sample_based_on_prior("conv.csv", "ks", count1, points[:count1, 3])
+    new_strides = sample_based_on_prior("conv.csv", "stride", count1, points[:count1, 4])
+
+    new_kernel_sizes = snap_to_valid_values(new_kernel_sizes, [1, 3, 5, 7])
+    new_strides = snap_to_valid_values(new_strides, [1, 2, 4])
+    new_hws = snap_to_valid_values(new_hws, [1, 3, 7, 8, 13, 14, 27, 28, 32, 56, 112, 224])
+
     # since conv is the largest and most-challenging kernel, we add some frequently used configuration values
-    new_hws.extend([112] * int((count - count1) * 0.2) + [56] * int((count - count1) * 0.4) + [28] * int((count - count1) * 0.4)) # frequent settings
-    new_kernel_sizes.extend([5] * int((count - count1) * 0.4) + [7] * int((count - count1) * 0.6)) # frequent settings
-    new_strides.extend([2] * int((count - count1) * 0.4) + [1] * int((count - count1) * 0.6)) # frequent settings
-    random.shuffle(new_hws)
-    random.shuffle(new_strides)
-    random.shuffle(new_kernel_sizes)
+    new_hws = np.concatenate([new_hws, frequent_settings(count - count1, [(112, 0.2), (56, 0.4), (28, 0.4)])])
+    new_kernel_sizes = np.concatenate([new_kernel_sizes, frequent_settings(count - count1, [(5, 0.4), (7, 0.6)])])
+    new_strides = np.concatenate([new_strides, frequent_settings(count - count1, [(2, 0.4), (1, 0.6)])])
+    shuffle_settings(new_hws, method, count1)
+    shuffle_settings(new_strides, method, count1)
+    shuffle_settings(new_kernel_sizes, method, count1)
 
-    ncfgs = []
-    for hw, cin, cout, kernel_size, stride in zip(new_hws, new_cins, new_couts, new_kernel_sizes, new_strides):
-        c = {
-            'HW': hw,
-            'CIN': cin,
-            'COUT': cout,
-            'KERNEL_SIZE': kernel_size,
-            'STRIDES': stride,
-        }
-        ncfgs.append(c)
-    return ncfgs
+    return build_configs(HW=new_hws, CIN=new_cins, COUT=new_couts, KERNEL_SIZE=new_kernel_sizes, STRIDES=new_strides)
 
 
 def sampling_conv_random(count):
@@ -91,7 +175,7 @@ def sampling_conv_random(count):
     hws = [1, 7, 8, 13, 14, 27, 28, 32, 56, 112, 224]
     kernel_sizes = [1, 3, 5, 7]
     strides = [1, 2, 4]
-    
+
     cins = list(range(3, 2160))
     couts = list(range(16, 2048))
     new_hws = random.sample(hws * int(count / len(hws)) * 10, count)
@@ -115,166 +199,114 @@ def sampling_conv_random(count):
     return ncfgs
 
 
-def sampling_dwconv(count):
-    ''' 
-    Sampling configs for dwconv kernels based on dwconv zoo, which contains configuration values from existing model zoo for dwconv kernel. 
+def sampling_dwconv(count, method = 'random'):
+    '''
+    Sampling configs for dwconv kernels based on dwconv zoo, which contains configuration values from existing model zoo for dwconv kernel.
     The values are stored in prior_config_lib/dwconv.csv.
     Returned params include: (hw, cin, kernel_size, strides)
     '''
-    hws, cins, ks, strides = read_dwconv_zoo()
-    new_cins = sample_based_on_distribution(cins, count)
-   
+    points = unit_samples(count, 4, method)
+    new_cins = sample_based_on_prior("dwconv.csv", "cin", count, points[:, 0])
+
     count1 = int(count * 0.8)
-    new_hws = sample_based_on_distribution(hws,count1)
-    new_kernel_sizes = sample_based_on_distribution(ks, count1)
-    new_strides = sample_based_on_distribution(strides, count1)
-    
-    new_hws = data_validation(new_hws, [1, 3, 7, 14, 28, 56, 112, 224])
-    new_kernel_sizes = data_validation(new_kernel_sizes, [1, 3, 5, 7])
-    new_strides = data_validation(new_strides, [1, 2])
-    
-    new_hws.extend([112] * int((count - count1) * 0.4) + [56] * int((count - count1) * 0.4) + [28] * int((count - count1) * 0.2))  
-    new_kernel_sizes.extend([5] * int((count - count1) * 0.4) + [7] * int((count - count1) * 0.6))
-    new_strides.extend([2] * int((count - count1) * 0.5) + [1] * int((count - count1) * 0.5))
-    random.shuffle(new_hws)
-    random.shuffle(new_kernel_sizes)
-    random.shuffle(new_strides)
+    new_hws = sample_based_on_prior("dwconv.csv", "input_h", count1, points[:count1, 1])
+    new_kernel_sizes = sample_based_on_prior("dwconv.csv", "ks", count1, points[:count1, 2])
+    new_strides = sample_based_on_prior("dwconv.csv", "stride", count1, points[:count1, 3])
 
-    ncfgs = []
-    for hw, cin, kernel_size, stride in zip(new_hws, new_cins, new_kernel_sizes, new_strides):
-        c = {
-            'HW': hw,
-            'CIN': cin,
-            'KERNEL_SIZE': kernel_size,
-            'STRIDES': stride,
-        }
-        ncfgs.append(c)
-    return ncfgs
+    new_hws = snap_to_valid_values(new_hws, [1, 3, 7, 14, 28, 56, 112, 224])
+    new_kernel_sizes = snap_to_valid_values(new_kernel_sizes, [1, 3, 5, 7])
+    new_strides = snap_to_valid_values(new_strides, [1, 2])
+
+    new_hws = np.concatenate([new_hws, frequent_settings(count - count1, [(112, 0.4), (56, 0.4), (28, 0.2)])])
+    new_kernel_sizes = np.concatenate([new_kernel_sizes, frequent_settings(count - count1, [(5, 0.4), (7, 0.6)])])
+    new_strides = np.concatenate([new_strides, frequent_settings(count - count1, [(2, 0.5), (1, 0.5)])])
+    shuffle_settings(new_hws, method, count1)
+    shuffle_settings(new_kernel_sizes, method, count1)
+    shuffle_settings(new_strides, method, count1)
 
+    return build_configs(HW=new_hws, CIN=new_cins, KERNEL_SIZE=new_kernel_sizes, STRIDES=new_strides)
 
-def sampling_fc(count, fix_cout = 1000):
+
+def sampling_fc(count, fix_cout = 1000, method = 'random'):
     '''
-    Sampling configs for fc kernels based on fc zoo, which contains configuration values from existing model zoo for fc kernel. 
+    Sampling configs for fc kernels based on fc zoo, which contains configuration values from existing model zoo for fc kernel.
     The values are stored in prior_config_lib/fcs.csv.
     Returned params include: (cin, cout)
     '''
-    cins, couts = read_fc_zoo()
-    new_cins = sample_based_on_distribution(cins, count)
+    points = unit_samples(count, 2, method)
+    new_cins = sample_based_on_prior("fc.csv", "cin", count, points[:, 0])
     if not fix_cout:
-        new_couts = sample_based_on_distribution(couts, count)
+        new_couts = sample_based_on_prior("fc.csv", "cout", count, points[:, 1])
     else:
-        new_couts = [fix_cout] * count
-    ncfgs = []
-    for cin, cout in zip(new_cins, new_couts):
-        c = {
-            'CIN': cin,
-            'COUT': cout,
-        }
-        ncfgs.append(c)
-    return ncfgs
+        new_couts = np.full(count, fix_cout)
+    return build_configs(CIN=new_cins, COUT=new_couts)
 
 
-def sampling_pooling(count):
+def sampling_pooling(count, method = 'random'):
     '''
-    Sampling configs for pooling kernels based on pooling zoo, which contains configuration values from existing model zoo for pooling kernel. 
+    Sampling configs for pooling kernels based on pooling zoo, which contains configuration values from existing model zoo for pooling kernel.
     The values are stored in prior_config_lib/pooling.csv.
     Returned params include: (hw, cin, kernel_size, pool_strides)
     '''
-    hws, cins, kernel_size, strides = read_pool_zoo()
-    new_cins = sample_based_on_distribution(cins, count)
-    new_hws = sample_based_on_distribution(hws, count)
-    new_hws = data_validation(new_hws, [14, 28, 56, 112, 224])
-    new_kernel_sizes = list(kernel_size) * (count // len(kernel_size) + 1)
-    new_kernel_sizes = data_validation(new_kernel_sizes, [2, 3])
-    random.shuffle(new_kernel_sizes)
-    new_strides = list(strides) * (count // len(strides) + 1)
-    new_strides = data_validation(new_strides, [1, 2])
-    random.shuffle(new_strides)
-    
-    ncfgs = []
-    for hw, cin, kernel_size, stride in zip(new_hws, new_cins, new_kernel_sizes, new_strides):
-        c = {
-            'HW': hw,
-            'CIN': cin,
-            'KERNEL_SIZE': kernel_size,
-            'STRIDES': stride,
-        }
-        ncfgs.append(c)
-    return ncfgs
+    pool_zoo = read_zoo("pooling.csv")
+    kernel_size, strides = pool_zoo["ks"], pool_zoo["stride"]
+    points = unit_samples(count, 4, method)
+    new_cins = sample_based_on_prior("pooling.csv", "cin", count, points[:, 0])
+    new_hws = sample_based_on_prior("pooling.csv", "input_h", count, points[:, 1])
+    new_hws = snap_to_valid_values(new_hws, [14, 28, 56, 112, 224])
+    new_kernel_sizes = sample_based_on_values(kernel_size, count, points[:, 2] if method != 'random' else None)
+    new_kernel_sizes = snap_to_valid_values(new_kernel_sizes, [2, 3])
+    new_strides = sample_based_on_values(strides, count, points[:, 3] if method != 'random' else None)
+    new_strides = snap_to_valid_values(new_strides, [1, 2])
+
+    return build_configs(HW=new_hws, CIN=new_cins, KERNEL_SIZE=new_kernel_sizes, STRIDES=new_strides)
 
 
-def sampling_hw_cin(count):
+def sampling_hw_cin(count, method = 'random'):
     ''' sampling configs for kernels with hw and cin parameter
     Returned params include: (hw, cin)
     '''
-    hws, cins, _, _, _ = read_conv_zoo()
-    new_cins = sample_based_on_distribution(cins, count)
-   
+    points = unit_samples(count, 2, method)
+    new_cins = sample_based_on_prior("conv.csv", "cin", count, points[:, 0])
+
     count1 = int(count * 0.8)
-    new_hws = sample_based_on_distribution(hws,count1)
-    new_hws = data_validation(new_hws, [1, 3, 7, 14, 28, 56, 112, 224])
-    new_hws.extend([112] * int((count - count1) * 0.4) + [56] * int((count - count1) * 0.4) + [28] * int((count - count1) * 0.2))
-    random.shuffle(new_hws)
+    new_hws = sample_based_on_prior("conv.csv", "input_h", count1, points[:count1, 1])
+    new_hws = snap_to_valid_values(new_hws, [1, 3, 7, 14, 28, 56, 112, 224])
+    new_hws = np.concatenate([new_hws, frequent_settings(count - count1, [(112, 0.4), (56, 0.4), (28, 0.2)])])
+    shuffle_settings(new_hws, method, count1)
 
-    ncfgs = []
-    for hw, cin in zip(new_hws, new_cins):
-        c = {
-            'HW': hw,
-            'CIN': cin,
-        }
-        ncfgs.append(c)
-    return ncfgs
+    return build_configs(HW=new_hws, CIN=new_cins)
 
 
-def sampling_hw_cin_even(count):
+def sampling_hw_cin_even(count, method = 'random'):
     ''' sampling configs for kernels with hw and cin (only even values) parameter, in case for split / se / channelshuffle
     Returned params include: (hw, cin)
     '''
-    hws, cins, _, _, _ = read_conv_zoo()
-    new_cins = sample_based_on_distribution(cins, count)
-   
+    points = unit_samples(count, 2, method)
+    new_cins = sample_based_on_prior("conv.csv", "cin", count, points[:, 0])
+
     count1 = int(count * 0.8)
-    new_hws = sample_based_on_distribution(hws,count1)
-    new_hws = data_validation(new_hws, [1, 3, 7, 14, 28, 56, 112, 224])
-    new_hws.extend([112] * int((count - count1) * 0.4) + [56] * int((count - count1) * 0.4) + [28] * int((count - count1) * 0.2))
-    random.shuffle(new_hws)
+    new_hws = sample_based_on_prior("conv.csv", "input_h", count1, points[:count1, 1])
+    new_hws = snap_to_valid_values(new_hws, [1, 3, 7, 14, 28, 56, 112, 224])
+    new_hws = np.concatenate([new_hws, frequent_settings(count - count1, [(112, 0.4), (56, 0.4), (28, 0.2)])])
+    shuffle_settings(new_hws, method, count1)
 
-    ncfgs = []
-    for hw, cin in zip(new_hws, new_cins):
-        c = {
-            'HW': hw,
-            'CIN': cin + 1 if cin % 2 else cin,
-        }
-        ncfgs.append(c)
-    return ncfgs
+    # round the odd cins up to even values
+    return build_configs(HW=new_hws, CIN=new_cins + new_cins % 2)
 
 
-def sampling_concats(count):
+def sampling_concats(count, method = 'random'):
     ''' sampling functions for concat kernel
     Returned params include: (hw, ns, cin1, cin2, cin3, cin4), ns are in [2, 4]
     '''
-    hws, cins, _, _, _ = read_conv_zoo()
-    new_hws = sample_based_on_distribution(hws, count)
-    new_cins1 = sample_based_on_distribution(cins, count)
-    new_cins2 = sample_based_on_distribution(cins, count)
-    new_cins3 = sample_based_on_distribution(cins, count)
-    new_cins4 = sample_based_on_distribution(cins, count)
+    points = unit_samples(count, 5, method)
+    new_hws = sample_based_on_prior("conv.csv", "input_h", count, points[:, 0])
+    new_cins = [sample_based_on_prior("conv.csv", "cin", count, points[:, i]) for i in range(1, 5)]
 
-    new_hws = data_validation(new_hws, [7, 14, 28, 56])  # current normals
-    new_ns = [2] * (count - int(count * 0.4) - int(count * 0.2)) + [3] * int(count * 0.2) + [4] * int(count * 0.4)
-    random.shuffle(new_ns)
+    new_hws = snap_to_valid_values(new_hws, [7, 14, 28, 56])  # current normals
+    new_ns = np.repeat([2, 3, 4], [count - int(count * 0.4) - int(count * 0.2), int(count * 0.2), int(count * 0.4)])
+    np.random.shuffle(new_ns)
 
-    ncfgs = []
-    for hw, n, cin1, cin2, cin3, cin4 in zip(new_hws, new_ns, new_cins1, new_cins2, new_cins3, new_cins4):
-        cins = [cin1, cin2, cin3, cin4]
-        onehot = [1] * n + [0] * (4 - n)
-        onehot_cins = [x * y for x, y in zip(onehot, cins)]
-        c = {
-            'HW': hw,
-            'CIN1': onehot_cins[0],
-            'CIN2': onehot_cins[1],
-            'CIN3': onehot_cins[2],
-            'CIN4': onehot_cins[3]
-        }
-        ncfgs.append(c)
-    return ncfgs
+    # the i-th input exists only if the number of inputs is larger than i, otherwise its cin is 0
+    new_cins = [cins * (new_ns > i) for i, cins in enumerate(new_cins)]
+    return build_configs(HW=new_hws, CIN1=new_cins[0], CIN2=new_cins[1], CIN3=new_cins[2], CIN4=new_cins[3])
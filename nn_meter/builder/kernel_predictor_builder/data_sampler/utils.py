@@ -55,8 +55,8 @@ if os.path.isfile(os.path.join(__user_config_folder__, __registry_cfg_filename__
         __REG_KERNELS__ = registry_modules["kernels"]
 
 
-def generate_model_for_kernel(kernel_type, config, save_path, implement='tensorflow', batch_size=1):
-    """ get the nn model for predictor build.
+def generate_model_for_kernel(kernel_type, config, save_path, implement='tensorflow', batch_size=1, save=True):
+    """ get the nn model for predictor build. If `save` is False, the model is not saved to `save_path`.
     """
     # get kernel class information
     if kernel_type in __REG_KERNELS__:
@@ -85,14 +85,17 @@ def generate_model_for_kernel(kernel_type, config, save_path, implement='tensorf
     model = kernel_class.get_model()
 
     # save model file to savepath
-    kernel_class.save_model(save_path)
-    logging.info(f"{kernel_type} model is generated and saved to {save_path}.")
+    if save:
+        kernel_class.save_model(save_path)
+        logging.info(f"{kernel_type} model is generated and saved to {save_path}.")
 
     return model, input_tensor_shape, config
 
 
-def get_sampler_for_kernel(kernel_type, sample_num, sampling_mode, configs = None):
-    """ return the list of sampled data configurations in prior and finegrained sampling mode
+def get_sampler_for_kernel(kernel_type, sample_num, sampling_mode, configs = None, predictor = None, prior_sampling = 'random'):
+    """ return the list of sampled data configurations in prior, finegrained and active sampling mode. In active sampling mode,
+    `predictor` is the current predictor of the kernel, and `configs` are the configs profiled before. `prior_sampling` is the
+    method to draw points from the prior distribution, chosen from ['random', 'sobol', 'lhs'].
     """
     # get kernel sampler class information
     if kernel_type in __REG_KERNELS__:
@@ -106,6 +109,7 @@ def get_sampler_for_kernel(kernel_type, sample_num, sampling_mode, configs = Non
 
     # get kernel class and create kernel instance by needed_config
     sampler_class = getattr(sampler_module, sampler_name)()
+    sampler_class.prior_sampling = prior_sampling
 
     # initialize sampling, based on prior distribution
     if sampling_mode == 'prior':
@@ -113,6 +117,12 @@ def get_sampler_for_kernel(kernel_type, sample_num, sampling_mode, configs = Non
     # fine-grained sampling for data with large error points
     elif sampling_mode == 'finegrained':
         sampled_cfgs = sampler_class.finegrained_config_sampling(configs, sample_num)
+    # active sampling for data with the most uncertain prediction
+    elif sampling_mode == 'active':
+        from .active_sampler import active_config_sampling
+        sampled_cfgs = active_config_sampling(kernel_type, sampler_class, predictor, sample_num, exclude_configs=configs)
+    else:
+        raise ValueError(f"Unsupported sampling mode: {sampling_mode}. Choose from ['prior', 'finegrained', 'active'].")
     return sampled_cfgs
 
 
@@ -1,5 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 from .build_predictor import build_predictor_by_data
+from .trainer import PredictorTrainer, build_predictors_by_data
+from .predictor_lib import register_regressor, list_regressors
+from .benchmark import benchmark_regressors
 from .extract_feature import get_data_by_profiled_results, BaseFeatureParser
 from .utils import collect_kernel_data
\ No newline at end of file
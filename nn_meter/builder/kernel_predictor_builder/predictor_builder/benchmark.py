@@ -0,0 +1,65 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import time
+import pickle
+import logging
+from sklearn.model_selection import train_test_split
+from .utils import collect_kernel_data, latency_metrics
+from .predictor_lib import init_predictor, list_regressors
+from .extract_feature import get_feature_parser, _get_data_arrays
+logging = logging.getLogger("nn-Meter")
+
+
+def benchmark_regressors(kernel_type, kernel_data, backend = None, regressors = None, predict_label = "latency",
+                         predict_rows = 200):
+    """
+    benchmark the regressors for the kernel predictor on the profiled data, to choose the regressor of each kernel. The data
+    are split into training and test data as 8:2, the same as `build_predictor_by_data`. Returns a list of dicts, with one dict
+    of `regressor`, `rmspe`, `acc10`, `train_time` (seconds), `predict_latency` (milliseconds to predict a single row) and
+    `model_size` (bytes of the pickled model) for each regressor.
+
+    @params
+    kernel_type (str): type of target kernel
+
+    kernel_data (tuple or dict): the profiled data of the kernel, the same as in `build_predictor_by_data`
+
+    backend (str): target device, relative to predictor initialization
+
+    regressors (list): the names of the regressors to benchmark. Defaults to None, i.e., all regressors in `list_regressors()`.
+
+    predict_label (str): the predicting label to build kernel predictor
+
+    predict_rows (int): the number of test rows to measure the latency of single row prediction
+    """
+    feature_parser = get_feature_parser(kernel_type)
+    kernel_data = collect_kernel_data(kernel_data, predict_label)
+    X, Y = _get_data_arrays(kernel_type, feature_parser, kernel_data, predict_label=predict_label)
+    trainx, testx, trainy, testy = train_test_split(X, Y, test_size = 0.2, random_state = 10)
+    logging.info(f"training data size: {len(trainx)}, test data size: {len(testx)}")
+
+    results = []
+    for regressor in regressors or list_regressors():
+        predictor = init_predictor(kernel_type, backend, regressor=regressor)
+        start = time.time()
+        predictor.fit(trainx, trainy)
+        train_time = time.time() - start
+
+        _, rmspe, _, _, acc10, _ = latency_metrics(predictor.predict(testx), testy)
+        rows = testx[:predict_rows]
+        start = time.perf_counter()
+        for row in rows:
+            predictor.predict([row])
+        predict_latency = (time.perf_counter() - start) / len(rows) * 1000
+        model_size = len(pickle.dumps(predictor))
+
+        results.append({
+            "regressor": regressor,
+            "rmspe": float(rmspe),
+            "acc10": float(acc10),
+            "train_time": train_time,
+            "predict_latency": predict_latency,
+            "model_size": model_size,
+        })
+        logging.result(f"[{kernel_type}] {regressor}: rmspe {rmspe:.4f}; 10% accuracy {acc10:.4f}; train time {train_time:.2f} s; "
+                       f"predict latency {predict_latency:.3f} ms/row; model size {model_size / 1024:.1f} KB.")
+    return results
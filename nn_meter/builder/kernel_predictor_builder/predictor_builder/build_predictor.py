@@ -1,16 +1,31 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import os
+import time
+import zlib
+import numpy as np
 import pandas as pd
 import logging
 from sklearn.model_selection import train_test_split
 from .utils import collect_kernel_data, latency_metrics
-from .predictor_lib import init_predictor
-from .extract_feature import get_feature_parser, get_data_by_profiled_results
+from .predictor_lib import init_predictor, refit_predictor, RandomForestRegressor
+from .extract_feature import get_feature_parser, _get_data_arrays
 logging = logging.getLogger("nn-Meter")
 
 
-def build_predictor_by_data(kernel_type, kernel_data, backend = None, error_threshold = 0.1, mark = '', save_path = None, predict_label = "latency", final_predictor=False):
+def split_by_feature_hash(X, Y, test_size = 0.2):
+    """ split the data into training and test data by the hash of the features. Each data stays in the same split when more data
+    are added, thus the trees fitted in previous iterations never see the test data of the following iterations.
+    """
+    X, Y = np.asarray(X, dtype=float), np.asarray(Y)
+    is_test = np.fromiter((zlib.crc32(x.tobytes()) % 100 < test_size * 100 for x in X), dtype=bool, count=len(X))
+    if is_test.all() or not is_test.any(): # too few data to split by hash
+        return train_test_split(X, Y, test_size = test_size, random_state = 10)
+    return X[~is_test], X[is_test], Y[~is_test], Y[is_test]
+
+
+def build_predictor_by_data(kernel_type, kernel_data, backend = None, error_threshold = 0.1, mark = '', save_path = None, predict_label = "latency", final_predictor=False,
+                            n_jobs = None, incremental = False, warm_start_predictor = None, regressor = None):
     """
     build regression model by sampled data and latency, locate data with large-errors. Returns (current predictor, 10% Accuracy, error_cfgs), 
     where error_cfgs represent configuration list, where each item is a configuration for one large-error-data.
@@ -30,6 +45,17 @@ def build_predictor_by_data(kernel_type, kernel_data, backend = None, error_thre
     save_path (str): the folder to save results file such as feature table and predictor pkl file. If save_path is None, the data will not be saved.
     
     predict_label (str): the predicting label to build kernel predictor
+
+    n_jobs (int): the number of jobs to train the predictor. Defaults to None, i.e., the `n_jobs` in the predictor params.
+
+    incremental (bool): whether to split the data by the hash of features, so that each data stays in the same split as more
+        data are profiled. It is required to refit the predictor incrementally in the following iterations. Defaults to False.
+
+    warm_start_predictor (RandomForestRegressor): the predictor built with `incremental=True` in the previous iteration. If
+        given, the predictor is refitted incrementally on the grown data by `refit_predictor`, instead of fitted from scratch.
+
+    regressor (str): the name of the regressor, chosen from `list_regressors()`. Defaults to None, i.e., "random_forest". Only
+        the random forest predictors could be refitted incrementally.
     """
     feature_parser = get_feature_parser(kernel_type)
     if save_path:
@@ -44,31 +70,42 @@ def build_predictor_by_data(kernel_type, kernel_data, backend = None, error_thre
         pred_save_path = None
 
     kernel_data = collect_kernel_data(kernel_data, predict_label)
-    data = get_data_by_profiled_results(kernel_type, feature_parser, kernel_data,
-                                        save_path=data_save_path,
-                                        predict_label=predict_label)
+    data = _get_data_arrays(kernel_type, feature_parser, kernel_data,
+                            save_path=data_save_path,
+                            predict_label=predict_label)
 
     acc10, error_configs = None, None
     X, Y = data
-    # initialize the regression model based on `RandomForestRegressor`
-    predictor = init_predictor(kernel_type, backend)
+    start = time.time()
 
     if final_predictor:
-        predictor.fit(X, Y)
+        trainx, trainy = X, Y
     else:
         # get data for regression
-        trainx, testx, trainy, testy = train_test_split(X, Y, test_size = 0.2, random_state = 10)
+        if incremental or warm_start_predictor is not None:
+            trainx, testx, trainy, testy = split_by_feature_hash(X, Y, test_size = 0.2)
+        else:
+            trainx, testx, trainy, testy = train_test_split(X, Y, test_size = 0.2, random_state = 10)
         logging.info(f"training data size: {len(trainx)}, test data size: {len(testx)}")
 
-        # start training
+    # start training
+    if isinstance(warm_start_predictor, RandomForestRegressor) and len(trainx) > getattr(warm_start_predictor, "train_size_", len(trainx)):
+        predictor, n_refit = refit_predictor(warm_start_predictor, trainx, trainy, n_jobs=n_jobs)
+        logging.info(f"Refitted {n_refit} of {predictor.n_estimators} trees of the predictor for {kernel_type}.")
+    else:
+        # initialize the regression model, which defaults to `RandomForestRegressor`
+        predictor = init_predictor(kernel_type, backend, n_jobs=n_jobs, regressor=regressor)
         predictor.fit(trainx, trainy)
+    predictor.train_size_ = len(trainx)
+
+    if not final_predictor:
         predicts = predictor.predict(testx)
-        pred_error_list = [abs(y1 - y2) / y1 for y1, y2 in zip(testy, predicts)]
+        pred_error_list = np.abs(testy - predicts) / testy
         rmse, rmspe, error, acc5, acc10, acc15 = latency_metrics(predicts, testy)
         logging.info(f"rmse: {rmse:.4f}; rmspe: {rmspe:.4f}; error: {error:.4f}; 5% accuracy: {acc5:.4f}; 10% accuracy: {acc10:.4f}; 15% accuracy: {acc15:.4f}.")
         
         # dump the test set with predicts to csv file
-        test_res = pd.DataFrame(testx, columns=[f'feature{i}' for i in range(len(testx[0]))])
+        test_res = pd.DataFrame(testx, columns=[f'feature{i}' for i in range(testx.shape[1])])
         test_res["True"] = testy
         test_res["Pred"] = predicts
         test_res["Error"] = pred_error_list
@@ -77,11 +114,9 @@ def build_predictor_by_data(kernel_type, kernel_data, backend = None, error_thre
             logging.info(f"All test data and predicted results are stored in path {res_save_path}")
 
         # locate large error data
-        error_configs = []
-        for i in range(len(testx)):
-            if pred_error_list[i] > error_threshold:
-                error_config = feature_parser.get_config_by_feature(testx[i])
-                error_configs.append(error_config)
+        error_configs = feature_parser.get_configs_by_features(testx[pred_error_list > error_threshold])
+
+    logging.info(f"Trained the predictor for {kernel_type} in {time.time() - start:.1f} seconds.")
 
     # dump the predictor model
     if pred_save_path:
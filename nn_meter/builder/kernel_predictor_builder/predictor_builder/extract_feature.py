@@ -6,6 +6,7 @@ import yaml
 import json
 import logging
 import importlib
+import numpy as np
 from nn_meter.builder.backend_meta.utils import read_profiled_results
 logging = logging.getLogger("nn-Meter")
 
@@ -58,6 +59,33 @@ if os.path.isfile(os.path.join(__user_config_folder__, __registry_cfg_filename__
         __REG_KERNELS__ = registry_modules["kernels"]
 
 
+def _columnar(parser, method, columnar_method):
+    """ whether `parser` implements `method` by its columnar version `columnar_method`. The customized parsers which only
+    override the row version are applied to the rows one by one.
+    """
+    for cls in type(parser).__mro__:
+        if method in vars(cls):
+            return columnar_method in vars(cls) or cls is BaseFeatureParser
+    return False
+
+
+def _to_columns(features):
+    """ split the feature matrix into columns, where the columns of integral values are restored to int
+    """
+    columns = []
+    for column in np.asarray(features, dtype=float).T:
+        if np.all(np.isfinite(column)) and np.all(column == np.round(column)):
+            column = column.astype(np.int64)
+        columns.append(column)
+    return columns
+
+
+def _to_rows(features):
+    """ convert the feature matrix to a list of feature lists, where the columns of integral values are restored to int
+    """
+    return [list(row) for row in zip(*[column.tolist() for column in _to_columns(features)])]
+
+
 class BaseFeatureParser:
     def __init__(self, kernel_type):
         self.kernel_type = kernel_type
@@ -74,6 +102,38 @@ class BaseFeatureParser:
         config = {k: v for k, v in zip(self.needed_config, feature)}
         return config
 
+    def get_config_columns(self, configs):
+        """ load the needed config of all configs into a dict of float numpy columns. The missing values are NaN.
+        """
+        columns = {}
+        for name in dict.fromkeys(self.needed_config):
+            columns[name] = np.fromiter((config.get(name, np.nan) for config in configs), dtype=float, count=len(configs))
+        if "COUT" in columns and "CIN" in columns:
+            columns["COUT"] = np.where(np.isnan(columns["COUT"]), columns["CIN"], columns["COUT"])
+        return columns
+
+    def get_features_by_configs(self, configs):
+        """ convert a list of config dicts to a feature matrix of shape `(len(configs), n_features)`. The rows of the configs
+        that could not be parsed are NaN.
+        """
+        if not _columnar(self, "get_feature_by_config", "get_features_by_configs"):
+            features = []
+            for config in configs:
+                try:
+                    features.append(self.get_feature_by_config(dict(config)))
+                except:
+                    features.append(None)
+            n_features = next((len(feature) for feature in features if feature is not None), 0)
+            return np.array([feature if feature is not None else [np.nan] * n_features for feature in features],
+                            dtype=float).reshape(len(configs), n_features)
+        columns = self.get_config_columns(configs)
+        return np.column_stack([columns[name] for name in self.needed_config]).reshape(len(configs), len(self.needed_config))
+
+    def get_configs_by_features(self, features):
+        """ convert a feature matrix to a list of config dicts
+        """
+        return [self.get_config_by_feature(feature) for feature in _to_rows(features)]
+
 
 class FlopsParamParser(BaseFeatureParser):
     def get_feature_by_config(self, config_dict):
@@ -94,6 +154,16 @@ class FlopsParamParser(BaseFeatureParser):
         config = {k: v for k, v in zip(self.needed_config, feature)}
         return config
 
+    def get_features_by_configs(self, configs):
+        if not _columnar(self, "get_feature_by_config", "get_features_by_configs"):
+            return super().get_features_by_configs(configs)
+        # the flops and params formulas are element-wise, thus applied to the config columns directly
+        columns = self.get_config_columns(configs)
+        from .utils import get_flops_params
+        flop, param = get_flops_params(self.kernel_type, columns)
+        features = [columns[name] for name in self.needed_config] + [flop / 2e6, param / 1e6]
+        return np.column_stack(features).reshape(len(configs), len(features))
+
 
 def get_feature_parser(kernel_type):
     if kernel_type in __REG_KERNELS__:
@@ -111,7 +181,9 @@ def get_feature_parser(kernel_type):
 
 def get_data_by_profiled_results(kernel_type, feature_parser, cfgs_path, labs_path = None,
                                  save_path = None, predict_label = "latency"):
-    ''' return (features, latency)
+    ''' return (features, latency), where features is a list of feature lists and latency is a list of labels. The configs are
+    loaded into columns, and the features are computed by `feature_parser.get_features_by_configs` on all configs at once.
+
     kernel_type (str): type of kernel
     
     feature_parser (subclass instance of BaseFeatureParser) the parser containing the feature parsing script
@@ -147,6 +219,14 @@ def get_data_by_profiled_results(kernel_type, feature_parser, cfgs_path, labs_pa
 
     predict_label (str): the predicting label to build kernel predictor
     '''
+    features, labs = _get_data_arrays(kernel_type, feature_parser, cfgs_path, labs_path, save_path, predict_label)
+    return (_to_rows(features), labs.tolist())
+
+
+def _get_data_arrays(kernel_type, feature_parser, cfgs_path, labs_path = None, save_path = None, predict_label = "latency"):
+    ''' the same as `get_data_by_profiled_results`, but return (features, latency) as numpy arrays of shape `(n, n_features)`
+    and `(n,)`, which are used to train the predictors without converting to lists
+    '''
     if labs_path == None:
         if type(cfgs_path) == tuple:
             cfgs_path, labs_path = cfgs_path
@@ -159,35 +239,38 @@ def get_data_by_profiled_results(kernel_type, feature_parser, cfgs_path, labs_pa
         cfgs_dict = cfgs_path[kernel_type] if kernel_type in cfgs_path else cfgs_path
     if isinstance(labs_path, str):
         with open(labs_path, 'r') as fp:
-            labs_dict = read_profiled_results(json.load(fp))[kernel_type]
+            labs_dict = read_profiled_results(json.load(fp), inplace=True)[kernel_type]
     else:
         labs_dict = labs_path[kernel_type] if kernel_type in labs_path else labs_path
 
-    paths, features, labs = [], [], []
-    for id in labs_dict.keys():
+    # load the configs and labels of the profiled models into columns
+    paths, configs, labs = [], [], []
+    for id, lab in labs_dict.items():
         try:
-            path = cfgs_dict[id]["model"]
-            configs = cfgs_dict[id]["config"]
-            feature = feature_parser.get_feature_by_config(configs)
-            if predict_label == "latency":
-                label = labs_dict[id]["latency"].avg
-            else:
-                label = labs_dict[id][predict_label]
-            if label != 0.0:
-                paths.append(os.path.basename(path))
-                features.append(feature)
-                labs.append(label)
+            label = lab["latency"].avg if predict_label == "latency" else lab[predict_label]
+            cfg = cfgs_dict[id]
+            path, config = cfg["model"], cfg["config"]
         except:
-            pass
+            continue
+        paths.append(path)
+        configs.append(config)
+        labs.append(label)
+    features = feature_parser.get_features_by_configs(configs)
+    labs = np.asarray(labs, dtype=float)
+
+    # drop the models with zero label or the configs which could not be parsed
+    valid = (labs != 0.0) & ~np.isnan(features).any(axis=1)
+    features, labs = features[valid], labs[valid]
 
     # save features and latency information to `save_path`
     if save_path:
        import pandas as pd
        cols = feature_parser.needed_config[:]
-       if len(features[0]) - len(feature_parser.needed_config) > 0: # there are extra features beyond needed config
-           cols += [f'feature_{i}' for i in range(len(features[0]) - len(feature_parser.needed_config))]
-       data_df = pd.DataFrame(features, columns=cols)
-       data_df = pd.concat([pd.DataFrame(paths, columns=["model_path"]), data_df], axis=1)
+       if features.shape[1] - len(feature_parser.needed_config) > 0: # there are extra features beyond needed config
+           cols += [f'feature_{i}' for i in range(features.shape[1] - len(feature_parser.needed_config))]
+       data_df = pd.DataFrame(dict(enumerate(_to_columns(features))), index=range(len(labs)))
+       data_df.columns = cols
+       data_df.insert(0, "model_path", [os.path.basename(path) for path, v in zip(paths, valid) if v])
        data_df[predict_label] = labs
        data_df.to_csv(save_path, index=False)
        logging.info(f'Saved the feature table of all data for {kernel_type} in path {save_path}.')
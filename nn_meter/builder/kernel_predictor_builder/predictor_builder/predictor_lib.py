@@ -1,5 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import copy
+import math
+import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 
 
@@ -421,7 +424,7 @@ __PREDICTOR_ZOO__ = {
 }
 
 
-def init_predictor(kernel_type, backend):
+def _init_random_forest(kernel_type, backend, n_jobs = None):
     try:
         model_param = __PREDICTOR_ZOO__[kernel_type][backend]
         model = RandomForestRegressor(**model_param)
@@ -431,8 +434,92 @@ def init_predictor(kernel_type, backend):
             n_estimators = 370,
             min_samples_leaf = 1,
             min_samples_split = 2,
-            max_features = "auto",
+            max_features = 1.0, # all features, the same as "auto" of the removed sklearn option
             oob_score = True,
             random_state = 10,
         )
+    if n_jobs is not None:
+        model.set_params(n_jobs=n_jobs)
     return model
+
+
+def _log_target(regressor):
+    # fit the log latency, as the predictors are evaluated by relative errors
+    from sklearn.compose import TransformedTargetRegressor
+    return TransformedTargetRegressor(regressor, func=np.log, inverse_func=np.exp)
+
+
+def _init_hist_gradient_boosting(kernel_type, backend, n_jobs = None):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return _log_target(HistGradientBoostingRegressor(max_iter=500, max_leaf_nodes=63, random_state=10))
+
+
+def _init_ridge(kernel_type, backend, n_jobs = None):
+    # a power law of the features (including FLOPs and params for conv, dwconv and fc kernels) by ridge on the log features
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import FunctionTransformer, StandardScaler
+    return _log_target(make_pipeline(FunctionTransformer(np.log1p), StandardScaler(), Ridge(alpha=1e-3)))
+
+
+def _init_mlp(kernel_type, backend, n_jobs = None):
+    from sklearn.neural_network import MLPRegressor
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import FunctionTransformer, StandardScaler
+    return _log_target(make_pipeline(
+        FunctionTransformer(np.log1p), StandardScaler(),
+        MLPRegressor(hidden_layer_sizes=(64, 64), max_iter=1000, early_stopping=True, random_state=10)
+    ))
+
+
+__REGRESSORS__ = {
+    "random_forest": _init_random_forest,
+    "hist_gradient_boosting": _init_hist_gradient_boosting,
+    "ridge": _init_ridge,
+    "mlp": _init_mlp,
+}
+
+
+def register_regressor(name, init_func):
+    """ register a regressor for kernel predictors. `init_func(kernel_type, backend, n_jobs)` returns an unfitted regressor with
+    `fit` and `predict` methods in the sklearn style. As the predictors may be trained in spawned processes, the regressor
+    should be registered when its module is imported.
+    """
+    __REGRESSORS__[name] = init_func
+
+
+def list_regressors():
+    return list(__REGRESSORS__.keys())
+
+
+def init_predictor(kernel_type, backend, n_jobs = None, regressor = None):
+    """ initialize the regression model of the kernel. `regressor` is the name of the regressor, chosen from `list_regressors()`,
+    which defaults to "random_forest". If `n_jobs` is given, it overrides the number of jobs in the model params, so that the
+    predictors trained concurrently do not oversubscribe the cores.
+    """
+    regressor = regressor or "random_forest"
+    if regressor not in __REGRESSORS__:
+        raise ValueError(f"Unsupported regressor: {regressor}. Choose from {list_regressors()}.")
+    return __REGRESSORS__[regressor](kernel_type, backend, n_jobs)
+
+
+def refit_predictor(predictor, trainx, trainy, n_jobs = None):
+    """ refit a random forest predictor incrementally on the grown training data, which contains the `predictor.train_size_`
+    training data of the previous fit. The oldest trees are replaced, in proportion to the new data, by trees fitted on all training data with
+    `warm_start`. Thus the cost of refitting grows with the new data instead of all data. Return the refitted copy of
+    the predictor and the number of replaced trees.
+    """
+    predictor = copy.deepcopy(predictor)
+    n_trees = predictor.n_estimators
+    new_ratio = (len(trainx) - predictor.train_size_) / len(trainx)
+    n_refit = min(n_trees, max(1, math.ceil(n_trees * new_ratio)))
+    predictor.estimators_ = predictor.estimators_[n_refit:]
+
+    # draw different random states for the new trees, and skip the out-of-bag score, which is invalid for the previous trees
+    random_state = predictor.random_state + len(trainx) if isinstance(predictor.random_state, int) else predictor.random_state
+    predictor.set_params(warm_start=True, oob_score=False, random_state=random_state)
+    if n_jobs is not None:
+        predictor.set_params(n_jobs=n_jobs)
+    predictor.fit(trainx, trainy)
+    predictor.set_params(warm_start=False)
+    return predictor, n_refit
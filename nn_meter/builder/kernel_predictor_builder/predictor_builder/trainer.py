@@ -0,0 +1,109 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .build_predictor import build_predictor_by_data
+logging = logging.getLogger("nn-Meter")
+
+
+def _available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _train_predictor(kernel_type, kernel_data, kwargs):
+    start = time.time()
+    result = build_predictor_by_data(kernel_type, kernel_data, **kwargs)
+    return result, time.time() - start
+
+
+class PredictorTrainer:
+    """
+    Train the predictors of independent kernels concurrently in a process pool. Each predictor is trained by
+    `build_predictor_by_data` with `n_jobs` sized to its share of the available cores, and the training time of each kernel is
+    recorded in `train_times`.
+
+    @params:
+
+    workers (int): the number of predictors trained concurrently. Defaults to the number of available cores.
+
+    n_jobs (int): the number of jobs to train each predictor. Defaults to `<available cores> // workers`.
+    """
+    def __init__(self, workers = None, n_jobs = None):
+        cores = _available_cores()
+        self.workers = workers or cores
+        self.n_jobs = n_jobs or max(1, cores // self.workers)
+        self.train_times = {}
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn the workers, as forking a process with the framework imported is unsafe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _submit(self, kernel_type, kernel_data, kwargs):
+        kwargs = dict(kwargs, n_jobs=kwargs.get("n_jobs") or self.n_jobs)
+        return self._get_pool().submit(_train_predictor, kernel_type, kernel_data, kwargs)
+
+    def _collect(self, kernel_type, future):
+        result, train_time = future.result()
+        self.train_times.setdefault(kernel_type, []).append(train_time)
+        return result
+
+    def train(self, kernel_type, kernel_data, **kwargs):
+        """ train a kernel predictor in the pool and return `(predictor, acc10, error_configs)`. `kwargs` are passed to
+        `build_predictor_by_data`. Multiple threads could call `train` at the same time to train their predictors concurrently.
+        """
+        return self._collect(kernel_type, self._submit(kernel_type, kernel_data, kwargs))
+
+    def train_all(self, kernels_data, **kwargs):
+        """ train the predictors of all kernels in `kernels_data`, a dict of `{kernel_type: kernel_data}`, concurrently, and
+        return a dict of `{kernel_type: (predictor, acc10, error_configs)}`
+        """
+        futures = {kernel_type: self._submit(kernel_type, kernel_data, kwargs)
+                   for kernel_type, kernel_data in kernels_data.items()}
+        return {kernel_type: self._collect(kernel_type, future) for kernel_type, future in futures.items()}
+
+    def report(self):
+        """ log the total training time of each kernel
+        """
+        for kernel_type, train_times in self.train_times.items():
+            logging.result(f"{kernel_type}: trained {len(train_times)} predictors in {sum(train_times):.1f} seconds.")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def build_predictors_by_data(kernels_data, backend = None, workers = None, **kwargs):
+    """
+    build the regression models of multiple kernels by their profiled data concurrently, e.g., to rebuild all predictors from
+    the existing profiled data. Returns a dict of `{kernel_type: (predictor, acc10, error_configs)}`.
+
+    @params
+    kernels_data (dict): a dict of `{kernel_type: kernel_data}`, where `kernel_data` is the same as in `build_predictor_by_data`
+
+    backend (str): target device, relative to predictor initialization
+
+    workers (int): the number of predictors trained concurrently. Defaults to the number of available cores.
+
+    kwargs: the other arguments of `build_predictor_by_data`, such as `error_threshold`, `mark`, `save_path`, `predict_label`
+        and `final_predictor`
+    """
+    with PredictorTrainer(workers=min(workers or _available_cores(), len(kernels_data))) as trainer:
+        results = trainer.train_all(kernels_data, backend=backend, **kwargs)
+        trainer.report()
+    return results
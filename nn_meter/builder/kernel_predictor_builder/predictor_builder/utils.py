@@ -68,7 +68,7 @@ def collect_kernel_data(kernel_data, predict_label = 'latency'):
             label = json.load(fp)
     if predict_label == 'latency':
         from nn_meter.builder.backend_meta.utils import read_profiled_results
-        label = read_profiled_results(label)
+        label = read_profiled_results(label, inplace=True)
 
     for modules in config.keys():
         for model_id in config[modules].keys():
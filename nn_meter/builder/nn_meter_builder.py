@@ -2,14 +2,20 @@
 # Licensed under the MIT license.
 import os
 import json
-import time
-import signal
 import logging
+import itertools
+import threading
+import collections
+import multiprocessing
 from . import builder_config
-from .utils import save_profiled_results, merge_info, handle_timeout
+from .utils import save_profiled_results, merge_info, run_with_timeout, JobNotStoppedError, ResultsJournal
+from .kernel_cache import KernelCache, make_kernel_key
 from nn_meter.builder.backends import connect_backend
 logging = logging.getLogger("nn-Meter")
 
+# the kernels of different predictors are generated and profiled one at a time, while their predictors are trained concurrently
+_profile_lock = threading.RLock()
+
 
 def convert_models(backend, models, mode = 'predbuild', broken_point_mode = False):
     """ convert the model to the needed format by backend, in order to increase efficiency when profiling on device.
@@ -22,7 +28,8 @@ def convert_models(backend, models, mode = 'predbuild', broken_point_mode = Fals
 
     mode (str): the mode for running models, including ['ruletest', 'predbuild']
 
-    broken_point_mode (boolean): broken_point_mode will skip all models have attributes "converted_model"
+    broken_point_mode (boolean): broken_point_mode will skip all models have attributes "converted_model", including the models
+        recorded in the journal of an interrupted conversion
 
     """
     if isinstance(models, str):
@@ -42,27 +49,35 @@ def convert_models(backend, models, mode = 'predbuild', broken_point_mode = Fals
     count = 0
     info_save_path = os.path.join(res_save_path, save_name)
     error_save_path = os.path.join(res_save_path, "convert_error.log")
-    for module in models.values():
+    journal = ResultsJournal(info_save_path)
+    if broken_point_mode:
+        for module_key, module in journal.replay().items():
+            for id, info in module.items():
+                if id in models.get(module_key, {}):
+                    models[module_key][id].update(info)
+    converted_models = {} # the models saved to the same file, e.g., the single-op models shared by testcases, are converted once
+    for module_key, module in models.items():
         for id, model in module.items():
             if broken_point_mode and 'converted_model' in model:
                 continue
             try:
-                model_path = model['model']
-                converted_model = backend.convert_model(model_path, model_save_path, model['shapes'])
+                model_key = (model['model'], json.dumps(model['shapes']))
+                if model_key not in converted_models:
+                    converted_models[model_key] = backend.convert_model(model['model'], model_save_path, model['shapes'])
+                converted_model = converted_models[model_key]
                 model['converted_model'] = converted_model
+                journal.append(module_key, id, {'converted_model': converted_model})
                 count += 1
             except Exception as e:
                 open(error_save_path, 'a').write(f"{id}: {e}\n")
 
-            # save information to json file for per 50 models
+            # sync the journal to disk for per 50 models
             if count % 50 == 0:
-                with open(info_save_path, 'w') as fp:
-                    json.dump(models, fp, indent=4)
-                logging.keyinfo(f"{count} models complete. Still converting... Save the intermediate results to {info_save_path} ")
+                journal.sync()
+                logging.keyinfo(f"{count} models complete. Still converting... Save the intermediate results to {journal.journal_path} ")
 
     # save information to json file
-    with open(info_save_path, 'w') as fp:
-        json.dump(models, fp, indent=4)
+    journal.compact(models, merge=False)
     logging.keyinfo(f"Complete converting all {count} models. Save the results to {info_save_path} " \
                     f"Failed information are saved in {error_save_path} (if any)")
 
@@ -70,12 +85,15 @@ def convert_models(backend, models, mode = 'predbuild', broken_point_mode = Fals
 
 
 def profile_models(backend, models, mode = 'ruletest', metrics = ["latency"], save_name = "profiled_results.json",
-                   have_converted = False, log_frequency = 50, broken_point_mode = False, time_threshold = 300, **kwargs):
+                   have_converted = False, log_frequency = 50, broken_point_mode = False, time_threshold = 300,
+                   convert_workers = 0, convert_buffer_size = 16, batch_size = 1, kernel_cache = None, **kwargs):
     """ run models with given backend and return latency of testcase models
 
     @params:
 
-    backend (subclass instance of BaseBackend): applied backend instance
+    backend (subclass instance of BaseBackend, or list): applied backend instance. If a list of backend instances is given, e.g.,
+        the backends returned by `nn_meter.builder.backends.connect_backends` for multiple devices, the models are profiled on
+        all devices in parallel. A model failed on one device will be retried on the other devices.
 
     models (str or dict): the Dict of models or the path of the json file about models information 
 
@@ -93,11 +111,33 @@ def profile_models(backend, models, mode = 'ruletest', metrics = ["latency"], sa
         and skip all models already have attributes "latency"
 
     time_threshold (int): the time threshold for profiling one single model. If the total profiling time of a model is longger than the
-         `time_threshold` (second), nn-Meter will log a profiling timeout error for this model and step to profile the next model.
+         `time_threshold` (second), nn-Meter will cancel the profiling by `backend.cancel()`, log a profiling timeout error for this model,
+         mark the model by `"timeout": True` in the results and step to profile the next model. The timeout is watched by a thread, so
+         that it works in any thread, e.g., in device pool workers, thread pools, asyncio loops and notebooks. A batch of models has a
+         time threshold of `time_threshold * batch_size`. Set to None or 0 to disable.
+
+    convert_workers (int): the number of host processes to convert models ahead of profiling when `have_converted` is False. If
+        `convert_workers > 0`, the models are converted in a process pool while the device profiles the models converted before,
+        so that the device does not idle during conversion. Default to be 0, i.e., each model is converted right before profiling.
+
+    convert_buffer_size (int): the maximum number of models that are converted (or under conversion) but not profiled yet when
+        `convert_workers > 0`. It bounds the disk usage of the converted models.
+
+    batch_size (int): the number of models profiled in one run by `backend.profile_batch`. For small kernel models, the cost to start a
+        benchmark on device is larger than the measurement itself, and batching models amortizes the cost. Models are converted before
+        profiling if `batch_size > 1`. If a batch fails as a whole, its models are profiled one by one. Default to be 1.
+
+    kernel_cache (KernelCache or boolean): the cache of kernel measurements shared across builder runs and workspaces, which only
+        applies to the kernels in 'predbuild' mode. The kernels measured on a backend of the same identity with the same profiling
+        arguments are not profiled again, and are marked by `"cached": True` in the models. The newly profiled kernels are saved to
+        the cache. Set to True to use the default `KernelCache()`. Default to be None, i.e., no cache.
+
+    Before profiling each batch, nn-Meter waits for the device by the cooldown policy `backend.cooldown()`. For TFLite backends, the
+    policy waits only while the device is hot or its cpu frequency is capped. Models profiled while the device was throttling are
+    marked by `"throttled": True` in the results.
 
     **kwargs: arguments for profiler, such as `taskset` and `close_xnnpack` in TFLite profiler
     """
-    signal.signal(signal.SIGALRM, handle_timeout)
     if isinstance(models, str):
         with open(models, 'r') as fp:
             models = json.load(fp)
@@ -109,12 +149,12 @@ def profile_models(backend, models, mode = 'ruletest', metrics = ["latency"], sa
     os.makedirs(res_save_path, exist_ok=True)
     info_save_path = os.path.join(res_save_path, save_name)
 
-    # in broken point model, if the output file `<workspace>/<mode-folder>/results/<save-name>` exists,
+    # in broken point model, if the output file `<workspace>/<mode-folder>/results/<save-name>` or its journal exists,
     # load the existing latency and skip these model in profiling
-    if broken_point_mode and os.path.isfile(info_save_path):
+    journal = ResultsJournal(info_save_path)
+    if broken_point_mode:
         from nn_meter.builder.backend_meta.utils import read_profiled_results
-        with open(info_save_path, 'r') as fp:
-            profiled_models = read_profiled_results(json.load(fp))
+        profiled_models = read_profiled_results(journal.load(), inplace=True)
         for module_key, module in models.items():
             if module_key not in profiled_models:
                 continue
@@ -122,45 +162,39 @@ def profile_models(backend, models, mode = 'ruletest', metrics = ["latency"], sa
                 if id in profiled_models[module_key]:
                     model.update(profiled_models[module_key][id])
 
+    # read the latency of the kernels measured before from the kernel cache, and skip these kernels in profiling
+    backends = list(backend) if isinstance(backend, (list, tuple)) else [backend]
+    cache_kernel = None
+    if kernel_cache and mode == 'predbuild':
+        kernel_cache = KernelCache() if kernel_cache is True else kernel_cache
+        cache_kernel = _read_kernel_cache(kernel_cache, models, backends, kwargs)
+
     # profile models and get metric results
-    count = 0    
     error_save_path = os.path.join(res_save_path, "profile_error.log")
     detail = builder_config.get('DETAIL', mode)
     save_name = save_name or "profiled_results.json"
-    logging.info("Profiling ...")
-    for module in models.values():
-        for id, model in module.items():
-            if broken_point_mode and 'latency' in model and model['latency'].avg != 0:
-                continue
-            if have_converted: # the models have been converted for the backend
-                try:
-                    model_path = model['converted_model']
-                    signal.alarm(time_threshold)
-                    profiled_res = backend.profile(model_path, metrics, model['shapes'], **kwargs)
-                    signal.alarm(0)
-                    for metric in metrics:
-                        model[metric] = profiled_res[metric]
-                    time.sleep(0.2)
-                    count += 1
-                except Exception as e:
-                    open(error_save_path, 'a').write(f"{id}: {e}\n")
-            else: # the models have not been converted
-                try:
-                    model_path = model['model']
-                    signal.alarm(time_threshold)
-                    profiled_res = backend.profile_model_file(model_path, model_save_path, model['shapes'], metrics, **kwargs)
-                    signal.alarm(0)
-                    for metric in metrics:
-                        model[metric] = profiled_res[metric]
-                    time.sleep(0.2)
-                    count += 1
-                except Exception as e:
-                    open(error_save_path, 'a').write(f"{id}: {e}\n")
+    tasks = [
+        (id, model) for module in models.values() for id, model in module.items()
+        if not (broken_point_mode and 'latency' in model and model['latency'].avg != 0) and not model.get('cached')
+    ]
+    tasks, shared_models = _group_shared_models(tasks)
+    num_tasks = len(tasks)
+    if not have_converted and (convert_workers > 0 or batch_size > 1):
+        # convert models before profiling, in host processes while the device profiles the models converted before
+        # if `convert_workers > 0`
+        tasks = _convert_models_ahead(backends[0], tasks, model_save_path, convert_workers, convert_buffer_size)
+        have_converted = True
+    else:
+        tasks = ((id, model, None) for id, model in tasks)
 
-            # save information to json file for per 50 models
-            if count > 0 and count % log_frequency == 0:
-                save_profiled_results(models, info_save_path, detail, metrics)
-                logging.keyinfo(f"{count} models complete. Still profiling... Save the intermediate results to {info_save_path} ")
+    logging.info("Profiling ...")
+    try:
+        count = _profile_models_on_devices(backends, models, _batched(tasks, batch_size), num_tasks, metrics, model_save_path,
+                                           have_converted, journal, error_save_path, detail, log_frequency, time_threshold,
+                                           cache_kernel, **kwargs)
+        _share_profiled_results(models, shared_models, metrics, journal, detail)
+    finally:
+        journal.close()
 
     # save information to json file
     save_profiled_results(models, info_save_path, detail, metrics)    
@@ -170,29 +204,362 @@ def profile_models(backend, models, mode = 'ruletest', metrics = ["latency"], sa
     return models
 
 
+def _profile_model(backend, model, metrics, model_save_path, have_converted, time_threshold, **kwargs):
+    if have_converted: # the models have been converted for the backend
+        run = lambda: backend.profile(model['converted_model'], metrics, input_shape=model['shapes'], **kwargs)
+    else: # the models have not been converted
+        run = lambda: backend.profile_model_file(model['model'], model_save_path, model['shapes'], metrics, **kwargs)
+    return run_with_timeout(run, time_threshold, on_timeout=backend.cancel)
+
+
+def _profile_batch(backend, batch, metrics, model_save_path, have_converted, time_threshold, **kwargs):
+    """ profile a batch of `(id, model)` and return a list of `(profiled_res, error)` for each model. A batch with multiple models
+    is profiled in one run by `backend.profile_batch`. If the run fails as a whole, the models are profiled one by one. A failed
+    `backend.profile_batch` keeps the model files on the host, and `run_with_timeout` returns only after a timeout batch has been
+    cancelled and cleaned up, so the fallback never races with the batch. Each model file is then cleaned up by its own run in
+    the fallback.
+    """
+    if len(batch) > 1:
+        run = lambda: backend.profile_batch([model['converted_model'] for _, model in batch], metrics,
+                                            input_shapes=[model['shapes'] for _, model in batch], **kwargs)
+        try:
+            results = run_with_timeout(run, time_threshold and time_threshold * len(batch), on_timeout=backend.cancel)
+            return [(None, res) if isinstance(res, Exception) else (res, None) for res in results]
+        except JobNotStoppedError as e:
+            # the batch may still be running on the device, thus profiling the models again would interfere with it
+            logging.warning(f"Failed to profile a batch of {len(batch)} models: {e}.")
+            return [(None, e) for _ in batch]
+        except Exception as e:
+            logging.info(f"Failed to profile a batch of {len(batch)} models: {e}. Profile the models one by one.")
+
+    results = []
+    for _, model in batch:
+        try:
+            results.append((_profile_model(backend, model, metrics, model_save_path, have_converted, time_threshold, **kwargs), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+
+def _read_kernel_cache(kernel_cache, models, backends, profile_kwargs):
+    """ set the latency of the kernels found in `kernel_cache`, and return a function `cache_kernel(device_idx, kernel_type, model)`
+    to save a kernel profiled on `backends[device_idx]` to the cache
+    """
+    from nn_meter.builder.backend_meta.utils import Latency
+    identities = [backend.identity() for backend in backends]
+    make_key = lambda kernel_type, model, identity: make_kernel_key(kernel_type, model['config'], identity, profile_kwargs)
+
+    count = 0
+    for kernel_type, module in models.items():
+        for model in module.values():
+            if 'config' not in model:
+                continue
+            for identity in identities:
+                record = kernel_cache.get(make_key(kernel_type, model, identity))
+                if record is not None:
+                    model['latency'] = Latency(record['latency'])
+                    if record.get('runs') is not None:
+                        model['latency'].runs = record['runs']
+                    model['cached'] = True
+                    count += 1
+                    break
+    logging.keyinfo(f"{count} kernels are found in the kernel cache {kernel_cache.cache_dir}.")
+
+    def cache_kernel(device_idx, kernel_type, model):
+        # the latency of throttled devices is not reliable, thus it is saved to the results but not to the cache
+        if 'config' in model and not model.get('throttled'):
+            kernel_cache.put(make_key(kernel_type, model, identities[device_idx]), {
+                'kernel_type': kernel_type,
+                'config': model['config'],
+                'shapes': model.get('shapes'),
+                'latency': str(model['latency']),
+                'runs': getattr(model['latency'], 'runs', None),
+            })
+
+    return cache_kernel
+
+
+def _group_shared_models(tasks):
+    """ group the `(id, model)` tasks by the model file and input shapes, e.g., the single-op models shared by testcases. Return
+    the first task of each group to profile, and a list of `(model, [(id, duplicated_model), ...])` for the groups with duplicates.
+    """
+    groups = {}
+    for id, model in tasks:
+        model_path = model.get('converted_model') or model.get('model')
+        key = (model_path, json.dumps(model.get('shapes'))) if isinstance(model_path, str) else object()
+        groups.setdefault(key, []).append((id, model))
+    shared = [(group[0][1], group[1:]) for group in groups.values() if len(group) > 1]
+    if shared:
+        logging.info(f"{sum(len(duplicates) for _, duplicates in shared)} models share the profiled results of "
+                     f"{len(shared)} models with the same model file.")
+    return [group[0] for group in groups.values()], shared
+
+
+def _share_profiled_results(models, shared, metrics, journal, detail):
+    """ copy the profiled results of each model in `shared` to its duplicated models, and append them to `journal`
+    """
+    from nn_meter.builder.backend_meta.utils import dump_profiled_model
+    for model, duplicates in shared:
+        for id, duplicate in duplicates:
+            for metric in metrics:
+                if metric in model:
+                    duplicate[metric] = model[metric]
+            for flag in ['timeout', 'throttled']:
+                if flag in model:
+                    duplicate[flag] = model[flag]
+                else:
+                    duplicate.pop(flag, None)
+            if all(metric in model for metric in metrics):
+                journal.append(_module_key(models, id, duplicate), id, dump_profiled_model(duplicate, detail, metrics))
+
+
+def _module_key(models, id, model):
+    """ return the key of the module containing `model` in `models`, as model ids are only unique in their module
+    """
+    return next(module_key for module_key, module in models.items() if module.get(id) is model)
+
+
+def _check_throttling(check, device_idx):
+    """ call `backend.cooldown` or `backend.is_throttling` and return whether the device is throttling. A failed check does not
+    fail the profiling, as the thermal state is not readable on some devices.
+    """
+    try:
+        return check()
+    except Exception as e:
+        logging.info(f"Failed to check the thermal state of device {device_idx}: {e}")
+        return False
+
+
+def _batched(tasks, batch_size):
+    tasks = iter(tasks)
+    while True:
+        batch = list(itertools.islice(tasks, max(batch_size, 1)))
+        if not batch:
+            return
+        yield batch
+
+
+_convert_worker = {}
+
+
+def _init_convert_worker(backend_cls, configs, settings):
+    # the builder config is not initialized in the spawned workers, and the backend is rebuilt once for each worker instead of
+    # being sent with each task
+    for module, value in settings.items():
+        builder_config.set_module(value, module)
+    _convert_worker['backend'] = backend_cls(configs)
+
+
+def _convert_model(model_path, save_path, input_shape):
+    return _convert_worker['backend'].convert_model(model_path, save_path, input_shape)
+
+
+def _convert_models_ahead(backend, tasks, model_save_path, workers, buffer_size):
+    """ convert models by `backend.convert_model` and yield `(id, model, error)` in the order of `tasks`, with the path of the
+    converted model in `model['converted_model']`. If `workers > 0`, the models are converted in a process pool, and at most
+    `buffer_size` models are converted ahead of the model being consumed.
+    """
+    if workers <= 0:
+        for id, model in tasks:
+            try:
+                model['converted_model'] = backend.convert_model(model['model'], model_save_path, model['shapes'])
+                error = None
+            except Exception as e:
+                error = e
+            yield id, model, error
+        return
+
+    # spawn the workers, as forking a process with the framework imported is unsafe
+    pool = multiprocessing.get_context("spawn").Pool(
+        workers, initializer=_init_convert_worker, initargs=(type(backend), backend.configs, builder_config.get_settings()))
+    with pool:
+        tasks = iter(tasks)
+        pending = collections.deque()
+
+        def submit():
+            for id, model in itertools.islice(tasks, max(buffer_size - len(pending), 0)):
+                result = pool.apply_async(_convert_model, (model['model'], model_save_path, model['shapes']))
+                pending.append((id, model, result))
+
+        submit()
+        while pending:
+            id, model, result = pending.popleft()
+            try:
+                model['converted_model'] = result.get()
+                error = None
+            except Exception as e:
+                error = e
+            submit()
+            yield id, model, error
+
+
+def _profile_models_on_devices(backends, models, batches, num_tasks, metrics, model_save_path, have_converted,
+                               journal, error_save_path, detail, log_frequency, time_threshold, cache_kernel = None, **kwargs):
+    """ profile models on devices with one worker thread for each backend instance. All workers share the iterator `batches`
+    of model batches. Models failed on one device are queued for the next device they have not been tried on, and are logged
+    as failed only after they failed on all devices. Each profiled model is appended to `journal`, and saved to the kernel
+    cache by `cache_kernel` if given. Return the number of successfully profiled models.
+    """
+    from nn_meter.builder.backend_meta.utils import dump_profiled_model
+    num_devices = len(backends)
+    retry_queues = [collections.deque() for _ in range(num_devices)]
+    condition = threading.Condition()
+    batches_lock = threading.Lock()
+    state = {"pending": num_tasks, "count": 0, "saved": 0}
+
+    def next_task(device_idx):
+        with condition:
+            if retry_queues[device_idx]:
+                return retry_queues[device_idx].popleft()
+        # take a new batch without holding the condition, as it may wait for the model conversion
+        with batches_lock:
+            batch = next(batches, None)
+        if batch is not None:
+            with condition:
+                for id, model, convert_error in batch:
+                    if convert_error is not None:
+                        open(error_save_path, 'a').write(f"{id}: {convert_error}\n")
+                        state["pending"] -= 1
+                condition.notify_all()
+            return [(id, model) for id, model, convert_error in batch if convert_error is None], set()
+        with condition:
+            while True:
+                if retry_queues[device_idx]:
+                    return retry_queues[device_idx].popleft()
+                if state["pending"] == 0:
+                    return None
+                condition.wait()
+
+    def worker(device_idx):
+        backend = backends[device_idx]
+        while True:
+            task = next_task(device_idx)
+            if task is None:
+                return
+            batch, failed_devices = task
+            if not batch:
+                continue
+            throttled = _check_throttling(backend.cooldown, device_idx)
+            results = _profile_batch(backend, batch, metrics, model_save_path, have_converted, time_threshold, **kwargs)
+            throttled = _check_throttling(backend.is_throttling, device_idx) or throttled
+
+            with condition:
+                failed = []
+                for (id, model), (profiled_res, error) in zip(batch, results):
+                    if error is None:
+                        for metric in metrics:
+                            model[metric] = profiled_res[metric]
+                        model.pop('timeout', None)
+                        if throttled:
+                            model['throttled'] = True
+                        else:
+                            model.pop('throttled', None)
+                        module_key = _module_key(models, id, model)
+                        journal.append(module_key, id, dump_profiled_model(model, detail, metrics))
+                        if cache_kernel is not None and 'latency' in model:
+                            try:
+                                cache_kernel(device_idx, module_key, model)
+                            except Exception as e:
+                                logging.warning(f"Failed to save model {id} to the kernel cache: {e}")
+                        state["count"] += 1
+                        state["pending"] -= 1
+                    else:
+                        failed.append((id, model, error))
+
+                failed_devices = failed_devices | {device_idx}
+                retry_idx = next((idx % num_devices for idx in range(device_idx + 1, device_idx + num_devices)
+                                  if idx % num_devices not in failed_devices), None)
+                for id, model, error in failed:
+                    if retry_idx is not None:
+                        logging.info(f"Failed to profile model {id} on device {device_idx}: {error}. "
+                                     f"Retry on device {retry_idx}.")
+                        continue
+                    if isinstance(error, TimeoutError):
+                        model['timeout'] = True
+                    open(error_save_path, 'a').write(f"{id}: {error}\n")
+                    state["pending"] -= 1
+                if failed and retry_idx is not None:
+                    retry_queues[retry_idx].append(([(id, model) for id, model, _ in failed], failed_devices))
+
+                # sync the journal to disk for per `log_frequency` models
+                if state["count"] - state["saved"] >= log_frequency:
+                    state["saved"] = state["count"]
+                    try:
+                        journal.sync()
+                        logging.keyinfo(f"{state['count']} models complete. Still profiling... "
+                                        f"Save the intermediate results to {journal.journal_path} ")
+                    except Exception as e:
+                        logging.warning(f"Failed to save the intermediate results to {journal.journal_path}: {e}")
+                condition.notify_all()
+
+    if num_devices > 1:
+        logging.info(f"Profiling {num_tasks} models on {num_devices} devices ...")
+    threads = [threading.Thread(target=worker, args=(idx, ), daemon=True) for idx in range(num_devices)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return state["count"]
+
+
 def sample_and_profile_kernel_data(kernel_type, sample_num, backend, sampling_mode = 'prior', configs = None, mark = '', detail = True,
-                                   metrics = ["latency"], **kwargs):
-    ''' sample kernel configs and profile kernel model based on configs
+                                   metrics = ["latency"], generate_workers = None, kernel_cache = None, predictor = None,
+                                   prior_sampling = 'random', **kwargs):
+    ''' sample kernel configs and profile kernel model based on configs. The kernel models are generated by `generate_workers`
+    processes, which defaults to `GENERATE_WORKERS` in the predictor build configs. Tensorflow kernel models are converted for
+    the backend in memory during generation. The kernels found in `kernel_cache` are neither generated nor profiled. If
+    `kernel_cache` is None, the kernel cache is used if `KERNEL_CACHE` is set in the predictor build configs. `predictor` is
+    required in 'active' sampling mode. `prior_sampling` is the method to draw points from the prior distribution, chosen from
+    ['random', 'sobol', 'lhs']. `kwargs` are the profiling arguments passed to `profile_models`, which are part of the keys of
+    the kernel cache.
     '''
     from nn_meter.builder.kernel_predictor_builder import generate_config_sample
 
-    # sample configs for kernel and generate models
-    models = generate_config_sample(kernel_type, sample_num, mark=mark, 
-                                     sampling_mode=sampling_mode, configs=configs)
-
-    # connect to backend, run models and get latency
-    backend = connect_backend(backend_name=backend)
-    profiled_results = profile_models(backend, models, mode='predbuild', metrics=metrics, save_name=f"profiled_{kernel_type}.json")
-    return profiled_results
+    with _profile_lock:
+        # connect to backend
+        backend = connect_backend(backend_name=backend)
+        if kernel_cache is None and builder_config.get('KERNEL_CACHE', 'predbuild'):
+            kernel_cache = KernelCache(expire_days=builder_config.get('KERNEL_CACHE_EXPIRE_DAYS', 'predbuild'))
+        elif kernel_cache is True:
+            kernel_cache = KernelCache()
+
+        # sample configs for kernel, generate models and convert them for the backend
+        models = generate_config_sample(kernel_type, sample_num, mark=mark, 
+                                         sampling_mode=sampling_mode, configs=configs, workers=generate_workers, backend=backend,
+                                         kernel_cache=kernel_cache or None, predictor=predictor, prior_sampling=prior_sampling,
+                                         profile_kwargs=kwargs)
+        have_converted = any('converted_model' in model for model in models[kernel_type].values())
+
+        # run models and get latency
+        profiled_results = profile_models(backend, models, mode='predbuild', metrics=metrics, save_name=f"profiled_{kernel_type}.json",
+                                          have_converted=have_converted, kernel_cache=kernel_cache, **kwargs)
+        return profiled_results
+
+
+def _sample_and_profile_adaptive_data(kernel_type, sample_num, backend, sampling_mode, predictor, error_configs, kernel_data, mark,
+                                      prior_sampling = 'random'):
+    """ sample and profile kernel data around the large error data in 'finegrained' mode, or the data with the most uncertain
+    prediction in 'active' mode
+    """
+    if sampling_mode == 'active':
+        from nn_meter.builder.kernel_predictor_builder import collect_kernel_data
+        profiled_configs = [model['config'] for model in collect_kernel_data(kernel_data)[kernel_type].values() if 'config' in model]
+        return sample_and_profile_kernel_data(kernel_type, sample_num, backend, sampling_mode='active',
+                                              configs=profiled_configs, predictor=predictor, mark=mark,
+                                              prior_sampling=prior_sampling)
+    return sample_and_profile_kernel_data(kernel_type, sample_num, backend, sampling_mode='finegrained',
+                                          configs=error_configs, mark=mark)
 
 
 def build_predictor_for_kernel(kernel_type, backend, init_sample_num = 1000, finegrained_sample_num = 10,
-                               iteration = 5, error_threshold = 0.1, predict_label = "latency", mark = ""):
+                               iteration = 5, error_threshold = 0.1, predict_label = "latency", mark = "",
+                               sampling_mode = "finegrained", prior_sampling = "random", trainer = None, incremental = False,
+                               regressor = None):
     """ 
     Build latency predictor for given kernel. This method contains three main steps:
     1. sample kernel configs and profile kernel model based on configs;
     2. initialize latency predictor of kernel based on the profiled data;
-    3. adopt adaptive sampler with iteratively doing step 1 for finegrained sampling to improve predictor performance
+    3. adopt adaptive sampler with iteratively doing step 1 for finegrained (or active) sampling to improve predictor performance
 
     @params
     
@@ -211,49 +578,87 @@ def build_predictor_for_kernel(kernel_type, backend, init_sample_num = 1000, fin
     error_threshold (float, optional): the threshold of large error. Defaults to 0.1.
 
     predict_label (str): the predicting label to build kernel predictor. Defaults to "latency"
+
+    sampling_mode (str, optional): the adaptive sampling mode, chosen from ['finegrained', 'active']. In 'finegrained' mode, data
+        are sampled around the large error data in the test set. In 'active' mode, `finegrained_sample_num` data that the trees
+        of the current predictor disagree most on are selected from a large pool of candidates sampled from the prior
+        distribution in each iteration. Defaults to "finegrained".
+
+    prior_sampling (str, optional): the method to draw the points from the prior distribution, chosen from ['random', 'sobol',
+        'lhs']. 'sobol' and 'lhs' draw low-discrepancy points, which cover the joint config space more evenly than i.i.d. random
+        numbers. Defaults to "random".
+
+    trainer (PredictorTrainer, optional): if given, the predictors are trained in the process pool of the trainer, so that the
+        predictors of multiple kernels built in different threads are trained concurrently. Defaults to None, i.e., the
+        predictors are trained in the current process.
+
+    incremental (bool, optional): whether to refit the predictor incrementally in the adaptive sampling iterations. If True, the
+        oldest trees of the predictor in the previous iteration are replaced, in proportion to the new data, by trees fitted on
+        all training data, instead of fitting all trees from scratch. Defaults to False.
+
+    regressor (str, optional): the name of the regressor of the predictor, chosen from `list_regressors()` in
+        `nn_meter.builder.kernel_predictor_builder`. Only tree ensembles, such as "random_forest", support the 'active' sampling
+        mode. Defaults to None, i.e., "random_forest".
  
     """
+    from sklearn.ensemble import BaseEnsemble
     from nn_meter.builder.kernel_predictor_builder import build_predictor_by_data
+    from nn_meter.builder.kernel_predictor_builder.predictor_builder.predictor_lib import init_predictor
+    build_predictor = trainer.train if trainer is not None else build_predictor_by_data
+
+    # check the regressor before any kernel is sampled and profiled
+    unfitted_predictor = init_predictor(kernel_type, backend, regressor=regressor)
+    if sampling_mode == 'active' and not isinstance(unfitted_predictor, BaseEnsemble):
+        raise ValueError(f"The 'active' sampling mode requires a tree ensemble regressor, such as 'random_forest', "
+                         f"but got '{regressor}'.")
     workspace_path = builder_config.get('WORKSPACE', 'predbuild')
     mark = mark if mark == "" else "_" + mark
 
     # init predictor builder with prior data sampler
-    kernel_data = sample_and_profile_kernel_data(kernel_type, init_sample_num, backend, sampling_mode='prior', mark=f'prior{mark}')
+    kernel_data = sample_and_profile_kernel_data(kernel_type, init_sample_num, backend, sampling_mode='prior', mark=f'prior{mark}',
+                                                 prior_sampling=prior_sampling)
 
     # use current sampled data to build regression model, and locate data with large errors in testset
-    predictor, acc10, error_configs = build_predictor_by_data(kernel_type, kernel_data, backend, error_threshold=error_threshold, mark=f'prior{mark}',
-                                                              save_path=os.path.join(workspace_path, "results"), predict_label=predict_label)
+    predictor, acc10, error_configs = build_predictor(kernel_type, kernel_data, backend=backend, error_threshold=error_threshold, mark=f'prior{mark}',
+                                                      save_path=os.path.join(workspace_path, "results"), predict_label=predict_label,
+                                                      incremental=incremental, regressor=regressor)
     logging.keyinfo(f'Iteration 0: acc10 {acc10}, error_configs number: {len(error_configs)}')
 
     for i in range(1, iteration):
-        # finegrained sampling and profiling for large error data
-        new_kernel_data = sample_and_profile_kernel_data(kernel_type, finegrained_sample_num, backend,
-                                                         sampling_mode='finegrained', configs=error_configs, mark=f'finegrained{i}{mark}')
+        # finegrained sampling and profiling for large error data, or active sampling for uncertain data
+        new_kernel_data = _sample_and_profile_adaptive_data(kernel_type, finegrained_sample_num, backend, sampling_mode, predictor,
+                                                            error_configs, kernel_data, mark=f'{sampling_mode}{i}{mark}',
+                                                            prior_sampling=prior_sampling)
 
         # merge finegrained data with previous data and build new regression model
         kernel_data = merge_info(new_info=new_kernel_data, prev_info=kernel_data)
-        predictor, acc10, error_configs = build_predictor_by_data(kernel_type, kernel_data, backend, error_threshold=error_threshold, mark=f'finegrained{i}{mark}',
-                                                                  save_path=os.path.join(workspace_path, "results"), predict_label=predict_label)
+        predictor, acc10, error_configs = build_predictor(kernel_type, kernel_data, backend=backend, error_threshold=error_threshold, mark=f'{sampling_mode}{i}{mark}',
+                                                          save_path=os.path.join(workspace_path, "results"), predict_label=predict_label,
+                                                          incremental=incremental, warm_start_predictor=predictor if incremental else None,
+                                                          regressor=regressor)
         logging.keyinfo(f'Iteration {i}: acc10 {acc10}, error_configs number: {len(error_configs)}')
 
     return predictor, kernel_data
 
 
-def build_initial_predictor_by_data(kernel_type, backend = None, init_sample_num = 20, error_threshold = 0.1, mark = '', predict_label = "latency"):
-    return build_predictor_for_kernel(kernel_type, backend, init_sample_num=init_sample_num, iteration=1, error_threshold=error_threshold, predict_label=predict_label, mark=mark)
+def build_initial_predictor_by_data(kernel_type, backend = None, init_sample_num = 20, error_threshold = 0.1, mark = '', predict_label = "latency",
+                                    prior_sampling = "random"):
+    return build_predictor_for_kernel(kernel_type, backend, init_sample_num=init_sample_num, iteration=1, error_threshold=error_threshold, predict_label=predict_label, mark=mark,
+                                      prior_sampling=prior_sampling)
 
 
-def build_adaptive_predictor_by_data(kernel_type, kernel_data, backend = None, finegrained_sample_num = 20, error_threshold = 0.1, mark = '', predict_label = "latency"):
+def build_adaptive_predictor_by_data(kernel_type, kernel_data, backend = None, finegrained_sample_num = 20, error_threshold = 0.1, mark = '', predict_label = "latency",
+                                     sampling_mode = "finegrained", prior_sampling = "random"):
     """ Run adaptive sampler in one iteration based 
     """
     workspace_path = builder_config.get('WORKSPACE', 'predbuild')
     save_path = os.path.join(workspace_path, "results")
-    mark = 'finegrained' if mark == "" else f"finegrained_{mark}"
+    mark = sampling_mode if mark == "" else f"{sampling_mode}_{mark}"
 
     from nn_meter.builder.kernel_predictor_builder import build_predictor_by_data, collect_kernel_data
-    _, _, error_configs = build_predictor_by_data(kernel_type, kernel_data, backend = backend, error_threshold=error_threshold, save_path=None, predict_label=predict_label)
-    new_kernel_data = sample_and_profile_kernel_data(kernel_type, finegrained_sample_num, backend,
-                                                     sampling_mode='finegrained', configs=error_configs, mark=mark)
+    predictor, _, error_configs = build_predictor_by_data(kernel_type, kernel_data, backend = backend, error_threshold=error_threshold, save_path=None, predict_label=predict_label)
+    new_kernel_data = _sample_and_profile_adaptive_data(kernel_type, finegrained_sample_num, backend, sampling_mode, predictor,
+                                                        error_configs, kernel_data, mark=mark, prior_sampling=prior_sampling)
 
     # merge finegrained data with previous data and build new regression model
     kernel_data = merge_info(new_info=new_kernel_data, prev_info=collect_kernel_data(kernel_data))
@@ -263,7 +668,7 @@ def build_adaptive_predictor_by_data(kernel_type, kernel_data, backend = None, f
     return predictor, kernel_data
 
 
-def build_latency_predictor(backend):
+def build_latency_predictor(backend, train_workers = None):
     """ 
     Build latency predictor for all kernel in `<workspace-path>/configs/predictorbuild_config.yaml`
 
@@ -271,18 +676,43 @@ def build_latency_predictor(backend):
 
     backend (str): the name of backend instance to profile models
 
+    train_workers (int, optional): the number of kernel predictors trained concurrently. If it is larger than 0, the kernels are
+        built in parallel threads, where the kernel models are profiled one at a time, and the predictors are trained in a
+        process pool with `n_jobs` sized to the available cores. Defaults to None, i.e., the `TRAIN_WORKERS` in the predictor
+        build configs, and the kernels are built one by one if it is 0.
+
     """
     kernels = builder_config.get("KERNELS", 'predbuild')
+    if train_workers is None:
+        train_workers = builder_config.get("TRAIN_WORKERS", 'predbuild') or 0
+    if train_workers > 0:
+        from concurrent.futures import ThreadPoolExecutor
+        from nn_meter.builder.kernel_predictor_builder import PredictorTrainer
+        train_workers = min(train_workers, len(kernels))
+        with PredictorTrainer(workers=train_workers) as trainer, ThreadPoolExecutor(train_workers) as executor:
+            futures = [executor.submit(_build_predictor_by_config, kernel_type, kernels[kernel_type], backend, trainer)
+                       for kernel_type in kernels]
+            for future in futures:
+                future.result()
+            trainer.report()
+        return
 
     for kernel_type in kernels:
-        init_sample_num = kernels[kernel_type]["INIT_SAMPLE_NUM"]
-        finegrained_sample_num = kernels[kernel_type]["FINEGRAINED_SAMPLE_NUM"]
-        iteration = kernels[kernel_type]["ITERATION"]
-        error_threshold = kernels[kernel_type]["ERROR_THRESHOLD"]
-        build_predictor_for_kernel(
-            kernel_type, backend, 
-            init_sample_num = init_sample_num,
-            finegrained_sample_num = finegrained_sample_num,
-            iteration = iteration,
-            error_threshold = error_threshold
-            )
+        _build_predictor_by_config(kernel_type, kernels[kernel_type], backend)
+
+
+def _build_predictor_by_config(kernel_type, kernel_config, backend, trainer = None):
+    """ build the latency predictor for the kernel with the parameters in `KERNELS` of the predictor build configs
+    """
+    build_predictor_for_kernel(
+        kernel_type, backend, 
+        init_sample_num = kernel_config["INIT_SAMPLE_NUM"],
+        finegrained_sample_num = kernel_config["FINEGRAINED_SAMPLE_NUM"],
+        iteration = kernel_config["ITERATION"],
+        error_threshold = kernel_config["ERROR_THRESHOLD"],
+        sampling_mode = kernel_config.get("SAMPLING_MODE", "finegrained"),
+        prior_sampling = kernel_config.get("PRIOR_SAMPLING", "random"),
+        trainer = trainer,
+        incremental = kernel_config.get("INCREMENTAL_REFIT", False),
+        regressor = kernel_config.get("REGRESSOR")
+        )
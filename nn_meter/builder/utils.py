@@ -2,6 +2,10 @@
 # Licensed under the MIT license.
 import os
 import json
+import logging
+import warnings
+import threading
+logging = logging.getLogger("nn-Meter")
 
 
 def merge_info(new_info, info_save_path = None, prev_info = None):
@@ -47,12 +51,172 @@ def merge_info(new_info, info_save_path = None, prev_info = None):
     return prev_info
 
 
+class ResultsJournal:
+    """
+    An append-only journal of the results of models, stored in JSON lines beside the results file as `<save_path>.journal`.
+    Each record is `{"module": <module_key>, "id": <model_key>, "info": <info>}` and costs one appended line, instead of
+    rewriting the whole results file. The journal is replayed to resume an interrupted run, and is compacted into
+    `save_path` in the usual json layout of `{module_key: {model_key: info}}` on completion.
+
+    @params
+
+    save_path (str): the path of the json results file
+    """
+    def __init__(self, save_path):
+        self.save_path = save_path
+        self.journal_path = save_path + '.journal'
+        self._fp = None
+        self._lock = threading.Lock()
+
+    def append(self, module_key, model_key, info):
+        """ append the info of a model to the journal. The record is flushed to the file at once.
+        """
+        record = json.dumps({"module": module_key, "id": model_key, "info": info}) + '\n'
+        with self._lock:
+            if self._fp is None:
+                truncated = False
+                if os.path.isfile(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+                    with open(self.journal_path, 'rb') as fp:
+                        fp.seek(-1, os.SEEK_END)
+                        truncated = fp.read(1) != b'\n'
+                self._fp = open(self.journal_path, 'a')
+                if truncated:
+                    # terminate the truncated record written by an interrupted run
+                    self._fp.write('\n')
+            self._fp.write(record)
+            self._fp.flush()
+
+    def sync(self):
+        """ force the appended records to the disk
+        """
+        with self._lock:
+            if self._fp is not None:
+                self._fp.flush()
+                os.fsync(self._fp.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def replay(self):
+        """ return the records in the journal as `{module_key: {model_key: info}}`. Later records of a model update the earlier
+        ones, and the truncated record of an interrupted run is skipped.
+        """
+        results = {}
+        if not os.path.isfile(self.journal_path):
+            return results
+        with open(self.journal_path, 'r') as fp:
+            for line in fp:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results.setdefault(record["module"], {}).setdefault(record["id"], {}).update(record["info"])
+        return results
+
+    def load(self):
+        """ return the saved results, i.e., the results in `save_path` updated by the records in the journal
+        """
+        results = {}
+        if os.path.isfile(self.save_path):
+            with open(self.save_path, 'r') as fp:
+                results = json.load(fp)
+        for module_key, module in self.replay().items():
+            for model_key, info in module.items():
+                results.setdefault(module_key, {}).setdefault(model_key, {}).update(info)
+        return results
+
+    def compact(self, results, merge = True):
+        """ save `results` to `save_path` and remove the journal. If `merge` is True, `results` is merged with the saved results
+        by `merge_info`, otherwise `results` overwrites the saved results. The results file is replaced atomically, so that it is
+        never left half written.
+        """
+        self.close()
+        if merge:
+            results = merge_info(new_info=results, prev_info=self.load())
+        temp_path = self.save_path + '.tmp'
+        with open(temp_path, 'w') as fp:
+            json.dump(results, fp, indent=4)
+        os.replace(temp_path, self.save_path)
+        if os.path.isfile(self.journal_path):
+            os.remove(self.journal_path)
+        return results
+
+
 def save_profiled_results(models, save_path, detail, metrics = ["latency"]):
-    new_models = merge_info(new_info=models, info_save_path=save_path)
+    """ save the profiled results of `models` to `save_path`, merged with the results saved before, including the records in the
+    journal of `save_path`.
+    """
     from .backend_meta.utils import dump_profiled_results
-    with open(save_path, 'w') as fp:
-        json.dump(dump_profiled_results(new_models, detail=detail, metrics=metrics), fp, indent=4)
+    ResultsJournal(save_path).compact(dump_profiled_results(models, detail=detail, metrics=metrics))
 
 
 def handle_timeout(sig, frame):
-    raise TimeoutError('Model profiling took too long (longer than the time threshold in the funciton `nn_meter.builder.profile_models`, default to be 300s)')
+    """ the `signal.SIGALRM` handler formerly used by `profile_models`. It is kept for compatibility, and `run_with_timeout`
+    should be used instead, which works in any thread.
+    """
+    warnings.warn("`handle_timeout` is deprecated, please use `run_with_timeout` instead.", DeprecationWarning, stacklevel=2)
+    raise TimeoutError('Model profiling took too long (longer than the time threshold in the function '
+                       '`nn_meter.builder.profile_models`, default to be 300s)')
+
+
+class JobNotStoppedError(TimeoutError):
+    """ raised by `run_with_timeout` if the timeout job is still running after it is cancelled
+    """
+    pass
+
+
+def run_with_timeout(func, timeout, on_timeout = None, stop_timeout = 60):
+    """ run `func()` and return its result. If `func` does not return in `timeout` seconds, call `on_timeout()` to cancel the
+    running job, wait for the job to stop, and raise a `TimeoutError`.
+
+    `func` is run in a daemon thread watched by the calling thread, so the timeout works in any thread, unlike `signal.alarm`,
+    which only works in the main thread. A thread can not be killed, thus `on_timeout` should stop the work of `func`, e.g.,
+    by killing the subprocess or the process on device. The cleanup of the cancelled job, such as removing its files from the
+    device, has finished when the `TimeoutError` is raised, unless the job does not stop in `stop_timeout` seconds, in which
+    case a `JobNotStoppedError` is raised.
+    """
+    if not timeout:
+        return func()
+
+    result = {}
+    def target():
+        try:
+            result['value'] = func()
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        if on_timeout is not None:
+            try:
+                on_timeout()
+            except Exception as e:
+                logging.warning(f"Failed to cancel the timeout job: {e}")
+        thread.join(stop_timeout)
+        if thread.is_alive():
+            raise JobNotStoppedError(f'Model profiling took too long (longer than the time threshold {timeout}s), and did not '
+                                     f'stop in {stop_timeout}s after cancelled')
+        raise TimeoutError(f'Model profiling took too long (longer than the time threshold {timeout}s in the function '
+                           '`nn_meter.builder.profile_models`, default to be 300s)')
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def init_generate_worker(implement):
+    """ import the framework and set up the session once for each worker of a model generation pool, instead of once for each
+    generated model
+    """
+    if implement == 'tensorflow':
+        import tensorflow as tf
+        # the workers run in parallel, thus each worker uses a single thread
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    elif implement == 'torch':
+        import torch
+        torch.set_num_threads(1)
@@ -1,3 +1,6 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 from .utils import model_file_to_graph, model_to_graph
+from .binary_ir import dump_binary_ir, dumps_binary_ir, load_binary_ir, loads_binary_ir
+from .bulk_converter import convert_model_files
+from .symbolic_shape import SymbolicIRGraph, make_symbolic_graph, instantiate
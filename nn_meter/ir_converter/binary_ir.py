@@ -0,0 +1,346 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+"""
+Binary serialization of nn-Meter IR graphs.
+
+File layout (little endian):
+    header | node records | string table | layout table | node index
+
+- header: magic, format version, the number of nodes, strings and layouts, and the
+  offsets of the string table, the layout table and the node index.
+- node records: for each node, the id of its layout followed by all scalar values of
+  the node packed with the struct format of the layout.
+- string table: `num_strings + 1` uint32 offsets followed by the utf-8 blob. All node
+  names, op types, attribute names and string values are interned here and stored
+  in records as uint32 ids.
+- layout table: a json list of the node layouts. A layout describes the nesting of
+  dicts and lists in a node, the interned dict keys and the type of every value.
+  Nodes of the same op type and shape ranks share the same layout.
+- node index: for each node, the interned id of its name and the offset of its record.
+
+Int lists, such as the dims of `input_shape` and `output_shape`, are packed as int64
+arrays, and lists of node names as arrays of string ids. A decoder is compiled once
+per layout, so decoding a record is a single `struct.unpack_from` call plus building
+the node dict. Loading a graph only reads the string table and the node index; the
+records are decoded when a node is accessed.
+"""
+import json
+import mmap
+import struct
+import numbers
+from collections.abc import Mapping
+
+_MAGIC = b"NNIRB\x00\x00\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sHHIIIQQQ")
+_INDEX_ENTRY = struct.Struct("<IQ")
+_U32 = struct.Struct("<I")
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# scalar layouts and their struct format
+_SCALAR_FORMATS = {
+    "N": "", # None
+    "T": "", # True
+    "F": "", # False
+    "q": "q", # int
+    "d": "d", # float
+    "s": "I", # interned string
+}
+_INT_LIST = "I"
+_STR_LIST = "R"
+_LIST = "l"
+_DICT = "d"
+
+
+def _is_int(value):
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool)
+
+
+def _check_int64(value):
+    if not _INT64_MIN <= value <= _INT64_MAX:
+        raise OverflowError(f"Integer {value} is out of the int64 range and is not serializable in nn-Meter binary IR")
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = {}
+        self.layouts = {}
+
+    def intern(self, string):
+        idx = self.strings.get(string)
+        if idx is None:
+            idx = self.strings[string] = len(self.strings)
+        return idx
+
+    def flatten(self, value, values):
+        """
+        append the scalar values of `value` to `values` and return the layout of `value`
+        """
+        if hasattr(value, "tolist"): # numpy arrays and scalars
+            value = value.tolist()
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode("utf-8")
+
+        if value is None:
+            return "N"
+        if value is True:
+            return "T"
+        if value is False:
+            return "F"
+        if _is_int(value):
+            _check_int64(value)
+            values.append(value)
+            return "q"
+        if isinstance(value, numbers.Real):
+            values.append(float(value))
+            return "d"
+        if isinstance(value, str):
+            values.append(self.intern(value))
+            return "s"
+        if isinstance(value, (list, tuple)):
+            if len(value) > 0 and all(_is_int(item) for item in value):
+                for item in value:
+                    _check_int64(item)
+                values.extend(value)
+                return (_INT_LIST, len(value))
+            if len(value) > 0 and all(isinstance(item, str) for item in value):
+                values.extend(self.intern(item) for item in value)
+                return (_STR_LIST, len(value))
+            return (_LIST, tuple(self.flatten(item, values) for item in value))
+        if isinstance(value, Mapping):
+            return (_DICT, tuple(
+                (self.intern(str(key)), self.flatten(item, values)) for key, item in value.items()
+            ))
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable in nn-Meter binary IR")
+
+    def encode_node(self, node):
+        values = []
+        layout = self.flatten(node, values)
+        if layout not in self.layouts:
+            self.layouts[layout] = (len(self.layouts), struct.Struct("<I" + _layout_format(layout)))
+        layout_id, layout_struct = self.layouts[layout]
+        return layout_struct.pack(layout_id, *values)
+
+
+def _layout_format(layout):
+    if isinstance(layout, str):
+        return _SCALAR_FORMATS[layout]
+    tag, items = layout
+    if tag == _INT_LIST:
+        return f"{int(items)}q"
+    if tag == _STR_LIST:
+        return f"{int(items)}I"
+    if tag == _LIST:
+        return "".join(_layout_format(item) for item in items)
+    if tag == _DICT:
+        return "".join(_layout_format(item) for _, item in items)
+    raise ValueError(f"Invalid nn-Meter binary IR: unknown layout tag {tag}.")
+
+
+def _layout_expression(layout, counter):
+    """
+    python expression building the value of `layout` from the unpacked values `v` and the strings `S`
+    """
+    if isinstance(layout, str):
+        if layout == "N":
+            return "None"
+        if layout == "T":
+            return "True"
+        if layout == "F":
+            return "False"
+        if layout in ("q", "d", "s"):
+            idx = counter[0]
+            counter[0] += 1
+            return f"S[v[{idx}]]" if layout == "s" else f"v[{idx}]"
+        raise ValueError(f"Invalid nn-Meter binary IR: unknown layout tag {layout}.")
+    tag, items = layout
+    if tag in (_INT_LIST, _STR_LIST):
+        start, length = counter[0], int(items)
+        counter[0] += length
+        if tag == _INT_LIST:
+            return f"list(v[{start}:{start + length}])"
+        return "[" + "".join(f"S[v[{idx}]], " for idx in range(start, start + length)) + "]"
+    if tag == _LIST:
+        return "[" + "".join(_layout_expression(item, counter) + ", " for item in items) + "]"
+    if tag == _DICT:
+        return "{" + "".join(
+            f"S[{int(key)}]: {_layout_expression(item, counter)}, " for key, item in items
+        ) + "}"
+    raise ValueError(f"Invalid nn-Meter binary IR: unknown layout tag {tag}.")
+
+
+def _compile_layout(layout):
+    """
+    compile the struct and the decoder function of a layout
+    """
+    namespace = {}
+    exec(f"def decode(v, S):\n    return {_layout_expression(layout, [0])}\n", namespace)
+    return struct.Struct("<" + _layout_format(layout)), namespace["decode"]
+
+
+def _as_layout(layout):
+    """
+    convert a layout loaded from json back to the hashable form used by the encoder
+    """
+    if isinstance(layout, str):
+        return layout
+    tag, items = layout
+    if tag in (_INT_LIST, _STR_LIST):
+        return (tag, int(items))
+    if tag == _LIST:
+        return (tag, tuple(_as_layout(item) for item in items))
+    if tag == _DICT:
+        return (tag, tuple((int(key), _as_layout(item)) for key, item in items))
+    raise ValueError(f"Invalid nn-Meter binary IR: unknown layout tag {tag}.")
+
+
+def dumps_binary_ir(graph):
+    """
+    serialize a nn-Meter IR graph to bytes in the binary nn-Meter IR format
+    @params:
+
+    graph: the nn-Meter IR graph, a dict mapping node names to node dicts
+    """
+    encoder = _Encoder()
+    records, index = [], []
+    offset = _HEADER.size
+    for name, node in graph.items():
+        records.append(encoder.encode_node(node))
+        index.append(_INDEX_ENTRY.pack(encoder.intern(name), offset))
+        offset += len(records[-1])
+
+    encoded_strings = [string.encode("utf-8") for string in encoder.strings]
+    string_offsets = [0]
+    for string in encoded_strings:
+        string_offsets.append(string_offsets[-1] + len(string))
+    layouts = sorted(encoder.layouts, key=lambda layout: encoder.layouts[layout][0])
+    encoded_layouts = json.dumps(layouts, separators=(",", ":")).encode("utf-8")
+
+    strings_offset = offset
+    layouts_offset = strings_offset + 4 * len(string_offsets) + string_offsets[-1]
+    index_offset = layouts_offset + len(encoded_layouts)
+    header = _HEADER.pack(_MAGIC, _VERSION, 0, len(index), len(encoded_strings), len(layouts),
+                          strings_offset, layouts_offset, index_offset)
+    return b"".join([
+        header,
+        *records,
+        struct.pack(f"<{len(string_offsets)}I", *string_offsets),
+        *encoded_strings,
+        encoded_layouts,
+        *index,
+    ])
+
+
+def dump_binary_ir(graph, filename):
+    """
+    save a nn-Meter IR graph to file in the binary nn-Meter IR format (*.irb)
+    @params:
+
+    graph: the nn-Meter IR graph, a dict mapping node names to node dicts
+    filename: the path of the output file
+    """
+    with open(filename, "wb") as fp:
+        fp.write(dumps_binary_ir(graph))
+
+
+class BinaryIRGraph(Mapping):
+    """
+    A read-only nn-Meter IR graph backed by a buffer in the binary nn-Meter IR format. Nodes are
+    decoded on access and every access returns a new node dict, so the graph behaves like the dict
+    loaded from a json IR file. Use `to_dict` to decode all nodes at once.
+
+    A graph loaded by `from_file` keeps the file memory-mapped until `close` is called, the graph
+    is used as a context manager, or the graph is garbage collected. Nodes could not be accessed
+    after the graph is closed, while the decoded node dicts stay valid.
+    """
+    def __init__(self, buffer):
+        self._mmap = buffer if isinstance(buffer, mmap.mmap) else None
+        self._buffer = memoryview(buffer)
+        if len(self._buffer) < _HEADER.size:
+            raise ValueError("Invalid nn-Meter binary IR: file is truncated.")
+        magic, version, _, num_nodes, num_strings, num_layouts, strings_offset, layouts_offset, index_offset = \
+            _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("Invalid nn-Meter binary IR: magic number mismatched.")
+        if version != _VERSION:
+            raise ValueError(f"Unsupported nn-Meter binary IR version {version}, expected version {_VERSION}.")
+
+        # most interned strings are node names, which are needed by the index anyway
+        string_offsets = struct.unpack_from(f"<{num_strings + 1}I", self._buffer, strings_offset)
+        blob_offset = strings_offset + 4 * (num_strings + 1)
+        with self._buffer[blob_offset: blob_offset + string_offsets[-1]] as blob:
+            self._strings = [
+                str(blob[start: end], "utf-8") for start, end in zip(string_offsets[:-1], string_offsets[1:])
+            ]
+
+        with self._buffer[layouts_offset: index_offset] as encoded_layouts:
+            self._layouts = [_as_layout(layout) for layout in json.loads(str(encoded_layouts, "utf-8"))]
+        if len(self._layouts) != num_layouts:
+            raise ValueError("Invalid nn-Meter binary IR: layout table is corrupted.")
+        self._decoders = [None] * num_layouts
+
+        with self._buffer[index_offset: index_offset + num_nodes * _INDEX_ENTRY.size] as index_buffer:
+            self._index = {
+                self._strings[name_id]: offset for name_id, offset in _INDEX_ENTRY.iter_unpack(index_buffer)
+            }
+
+    @classmethod
+    def from_file(cls, filename):
+        """
+        memory-map a binary nn-Meter IR file without reading it into memory
+        """
+        with open(filename, "rb") as fp:
+            return cls(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _decode(self, offset):
+        layout_id = _U32.unpack_from(self._buffer, offset)[0]
+        decoder = self._decoders[layout_id]
+        if decoder is None:
+            decoder = self._decoders[layout_id] = _compile_layout(self._layouts[layout_id])
+        layout_struct, build = decoder
+        return build(layout_struct.unpack_from(self._buffer, offset + 4), self._strings)
+
+    def __getitem__(self, name):
+        return self._decode(self._index[name])
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __deepcopy__(self, memo):
+        # decoded nodes are fresh objects, thus a deep copy is the decoded dict
+        return self.to_dict()
+
+    def to_dict(self):
+        return {name: self._decode(offset) for name, offset in self._index.items()}
+
+    def close(self):
+        self._buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def loads_binary_ir(data):
+    """
+    load a nn-Meter IR graph from bytes in the binary nn-Meter IR format
+    """
+    return BinaryIRGraph(data)
+
+
+def load_binary_ir(filename):
+    """
+    load a nn-Meter IR graph from a binary nn-Meter IR file (*.irb). The file is memory-mapped
+    and nodes are decoded lazily on access, until the returned graph is closed.
+    """
+    return BinaryIRGraph.from_file(filename)
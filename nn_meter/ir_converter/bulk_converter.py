@@ -0,0 +1,132 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import os
+import json
+import time
+import logging
+import traceback
+import multiprocessing
+from glob import glob
+from .utils import model_file_to_graph
+from .binary_ir import dump_binary_ir
+from nn_meter.utils.utils import NumpyEncoder
+from nn_meter.utils.import_package import try_import_onnx, try_import_tensorflow
+logging = logging.getLogger("nn-Meter")
+
+
+__model_suffix__ = {
+    "pb": ".pb",
+    "onnx": ".onnx",
+}
+
+__summary_filename__ = "get_ir_summary.json"
+
+
+def list_model_files(input_path, model_type):
+    """ list the model files to convert from a folder, a single model file, or a text file with one model path per line
+    """
+    if os.path.isdir(input_path):
+        model_files = glob(os.path.join(input_path, "**", "*" + __model_suffix__[model_type]), recursive=True)
+    elif input_path.endswith(__model_suffix__[model_type]):
+        model_files = [input_path]
+    else:
+        with open(input_path, "r") as fp:
+            model_files = [line.strip() for line in fp if line.strip()]
+    return sorted(model_files)
+
+
+def get_ir_filename(model_file, model_type, output_dir, binary=False, root=None):
+    """ return the path of the IR graph of `model_file` in `output_dir`. The path of the model file relative to `root` is kept
+    in `output_dir`, so that the models of the same name in different sub folders do not overwrite each other. If `root` is
+    None, the IR graph is saved directly in `output_dir`.
+    """
+    suffix = ".irb" if binary else ".json"
+    relpath = os.path.relpath(model_file, root) if root else os.path.basename(model_file)
+    if relpath.endswith(__model_suffix__[model_type]):
+        relpath = relpath[:-len(__model_suffix__[model_type])]
+    return os.path.join(output_dir, f"{relpath}_{model_type}_ir{suffix}")
+
+
+def _init_worker(model_type):
+    # import the framework once for each worker instead of once for each model
+    if model_type == "pb":
+        try_import_tensorflow()
+    elif model_type == "onnx":
+        try_import_onnx()
+
+
+def _convert_model_file(task):
+    model_file, model_type, filename, binary = task
+    start = time.time()
+    try:
+        graph = model_file_to_graph(model_file, model_type)
+        # write to a temporary file first, so that an interrupted conversion is not taken as done when resuming
+        temp_filename = filename + ".tmp"
+        os.makedirs(os.path.dirname(temp_filename), exist_ok=True)
+        if binary:
+            dump_binary_ir(graph, temp_filename)
+        else:
+            with open(temp_filename, "w") as fp:
+                json.dump(graph, fp, indent=4, skipkeys=True, sort_keys=True, cls=NumpyEncoder)
+        os.replace(temp_filename, filename)
+        return {"model": model_file, "output": filename, "time": time.time() - start, "error": None}
+    except Exception:
+        return {"model": model_file, "output": None, "time": time.time() - start, "error": traceback.format_exc()}
+
+
+def convert_model_files(model_files, model_type, output_dir, workers=None, binary=False, resume=True, root=None):
+    """
+    convert model files to nn-Meter IR graphs in parallel and save them into the output folder. A summary with the
+    failures and the conversion time of each model is saved as `get_ir_summary.json` in the output folder.
+    @params:
+
+    model_files: list of model file paths
+    model_type: string to specify the type of the model files, allowed items are ["pb", "onnx"]
+    output_dir: the folder to save the nn-Meter IR graphs
+    workers: the number of worker processes. Each worker imports the model framework once. Default to be the cpu count.
+    binary: if True, save the IR graphs in the binary nn-Meter IR format (*.irb), otherwise in json format
+    resume: if True, skip the models whose IR graph already exists in the output folder
+    root: the IR graphs are saved in the output folder by the paths of the model files relative to `root`, e.g., the input
+        folder. Default to be the common folder of all model files.
+    """
+    if model_type not in __model_suffix__:
+        raise ValueError(f"Unsupported model type for bulk conversion: {model_type}")
+    os.makedirs(output_dir, exist_ok=True)
+    if root is None and model_files:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(model_file)) for model_file in model_files])
+
+    tasks, skipped = [], []
+    for model_file in model_files:
+        filename = get_ir_filename(os.path.abspath(model_file), model_type, output_dir, binary, os.path.abspath(root))
+        if resume and os.path.isfile(filename):
+            skipped.append({"model": model_file, "output": filename})
+        else:
+            tasks.append((model_file, model_type, filename, binary))
+    logging.keyinfo(f"Converting {len(tasks)} models with {workers or os.cpu_count()} workers, "
+                    f"{len(skipped)} models have been converted before and are skipped.")
+
+    converted, failed = [], []
+    start = time.time()
+    if tasks:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(model_type,)) as pool:
+            for i, result in enumerate(pool.imap_unordered(_convert_model_file, tasks)):
+                if result["error"] is None:
+                    converted.append(result)
+                    logging.info(f"[{i + 1}/{len(tasks)}] {result['model']} converted in {result['time']:.2f}s.")
+                else:
+                    failed.append(result)
+                    logging.warning(f"[{i + 1}/{len(tasks)}] failed to convert {result['model']}:\n{result['error']}")
+
+    summary = {
+        "converted": sorted(converted, key=lambda x: x["model"]),
+        "skipped": skipped,
+        "failed": sorted(failed, key=lambda x: x["model"]),
+        "total_time": sum(result["time"] for result in converted + failed),
+        "wall_time": time.time() - start,
+    }
+    summary_filename = os.path.join(output_dir, __summary_filename__)
+    with open(summary_filename, "w") as fp:
+        json.dump(summary, fp, indent=4)
+    logging.result(f"{len(converted)} models converted, {len(skipped)} skipped, {len(failed)} failed. "
+                   f"Summary saved to {os.path.abspath(summary_filename)}")
+    return summary
@@ -1,3 +1,4 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 from .frozenpb_converter import FrozenPbConverter
+from .shape_inference import ShapeInference
@@ -17,7 +17,7 @@ class FrozenPbConverter:
         dynamic_fetcher = ShapeFetcher(parser.graph)
 
         # Change split to more firendly scheme
-        parser.fix_split_naming(self.model_graph)
+        parser.fix_split_naming(self.model_graph, parser.output_ports)
 
         # Get the static shape
         ShapeInference(self.model_graph, dynamic_fetcher)
@@ -16,6 +16,8 @@ class FrozenPbParser:
         graph.ParseFromString(f.read())
 
         self.graph = graph
+        self.nodes_by_name = {node.name: node for node in graph.node}
+        self.output_ports = {}
 
     @staticmethod
     def strip_useless_nodes(model_graph):
@@ -65,7 +67,30 @@ class FrozenPbParser:
         model_graph.refresh()
 
     @staticmethod
-    def fix_split_naming(model_graph):
+    def index_output_ports(node_names, output_ports=None):
+        """
+        Index the "NODE_NAME:NUMBER" output notations by their producer node name.
+
+        Parameters
+        ----------
+        node_names : iterable of str
+            the node names or input names to index
+        output_ports : dict, optional
+            an existing index to extend, mapping the producer name to the list of
+            its "NODE_NAME:NUMBER" names
+        """
+        if output_ports is None:
+            output_ports = {}
+        for name in node_names:
+            base_name, sep, port = name.rpartition(":")
+            if sep and port.isdigit():
+                ports = output_ports.setdefault(base_name, [])
+                if name not in ports:
+                    ports.append(name)
+        return output_ports
+
+    @staticmethod
+    def fix_split_naming(model_graph, output_ports=None):
         """
         TensorFlow is using "NODE_NAME:NUMBER"  for example "split:0", "split:1"
         as a notation to oredered outputs,
@@ -76,31 +101,29 @@ class FrozenPbParser:
         ----------
         model_graph : ModelGraph
             the graph holder
+        output_ports : dict, optional
+            the index built by `index_output_ports` while parsing. If not given, it
+            is built from the node names of the graph.
         """
         graph = model_graph.get_graph()
-        graph_nodes = copy.deepcopy(list(graph.keys()))
+        if output_ports is None:
+            output_ports = FrozenPbParser.index_output_ports(graph.keys())
+
         remove_node_list = []
-        for graph_node in graph_nodes:
-            if graph_node in graph.keys():
-                if "attr" in graph[graph_node].keys():
-                    if (
-                        graph[graph_node]["attr"]["type"] == "Split"
-                        and ":" not in graph_node
-                    ):
-                        logging.info("Find split main node %s." % graph_node)
-                        split_node_name = graph_node
-                        for node_name in graph.keys():
-                            idx = re.findall(r"%s:(\d+)" % split_node_name, node_name)
-                            if len(idx) > 0:
-                                idx = int(idx[0])
-                                logging.info("Find split child node %s." % node_name)
-                                graph[graph_node]["outbounds"] += graph[node_name][
-                                    "outbounds"
-                                ]
-                                graph[graph[node_name]["outbounds"][0]]["inbounds"] += [
-                                    graph_node
-                                ]
-                                remove_node_list.append(node_name)
+        for split_node_name, port_names in output_ports.items():
+            split_node = graph.get(split_node_name)
+            if split_node is None or "attr" not in split_node or split_node["attr"]["type"] != "Split":
+                continue
+            logging.info("Find split main node %s." % split_node_name)
+            for node_name in port_names:
+                if node_name not in graph:
+                    continue
+                logging.info("Find split child node %s." % node_name)
+                outbounds = graph[node_name].get("outbounds", [])
+                split_node["outbounds"] += outbounds
+                for outbound in outbounds:
+                    graph[outbound]["inbounds"].append(split_node_name)
+                remove_node_list.append(node_name)
 
         for node in remove_node_list:
             del graph[node]
@@ -185,49 +208,48 @@ class FrozenPbParser:
                 attr_dict["shape"] = list(map(int, shape))
                 continue
 
-        if node.op in attr_as_node.keys():
-            for target_node in self.graph.node:
-                if "regex" in attr_as_node[node.op].keys():
-                    node_attr = re.findall(
-                        attr_as_node[node.op]["node_name"](node.name), target_node.name
-                    )
-                    if len(node_attr) > 0:
-                        logging.info("Find regex matching node %s" % node.name)
-                        for attr_name in target_node.attr.keys():
-                            if (
-                                attr_name == "value"
-                                and "weight" not in node.name
-                                and "BatchNorm" not in node.name
-                                and "kernel" not in node.name
-                            ):
-                                node_attr_name = attr_as_node[node.op]["attr_name"]
-                                if node_attr_name not in attr_dict.keys():
-                                    attr_dict[node_attr_name] = []
-                                attr_dict[node_attr_name].append(
-                                    copy.deepcopy(
-                                        attr_as_node[node.op]["node_value"](
-                                            target_node.attr[attr_name].tensor
-                                        )
-                                    )
-                                )
-                else:
-                    if target_node.name == attr_as_node[node.op]["node_name"](
-                        node.name
+        if node.op in attr_as_node.keys() and "regex" not in attr_as_node[node.op].keys():
+            target_node = self.nodes_by_name.get(attr_as_node[node.op]["node_name"](node.name))
+            if target_node is not None:
+                for attr_name in target_node.attr.keys():
+                    if (
+                        attr_name == "value"
+                        and "weight" not in node.name
+                        and "BatchNorm" not in node.name
+                        and "kernel" not in node.name
                     ):
-                        for attr_name in target_node.attr.keys():
-                            if (
-                                attr_name == "value"
-                                and "weight" not in node.name
-                                and "BatchNorm" not in node.name
-                                and "kernel" not in node.name
-                            ):
-                                attr_dict[
-                                    attr_as_node[node.op]["attr_name"]
-                                ] = copy.deepcopy(
+                        attr_dict[
+                            attr_as_node[node.op]["attr_name"]
+                        ] = copy.deepcopy(
+                            attr_as_node[node.op]["node_value"](
+                                target_node.attr[attr_name].tensor
+                            )
+                        )
+
+        elif node.op in attr_as_node.keys():
+            for target_node in self.graph.node:
+                node_attr = re.findall(
+                    attr_as_node[node.op]["node_name"](node.name), target_node.name
+                )
+                if len(node_attr) > 0:
+                    logging.info("Find regex matching node %s" % node.name)
+                    for attr_name in target_node.attr.keys():
+                        if (
+                            attr_name == "value"
+                            and "weight" not in node.name
+                            and "BatchNorm" not in node.name
+                            and "kernel" not in node.name
+                        ):
+                            node_attr_name = attr_as_node[node.op]["attr_name"]
+                            if node_attr_name not in attr_dict.keys():
+                                attr_dict[node_attr_name] = []
+                            attr_dict[node_attr_name].append(
+                                copy.deepcopy(
                                     attr_as_node[node.op]["node_value"](
                                         target_node.attr[attr_name].tensor
                                     )
                                 )
+                            )
 
         return attr_dict
 
@@ -242,7 +264,9 @@ class FrozenPbParser:
         """
 
         for node in self.graph.node:
-            model_graph.node(str(node.name), list(map(str, node.input)))
+            inputs = list(map(str, node.input))
+            self.index_output_ports(inputs, self.output_ports)
+            model_graph.node(str(node.name), inputs)
             model_graph.set_node_attr(
                 node.name,
                 {
@@ -1,13 +1,20 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 from functools import reduce
-import copy
 import math
 import logging
 from .protobuf_helper import ProtobufHelper as ph
 logging = logging.getLogger("nn-Meter")
 
 
+def _freeze_shapes(shapes):
+    """
+    Convert a list of shapes to a tuple of immutable shape tuples, so that
+    nodes can share shapes with their inbounds without copying.
+    """
+    return tuple(tuple(shape) for shape in shapes)
+
+
 class ShapeInference:
 
     # Ops that only need to calculate the prodcast for shapes
@@ -22,6 +29,10 @@ class ShapeInference:
         "Mul",
         "Div",
         "DivNoNan",
+        "RealDiv",
+        "Maximum",
+        "Minimum",
+        "SquaredDifference",
         "Equal",
     ]
 
@@ -38,6 +49,9 @@ class ShapeInference:
         "Cosh",
         "Exp",
         "Floor",
+        "Log",
+        "Neg",
+        "Rsqrt",
         "Sin",
         "Sinh",
         "Sqrt",
@@ -52,12 +66,78 @@ class ShapeInference:
         "Relu6",
         "Selu",
         "LeakyReLU",
-        "Elu"
+        "Elu",
+        "Sigmoid",
+        "Tanh",
         "Softmax",
 
         "NoOp"
     ]
 
+    # Ops patched in the second pass, after all other shapes are known
+    TF_SECOND_PASS_OPS = [
+        "Pack",
+        "StridedSlice",
+    ]
+
+    # Registry of static shape handlers keyed by op type, filled by `_build_handlers`
+    _handlers = {}
+
+    @classmethod
+    def register_handler(cls, op_type, handler):
+        """
+        Register a static shape handler for an op type. Registered handlers take
+        precedence over the builtin ones and keep the op away from the dynamic fetcher.
+
+        Parameters
+        ----------
+        op_type : str
+            The tensorflow op type, such as "Conv2D".
+        handler : callable
+            A function `handler(graph, node)` returning `(input_shapes, output_shapes)`,
+            or None if the shapes could not be inferred statically.
+        """
+        cls._handlers[op_type] = handler
+
+    @classmethod
+    def unregister_handler(cls, op_type):
+        """
+        Remove the static shape handler of an op type.
+
+        Parameters
+        ----------
+        op_type : str
+            The tensorflow op type to remove.
+        """
+        cls._handlers.pop(op_type, None)
+
+    @classmethod
+    def get_handler(cls, op_type):
+        """
+        Get the static shape handler of an op type, or None if the op type is not supported.
+
+        Parameters
+        ----------
+        op_type : str
+            The tensorflow op type.
+        """
+        return cls._handlers.get(op_type)
+
+    @classmethod
+    def _build_handlers(cls):
+        """
+        Precompile the handler registry from the op lists and the `<OpType>_get_shape` methods.
+        """
+        handlers = {}
+        for op_type in cls.TF_PRODCAST_MATH_OPS:
+            handlers[op_type] = cls.eval_prodcast
+        for op_type in cls.TF_PROPAGATE_MATH_OPS:
+            handlers[op_type] = cls.propagate_shape
+        for attr_name in dir(cls):
+            if attr_name.endswith("_get_shape"):
+                handlers[attr_name[:-len("_get_shape")]] = getattr(cls, attr_name)
+        return handlers
+
     @staticmethod
     def eval_prodcast(graph, node):
         """
@@ -73,11 +153,12 @@ class ShapeInference:
         """
         input_nodes = node["inbounds"]
         if len(input_nodes) < 2:
-            logging.warn(
-                "Invalid input op num for prodcast op %s" % (node["attr"]["name"])
+            logging.warning(
+                "Invalid input op num for prodcast op %s", node["attr"]["name"]
             )
             if len(input_nodes) == 1:
-                return graph[node["inbounds"][0]]["attr"]["output_shape"][0]
+                input_shape = graph[input_nodes[0]]["attr"]["output_shape"][0]
+                return [input_shape], [input_shape]
             else:
                 return None
 
@@ -89,7 +170,7 @@ class ShapeInference:
             input_shape_list.append(input_shape)
             if target_dim < len(input_shape):
                 target_dim = len(input_shape)
-                target_shape = input_shape
+                target_shape = list(input_shape)
             elif target_dim == len(input_shape):
                 for i in range(target_dim):
                     if target_shape[i] < input_shape[i]:
@@ -115,12 +196,6 @@ class ShapeInference:
         padding : str
             Padding type, now support SAME and VALID.
         """
-
-        logging.info(
-            "Calculating padding shape, input shape: %s, kernel size: %s, strides: %s, padding: %s."
-            % (str(input_shape), str(k_size), str(strides), str(padding))
-        )
-
         if padding == "SAME":
             outh = math.ceil(ph.get_h(input_shape) / ph.get_h(strides))
             outw = math.ceil(ph.get_w(input_shape) / ph.get_w(strides))
@@ -154,11 +229,11 @@ class ShapeInference:
 
             pad_size = [0, 0, 0, 0]
         else:
-            logging.error("Unexpected padding format %s." % (padding))
+            logging.error("Unexpected padding format %s.", padding)
             return None, None
 
         output_shape = list(map(int, [input_shape[0], outh, outw, cout]))
-        return copy.deepcopy(output_shape), copy.deepcopy(pad_size)
+        return output_shape, pad_size
 
     @staticmethod
     def Const_get_shape(graph, node):
@@ -189,7 +264,7 @@ class ShapeInference:
             The node in Graph IR in dict format.
         """
         return [], [graph[node["inbounds"][0]]["attr"]["output_shape"][0]]
-    
+
     @staticmethod
     def Pad_get_shape(graph, node):
         """
@@ -203,13 +278,13 @@ class ShapeInference:
         node   : dict
             The node in Graph IR in dict format.
         """
-        in_shape = [graph[node["inbounds"][0]]["attr"]["output_shape"][0]]
+        in_shape = graph[node["inbounds"][0]]["attr"]["output_shape"][0]
         paddings = node["attr"]["attr"]["paddings"]
         out_shape = []
         for dim in range(len(in_shape)):
             out_shape.append(in_shape[dim] + sum(paddings[dim]))
-        return in_shape, out_shape
-    
+        return [in_shape], [out_shape]
+
     @staticmethod
     def PadV2_get_shape(graph, node):
         """
@@ -238,7 +313,6 @@ class ShapeInference:
         node   : dict
             The node in Graph IR in dict format.
         """
-        logging.info("Propagate through op %s.", node["attr"]["name"])
         in_shape = [graph[node["inbounds"][0]]["attr"]["output_shape"][0]]
         return in_shape, in_shape
 
@@ -255,46 +329,29 @@ class ShapeInference:
             The node in Graph IR in dict format.
         """
         if len(node["inbounds"]) != 1:
-            logging.warning("Failed to get input node of %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get input node of %s.", node["attr"]["name"])
             return
 
-        input_shape = copy.deepcopy(
-            graph[node["inbounds"][0]]["attr"]["output_shape"][0]
-        )
-        logging.info(
-            "Get input shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], node["inbounds"][0], input_shape)
-        )
-
+        input_shape = graph[node["inbounds"][0]]["attr"]["output_shape"][0]
         k_size = node["attr"]["attr"]["ksize"]
 
         if node["attr"]["attr"]["strides"][::3] != [1, 1]:
             logging.warning(
-                "Invalid strides %s of node %s."
-                % (str(node["attr"]["attr"]["strides"]), node["attr"]["name"])
+                "Invalid strides %s of node %s.",
+                node["attr"]["attr"]["strides"], node["attr"]["name"]
             )
-            logging.info(node)
             return
 
         strides = node["attr"]["attr"]["strides"]
         padding = node["attr"]["attr"]["padding"].decode("utf-8")
-        logging.info(
-            "Op:%s, stride:%s, padding:%s."
-            % (node["attr"]["name"], str(strides), str(padding))
-        )
 
         out_shape, padding_shape = ShapeInference.get_padding_shape(
             input_shape, input_shape[3], k_size, strides, padding
         )
 
-        node["attr"]["attr"]["ksize"] = copy.deepcopy(
-            node["attr"]["attr"]["ksize"][1:-1]
-        )
-        node["attr"]["attr"]["strides"] = copy.deepcopy(
-            node["attr"]["attr"]["strides"][1:-1]
-        )
-        node["attr"]["attr"]["pads"] = copy.deepcopy(padding_shape)
+        node["attr"]["attr"]["ksize"] = node["attr"]["attr"]["ksize"][1:-1]
+        node["attr"]["attr"]["strides"] = node["attr"]["attr"]["strides"][1:-1]
+        node["attr"]["attr"]["pads"] = padding_shape
 
         return [input_shape], [out_shape]
 
@@ -339,7 +396,7 @@ class ShapeInference:
             The node in Graph IR in dict format.
         """
         return ShapeInference.Pool_get_shape(graph, node)
-    
+
     @staticmethod
     def MaxPoolV2_get_shape(graph, node):
         """
@@ -397,55 +454,38 @@ class ShapeInference:
         """
         weight_node = ph.find_weights_root(graph, node)
         if len(weight_node) != 1:
-            logging.warning("Failed to get shape of node %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get shape of node %s.", node["attr"]["name"])
             return
 
-        input_node = [x for x in node["inbounds"] if x != weight_node]
+        input_node = [x for x in node["inbounds"] if x not in weight_node]
         input_node = [x for x in input_node if graph[x]["attr"]["type"] != "Identity"]
         if len(input_node) != 1:
-            logging.warning("Failed to get input node of %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get input node of %s.", node["attr"]["name"])
             return
 
-        input_shape = copy.deepcopy(graph[input_node[0]]["attr"]["output_shape"][0])
-        logging.info(
-            "Get input shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], input_node[0], input_shape)
-        )
+        input_shape = graph[input_node[0]]["attr"]["output_shape"][0]
 
         weight_shape = graph[weight_node[0]]["attr"]["attr"]["tensor_shape"]
         if len(weight_shape) != 4:
             logging.warning(
-                "Failed to parse weight shape %s of node %s."
-                % (str(weight_shape), node["attr"]["name"])
+                "Failed to parse weight shape %s of node %s.",
+                weight_shape, node["attr"]["name"]
             )
-            logging.info(node)
             return
 
-        logging.info(
-            "Get weight shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], weight_node, weight_shape)
-        )
-
         k_size = weight_shape[:2]
         cout = weight_shape[3]
 
         if node["attr"]["attr"]["strides"][::3] != [1, 1]:
             logging.warning(
-                "Invalid strides %s of node %s."
-                % (str(node["attr"]["attr"]["strides"]), node["attr"]["name"])
+                "Invalid strides %s of node %s.",
+                node["attr"]["attr"]["strides"], node["attr"]["name"]
             )
-            logging.info(node)
             return
 
         strides = node["attr"]["attr"]["strides"]
         dilation = node["attr"]["attr"]["dilations"]
         padding = node["attr"]["attr"]["padding"].decode("utf-8")
-        logging.info(
-            "Op:%s, stride:%s, dilation:%s, padding:%s."
-            % (node["attr"]["name"], str(strides), str(dilation), str(padding))
-        )
 
         kernel_extent_w = ph.get_w(dilation) * (ph.get_w(strides) - 1) + 1
         kernel_extent_h = ph.get_h(dilation) * (ph.get_h(strides) - 1) + 1
@@ -454,14 +494,10 @@ class ShapeInference:
             input_shape, cout, [kernel_extent_w, kernel_extent_h], strides, padding
         )
 
-        node["attr"]["attr"]["kernel_shape"] = copy.deepcopy(k_size)
-        node["attr"]["attr"]["dilations"] = copy.deepcopy(
-            node["attr"]["attr"]["dilations"][1:-1]
-        )
-        node["attr"]["attr"]["strides"] = copy.deepcopy(
-            node["attr"]["attr"]["strides"][1:-1]
-        )
-        node["attr"]["attr"]["weight_shape"] = copy.deepcopy(weight_shape)
+        node["attr"]["attr"]["kernel_shape"] = list(k_size)
+        node["attr"]["attr"]["dilations"] = node["attr"]["attr"]["dilations"][1:-1]
+        node["attr"]["attr"]["strides"] = node["attr"]["attr"]["strides"][1:-1]
+        node["attr"]["attr"]["weight_shape"] = list(weight_shape)
         node["attr"]["attr"]["pads"] = padding_shape
 
         return [input_shape], [out_shape]
@@ -480,57 +516,39 @@ class ShapeInference:
         """
         weight_node = ph.find_weights_root(graph, node)
         if len(weight_node) != 1:
-            logging.warning("Failed to get shape of node %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get shape of node %s.", node["attr"]["name"])
             return
 
-        input_node = [x for x in node["inbounds"] if x != weight_node]
+        input_node = [x for x in node["inbounds"] if x not in weight_node]
         input_node = [x for x in input_node if graph[x]["attr"]["type"] != "Identity"]
         if len(input_node) != 1:
-            logging.warning("Failed to get input node of %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get input node of %s.", node["attr"]["name"])
             return
 
-        input_shape = copy.deepcopy(graph[input_node[0]]["attr"]["output_shape"][0])
-        logging.info(
-            "Get input shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], input_node[0], input_shape)
-        )
+        input_shape = graph[input_node[0]]["attr"]["output_shape"][0]
 
         weight_shape = graph[weight_node[0]]["attr"]["attr"]["tensor_shape"]
         if len(weight_shape) != 4:
             logging.warning(
-                "Failed to parse weight shape %s of node %s."
-                % (str(weight_shape), node["attr"]["name"])
+                "Failed to parse weight shape %s of node %s.",
+                weight_shape, node["attr"]["name"]
             )
-            logging.info(node)
             return
 
-        logging.info(
-            "Get weight shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], weight_node, weight_shape)
-        )
-
         k_size = weight_shape[:2]
         cin = weight_shape[2]
 
         if node["attr"]["attr"]["strides"][::3] != [1, 1]:
             logging.warning(
-                "Invalid strides %s of node %s."
-                % (str(node["attr"]["attr"]["strides"]), node["attr"]["name"])
+                "Invalid strides %s of node %s.",
+                node["attr"]["attr"]["strides"], node["attr"]["name"]
             )
-            logging.info(node)
             return
 
         strides = node["attr"]["attr"]["strides"]
         dilation = node["attr"]["attr"]["dilations"]
         padding = node["attr"]["attr"]["padding"].decode("utf-8")
 
-        logging.info(
-            "Op:%s, stride:%s, dilation:%s, padding:%s."
-            % (node["attr"]["name"], str(strides), str(dilation), str(padding))
-        )
-
         kernel_extent_w = ph.get_w(dilation) * (ph.get_w(strides) - 1) + 1
         kernel_extent_h = ph.get_h(dilation) * (ph.get_h(strides) - 1) + 1
 
@@ -538,14 +556,10 @@ class ShapeInference:
             input_shape, cin, [kernel_extent_w, kernel_extent_h], strides, padding
         )
 
-        node["attr"]["attr"]["kernel_shape"] = copy.deepcopy(k_size)
-        node["attr"]["attr"]["dilations"] = copy.deepcopy(
-            node["attr"]["attr"]["dilations"][1:-1]
-        )
-        node["attr"]["attr"]["strides"] = copy.deepcopy(
-            node["attr"]["attr"]["strides"][1:-1]
-        )
-        node["attr"]["attr"]["weight_shape"] = copy.deepcopy(weight_shape)
+        node["attr"]["attr"]["kernel_shape"] = list(k_size)
+        node["attr"]["attr"]["dilations"] = node["attr"]["attr"]["dilations"][1:-1]
+        node["attr"]["attr"]["strides"] = node["attr"]["attr"]["strides"][1:-1]
+        node["attr"]["attr"]["weight_shape"] = list(weight_shape)
         node["attr"]["attr"]["pads"] = padding_shape
 
         return [input_shape], [out_shape]
@@ -563,17 +577,12 @@ class ShapeInference:
             The node in Graph IR in dict format.
         """
         input_shape = graph[node["inbounds"][0]]["attr"]["output_shape"][0]
-        output_shape = input_shape
-        logging.info(
-            "Get input shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], node["inbounds"][0], output_shape)
-        )
+        output_shape = list(input_shape)
 
         output_shape[1] = 0
         output_shape[2] = 0
 
         reduction_indices = node["attr"]["attr"]["reduction_indices"]
-        logging.info("Get Reduction Indices %s.", str(reduction_indices))
 
         reduction_cnt = 0
         for reduction in sorted(reduction_indices):
@@ -638,46 +647,32 @@ class ShapeInference:
         """
         weight_node = ph.find_weights_root(graph, node)
         if len(weight_node) != 1:
-            logging.warning("Failed to get shape of node %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get shape of node %s.", node["attr"]["name"])
             return
 
         weight_shape = graph[weight_node[0]]["attr"]["attr"]["tensor_shape"]
         if len(weight_shape) != 2:
             logging.warning(
-                "Failed to parse weight shape %s of node %s."
-                % (str(weight_shape), node["attr"]["name"])
+                "Failed to parse weight shape %s of node %s.",
+                weight_shape, node["attr"]["name"]
             )
-            logging.info(node)
             return
 
-        logging.info(
-            "Get weight shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], weight_node, weight_shape)
-        )
-
-        input_node = [x for x in node["inbounds"] if x != weight_node]
+        input_node = [x for x in node["inbounds"] if x not in weight_node]
         input_node = [x for x in input_node if graph[x]["attr"]["type"] != "Identity"]
         if len(input_node) != 1:
-            logging.warning("Failed to get input node of %s." % (node["attr"]["name"]))
-            logging.info(node)
+            logging.warning("Failed to get input node of %s.", node["attr"]["name"])
             return
 
-        input_shape = copy.deepcopy(graph[input_node[0]]["attr"]["output_shape"][0])
-        logging.info(
-            "Get input shape of %s from %s, input shape:%s."
-            % (node["attr"]["name"], input_node[0], input_shape)
-        )
+        input_shape = graph[input_node[0]]["attr"]["output_shape"][0]
 
         if weight_shape[0] != input_shape[1]:
             logging.warning(
-                "Weight shape and input shape not matched for %s."
-                % (node["attr"]["name"])
+                "Weight shape and input shape not matched for %s.", node["attr"]["name"]
             )
-            logging.info(node)
             return
 
-        output_shape = copy.deepcopy(input_shape)
+        output_shape = list(input_shape)
         output_shape[1] = weight_shape[1]
 
         return [input_shape], [output_shape]
@@ -698,45 +693,28 @@ class ShapeInference:
             The node in Graph IR in dict format.
         """
         if "shape" in node["attr"]["attr"].keys():
-            logging.info(
-                "Shape attr find in %s op, propagate with normal.", node["attr"]["name"]
-            )
-            input_shape = copy.deepcopy(
-                graph[node["inbounds"][0]]["attr"]["output_shape"][0]
-            )
-            exp_output_shape = copy.deepcopy(node["attr"]["attr"]["shape"])
+            input_shape = graph[node["inbounds"][0]]["attr"]["output_shape"][0]
+            exp_output_shape = node["attr"]["attr"]["shape"]
         else:
-            logging.info(
-                "Shape attr not find in %s op, try finding the shape node.",
-                node["attr"]["name"],
-            )
             for in_node in node["inbounds"]:
                 if graph[in_node]["attr"]["type"] == "Const":
-                    exp_output_shape = copy.deepcopy(
-                        graph[in_node]["attr"]["constant"]
-                    )
+                    exp_output_shape = graph[in_node]["attr"]["attr"]["constant"]
                 elif graph[in_node]["attr"]["type"] == "Pack":
                     exp_output_shape = [1] + [
                         it
                         for sl in graph[in_node]["attr"]["attr"]["constant"]
                         for it in sl
                     ]
-                    logging.info(
-                        "Fetched expected output shape from Pack op %s"
-                        % str(exp_output_shape)
-                    )
                 else:
-                    input_shape = copy.deepcopy(
-                        graph[in_node]["attr"]["output_shape"][0]
-                    )
+                    input_shape = graph[in_node]["attr"]["output_shape"][0]
 
         input_elements = abs(reduce(lambda x, y: x * y, input_shape))
         exp_output_shape_elements = abs(reduce(lambda x, y: x * y, exp_output_shape))
 
         if input_elements != exp_output_shape_elements:
             logging.warning(
-                "Input shape %s and output shape %s not matched for %s."
-                % (str(input_shape), str(exp_output_shape), node["attr"]["name"])
+                "Input shape %s and output shape %s not matched for %s.",
+                input_shape, exp_output_shape, node["attr"]["name"]
             )
 
         return [input_shape], [exp_output_shape]
@@ -757,19 +735,15 @@ class ShapeInference:
         input_shape = []
         for in_node in node["inbounds"]:
             in_shape = graph[in_node]["attr"]["output_shape"][0]
-            if in_shape != []:
+            if len(in_shape) > 0:
                 input_shape.append(in_shape)
-                logging.info(
-                    "Get input shape of %s from %s, input shape:%s."
-                    % (node["attr"]["name"], in_node, input_shape[-1])
-                )
         axis = node["attr"]["attr"]["axis"][0]
 
-        output_shape = copy.deepcopy(input_shape[0])
+        output_shape = list(input_shape[0])
         for in_shape in input_shape[1:]:
             output_shape[axis] += in_shape[axis]
 
-        return copy.deepcopy(input_shape), [output_shape]
+        return input_shape, [output_shape]
 
     @staticmethod
     def Concatenate_get_shape(graph, node):
@@ -818,17 +792,15 @@ class ShapeInference:
             elif graph[in_node]["attr"]["type"] == "Pack":
                 pass
             else:
-                input_shape = copy.deepcopy(graph[in_node]["attr"]["output_shape"][0])
+                input_shape = graph[in_node]["attr"]["output_shape"][0]
 
         split_dim = node["attr"]["attr"]["split_dim"][0]
-        logging.info("Fetched Split dim for %s is %s.", node["attr"]["name"], split_dim)
         output_node_cnt = len(node["outbounds"])
 
-        output_shape = copy.deepcopy(input_shape)
+        output_shape = list(input_shape)
         output_shape[split_dim] = output_shape[split_dim] // output_node_cnt
-        output_shape = copy.deepcopy([output_shape]) * output_node_cnt
 
-        return [copy.deepcopy(input_shape)], output_shape
+        return [input_shape], [output_shape] * output_node_cnt
 
     @staticmethod
     def Transpose_get_shape(graph, node):
@@ -844,20 +816,15 @@ class ShapeInference:
         """
         for in_node in node["inbounds"]:
             if graph[in_node]["attr"]["type"] == "Const":
-                perm = copy.deepcopy(graph[in_node]["attr"]["attr"]["constant"])
-                logging.info("Fetched perm sequence from Const op %s" % str(perm))
+                perm = graph[in_node]["attr"]["attr"]["constant"]
             elif graph[in_node]["attr"]["type"] == "Pack":
                 perm = [1] + [
                     it
                     for sl in graph[in_node]["attr"]["attr"]["constant"]
                     for it in sl
                 ]
-                logging.info("Fetched perm sequence from Pack op %s" % str(perm))
             else:
-                input_shape = copy.deepcopy(graph[in_node]["attr"]["output_shape"][0])
-                logging.info(
-                    "Fetched input shape from %s,  %s" % (in_node, str(input_shape))
-                )
+                input_shape = graph[in_node]["attr"]["output_shape"][0]
 
         exp_output_shape = []
         for i in range(len(perm)):
@@ -911,81 +878,78 @@ class ShapeInference:
                     )
         return [[0, 0, 0, 0]], [[0, 0, 0, 0]]
 
+    @staticmethod
+    def _set_shapes(node, input_shape, output_shape):
+        if output_shape is not None:
+            node["attr"]["output_shape"] = _freeze_shapes(output_shape)
+        if input_shape is not None:
+            node["attr"]["input_shape"] = _freeze_shapes(input_shape)
+
+    @staticmethod
+    def _static_shapes(handler, graph, node):
+        """
+        Run the static handler of the node, and return None if there is no handler or the handler fails.
+        """
+        if handler is None:
+            return None
+        try:
+            return handler(graph, node)
+        except Exception as e:
+            logging.warning("Static inference of op %s raised %s: %s", node["attr"]["name"], type(e).__name__, e)
+            return None
+
     def __init__(self, model_graph, dynamic_fetcher):
         """
         Take the graph, and append output shape
         and input shape to the attributes of nodes.
+        Shapes are stored as tuples of immutable shape tuples.
 
         Parameters
         ----------
         model_graph : ModelGraph
             The ModelGraph IR class.
+        dynamic_fetcher : ShapeFetcher
+            The fallback for op types without a registered static handler.
         """
         graph = model_graph.get_graph()
         seq = ph.get_graph_seq(graph, model_graph.get_graph_head())
+        handlers = self._handlers
+        fallback_types = set()
 
         # Pass #1
         for node_name in seq:
-            node_type = model_graph.get_node_type(node_name)
-            node_get_shape_name = node_type + "_get_shape"
+            node = graph[node_name]
+            node_type = node["attr"]["type"]
+            handler = handlers.get(node_type)
 
             # if node type find in supported ops, use faster static inference
-            if node_type in self.TF_PRODCAST_MATH_OPS or \
-                node_type in self.TF_PROPAGATE_MATH_OPS or \
-                node_get_shape_name in dir(self) :
-
-                if node_type in self.TF_PRODCAST_MATH_OPS:
-                    input_shape, output_shape = ShapeInference.eval_prodcast(graph, graph[node_name])
-                elif node_type in self.TF_PROPAGATE_MATH_OPS:
-                    input_shape, output_shape = ShapeInference.propagate_shape(graph, graph[node_name])
-                else:
-                    input_shape, output_shape = eval("self." + node_get_shape_name)(
-                        graph, graph[node_name]
-                    )
+            shapes = self._static_shapes(handler, graph, node)
 
             # fallback to dynamic inference
-            # To be aware, dynamic inference does not process the shape at all, 
+            # To be aware, dynamic inference does not process the shape at all,
             # like removing weight shape from inputs. This may yield false prediction.
-            else:
-                logging.warn("%s is not supported by static inference yet." % model_graph.get_node_type(node_name))
-                logging.warn("Failling back to dynamic fetcher, this may yield low inference speed.")
-                input_shape, output_shape = dynamic_fetcher.get_shape_by_name(node_name)
-
-
-            if output_shape is not None:
-                graph[node_name]["attr"]["output_shape"] = copy.deepcopy(
-                    output_shape
-                )
-            if input_shape is not None:
-                graph[node_name]["attr"]["input_shape"] = copy.deepcopy(input_shape)
-            logging.info(
-                "Input shape of %s op is %s." % (node_name, str(input_shape))
-            )
-            logging.info(
-                "Output shape of %s op is %s." % (node_name, str(output_shape))
-            )
+            if shapes is None:
+                if handler is not None:
+                    logging.warning("Static inference failed for op %s.", node_name)
+                elif node_type not in fallback_types:
+                    fallback_types.add(node_type)
+                    logging.warning("%s is not supported by static inference yet.", node_type)
+                logging.warning("Failling back to dynamic fetcher, this may yield low inference speed.")
+                shapes = dynamic_fetcher.get_shape_by_name(node_name)
 
+            self._set_shapes(node, *shapes)
 
         # Pass #2
         # This is a patching for back-end, since backend extract shapes from
         # those two ops.
         for node_name in seq:
-            if model_graph.get_node_type(node_name) in ["Pack", "StridedSlice"]:
-                node_get_shape_name = model_graph.get_node_type(node_name) + "_get_shape"
-                input_shape, output_shape = eval("self." + node_get_shape_name)(
-                    graph, graph[node_name]
-                )
-                if output_shape is not None:
-                    graph[node_name]["attr"]["output_shape"] = copy.deepcopy(
-                        output_shape
-                    )
-                if input_shape is not None:
-                    graph[node_name]["attr"]["input_shape"] = copy.deepcopy(input_shape)
-                logging.info(
-                    "Second Pass: Input shape of %s op is %s."
-                    % (node_name, str(input_shape))
-                )
-                logging.info(
-                    "Second Pass: Output shape of %s op is %s."
-                    % (node_name, str(output_shape))
-                )
+            node = graph[node_name]
+            if node["attr"]["type"] in self.TF_SECOND_PASS_OPS:
+                handler = handlers.get(node["attr"]["type"])
+                shapes = self._static_shapes(handler, graph, node)
+                # keep the shapes of pass #1 if the static inference fails
+                if shapes is not None:
+                    self._set_shapes(node, *shapes)
+
+
+ShapeInference._handlers = ShapeInference._build_handlers()
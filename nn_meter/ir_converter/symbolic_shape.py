@@ -0,0 +1,412 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+"""
+Symbolic shapes for nn-Meter IR graphs.
+
+A converted IR graph stores the concrete `input_shape` and `output_shape` of every node. `make_symbolic_graph`
+rewrites every dim of these shapes as an expression of the model input dims `N`, `H` and `W` (the input channel
+number is kept constant), and compiles all expressions into a single function. `instantiate` then evaluates the
+function for a new input shape and returns a plain nn-Meter IR graph, so the model is converted only once when
+sweeping input resolutions or batch sizes.
+
+The expression of a dim is derived by the shape rule of the op (convolution and pooling) or by matching the shapes
+of the node to the shapes of its inbound nodes (element-wise ops, concat, flatten, ...). Every expression is checked
+against the concrete shapes of the converted graph, and dims that can not be explained by the input dims are kept
+constant, as the channel numbers are. A warning is logged for the nodes whose spatial dims are kept constant while
+their inputs have symbolic spatial dims, as these nodes keep the shapes of the converted graph when instantiated.
+"""
+import logging
+logging = logging.getLogger("nn-Meter")
+
+
+_CONV_POOL_TYPES = {
+    "Conv", "MaxPool", "AveragePool", # onnx
+    "Conv2D", "DepthwiseConv2dNative", "AvgPool", # tensorflow
+    "conv", "maxpool", "dwconv", "avgpool", # nni
+}
+_SYMBOLS = ("N", "H", "W")
+
+
+class _Dim:
+    """
+    an integer dim or an expression of the input symbols. `value` is the dim of the converted graph
+    """
+    __slots__ = ("expr", "value")
+
+    def __init__(self, expr, value):
+        self.expr = expr
+        self.value = value
+
+    @property
+    def is_const(self):
+        return isinstance(self.expr, int)
+
+    def _binary(self, other, op, func):
+        other = other if isinstance(other, _Dim) else _Dim(other, other)
+        value = func(self.value, other.value)
+        if self.is_const and other.is_const:
+            return _Dim(value, value)
+        if other.is_const and (op in "+-" and other.expr == 0 or op in ("*", "//") and other.expr == 1):
+            return self
+        if other.is_const and op in "+-" and other.expr < 0:
+            op, other = "-+"[op == "-"], -other
+        return _Dim(f"({self.expr} {op} {other.expr})", value)
+
+    def __add__(self, other):
+        return self._binary(other, "+", lambda a, b: a + b)
+
+    def __sub__(self, other):
+        return self._binary(other, "-", lambda a, b: a - b)
+
+    def __mul__(self, other):
+        return self._binary(other, "*", lambda a, b: a * b)
+
+    def __floordiv__(self, other):
+        return self._binary(other, "//", lambda a, b: a // b)
+
+    def ceildiv(self, other):
+        return -((-self) // other)
+
+    def __neg__(self):
+        if self.is_const:
+            return _Dim(-self.expr, -self.value)
+        return _Dim(f"(-{self.expr})", -self.value)
+
+
+def _const_shape(shape):
+    return [_Dim(dim, dim) for dim in shape]
+
+
+def _shape_values(shape):
+    return [dim.value for dim in shape]
+
+
+def _pair(value, default):
+    if value is None:
+        return [default, default]
+    if isinstance(value, int):
+        return [value, value]
+    value = list(value)
+    if len(value) == 4: # NHWC strides or ksize of tensorflow ops
+        value = value[1:3]
+    return value
+
+
+def _conv_pool_rule(attr, input_shapes, output_shape):
+    """
+    the output shape of a convolution or pooling op as NHWC
+    """
+    if len(input_shapes[0]) != 4 or len(output_shape) != 4:
+        return None
+    attrs = attr.get("attr", {})
+    kernel = _pair(attrs.get("kernel_shape", attrs.get("ksize", attrs.get("ks"))), 1)
+    strides = _pair(attrs.get("strides"), 1)
+    dilations = _pair(attrs.get("dilations"), 1)
+    padding = str(attrs.get("padding", attrs.get("auto_pad", "")))
+    pads = attrs.get("pads", [0, 0, 0, 0])
+    if isinstance(pads, int):
+        pads = [pads] * 4
+    if len(pads) == 2: # nni pads for each spatial dim
+        pads = [pads[0], pads[1], pads[0], pads[1]]
+    if len(pads) != 4:
+        return None
+    ceil_mode = bool(attrs.get("ceil_mode", 0))
+
+    n, h, w, _ = input_shapes[0]
+    spatial = []
+    # onnx pads are [top, left, bottom, right]
+    for dim, k, s, d, pad in zip((h, w), kernel, strides, dilations, ((pads[0], pads[2]), (pads[1], pads[3]))):
+        if "SAME" in padding:
+            spatial.append(dim.ceildiv(s))
+        elif "VALID" in padding:
+            spatial.append((dim - d * (k - 1)).ceildiv(s))
+        else:
+            extent = dim + (pad[0] + pad[1] - d * (k - 1) - 1)
+            spatial.append((extent.ceildiv(s) if ceil_mode else extent // s) + 1)
+    return [n, spatial[0], spatial[1], _Dim(output_shape[3], output_shape[3])]
+
+
+def _concat_rule(input_shapes, output_shape):
+    if any(len(shape) != len(output_shape) for shape in input_shapes):
+        return None
+    result = []
+    for i, dim in enumerate(output_shape):
+        values = [shape[i].value for shape in input_shapes]
+        if all(value == dim for value in values):
+            result.append(input_shapes[0][i])
+        elif sum(values) == dim:
+            total = input_shapes[0][i]
+            for shape in input_shapes[1:]:
+                total = total + shape[i]
+            result.append(total)
+        else:
+            return None
+    return result
+
+
+def _match_rule(input_shapes, output_shape):
+    """
+    explain each output dim by the input dims with the same value, or by the product of contiguous input dims
+    for flatten and reshape
+    """
+    result = []
+    first = input_shapes[0] if input_shapes else []
+    for i, dim in enumerate(output_shape):
+        # the batch dim is kept by flatten and reshape
+        if (len(first) == len(output_shape) or i == 0) and i < len(first) and first[i].value == dim:
+            result.append(first[i])
+            continue
+        # the value 1 is too ambiguous to be matched to a dim at a different position
+        candidates = [
+            d for shape in input_shapes for d in shape if not d.is_const and d.value == dim and dim != 1
+        ]
+        if candidates:
+            result.append(candidates[0])
+            continue
+        product = None
+        # try to flatten the dims after the batch dim first
+        for start in list(range(1, len(first))) + ([0] if first else []):
+            acc = first[start]
+            for end in range(start + 1, len(first)):
+                acc = acc * first[end]
+                if acc.value == dim:
+                    product = acc
+                    break
+            if product is not None:
+                break
+        result.append(product if product is not None else _Dim(dim, dim))
+    return result
+
+
+def _checked(shape, reference):
+    """
+    keep the dims of `shape` that reproduce the converted graph, and fall back to constants for the others
+    """
+    if shape is None or len(shape) != len(reference):
+        return None
+    return [dim if dim.value == ref else _Dim(ref, ref) for dim, ref in zip(shape, reference)]
+
+
+def _infer_output_shapes(attr, input_shapes, output_shapes):
+    results = []
+    for idx, output_shape in enumerate(output_shapes):
+        shape = None
+        if idx == 0 and attr.get("type") in _CONV_POOL_TYPES and input_shapes:
+            shape = _checked(_conv_pool_rule(attr, input_shapes, output_shape), output_shape)
+        if shape is None:
+            for input_shape in input_shapes:
+                if _shape_values(input_shape) == list(output_shape):
+                    shape = input_shape
+                    break
+        if shape is None and attr.get("type") in ("Concat", "ConcatV2", "concat") and input_shapes:
+            shape = _checked(_concat_rule(input_shapes, output_shape), output_shape)
+        if shape is None:
+            shape = _checked(_match_rule(input_shapes, output_shape), output_shape)
+        results.append(shape)
+    return results
+
+
+def _topological_order(graph):
+    order, visited = [], set()
+    for root in graph:
+        if root in visited:
+            continue
+        visited.add(root)
+        stack = [(root, iter(graph[root]["inbounds"]))]
+        while stack:
+            name, inbounds = stack[-1]
+            for inbound in inbounds:
+                if inbound in graph and inbound not in visited:
+                    visited.add(inbound)
+                    stack.append((inbound, iter(graph[inbound]["inbounds"])))
+                    break
+            else:
+                stack.pop()
+                order.append(name)
+    return order
+
+
+class SymbolicIRGraph:
+    """
+    nn-Meter IR graph whose node shapes are expressions of the model input dims. Use `instantiate` to get the nn-Meter
+    IR graph of a concrete input shape.
+    """
+    def __init__(self, graph, input_shape, input_layout="NHWC"):
+        self.graph = graph
+        self.input_shape = tuple(input_shape)
+        self.input_layout = input_layout
+        self.constant_spatial_nodes = []
+        self.expressions = self._derive_expressions()
+        self._function = self._compile()
+        if self.constant_spatial_nodes:
+            logging.warning(f"The spatial dims of {len(self.constant_spatial_nodes)} nodes can not be expressed by the input "
+                            f"dims, and are kept as in the converted graph: {', '.join(self.constant_spatial_nodes[:10])}"
+                            f"{', ...' if len(self.constant_spatial_nodes) > 10 else ''}")
+
+    def _to_nhwc(self, input_shape):
+        input_shape = tuple(input_shape)
+        if len(input_shape) == 4 and self.input_layout == "NCHW":
+            return (input_shape[0], input_shape[2], input_shape[3], input_shape[1])
+        return input_shape
+
+    def _input_symbols(self, input_shape):
+        # the batch size and the spatial dims of an image input are symbolic, other dims are constants
+        symbolic = len(_SYMBOLS) if len(input_shape) == 4 else 1
+        return [
+            _Dim(_SYMBOLS[i], dim) if i < symbolic else _Dim(dim, dim) for i, dim in enumerate(input_shape)
+        ]
+
+    def _derive_expressions(self):
+        model_input = list(self._to_nhwc(self.input_shape))
+        input_symbols = self._input_symbols(model_input)
+        outputs = {}
+        expressions = {}
+        for name in _topological_order(self.graph):
+            attr = self.graph[name]["attr"]
+            if "input_shape" not in attr or "output_shape" not in attr:
+                continue
+
+            input_shapes = []
+            for ref in attr["input_shape"]:
+                ref = list(ref)
+                shape = None
+                for inbound in self.graph[name]["inbounds"]:
+                    shape = next((s for s in outputs.get(inbound, []) if _shape_values(s) == ref), None)
+                    if shape is not None:
+                        break
+                if shape is None:
+                    shape = input_symbols if ref == model_input else _const_shape(ref)
+                input_shapes.append(shape)
+
+            if not self.graph[name]["inbounds"] and not input_shapes and attr["output_shape"] and \
+                list(attr["output_shape"][0]) == model_input:
+                output_shapes = [input_symbols] # the input placeholder of tensorflow models
+            else:
+                output_shapes = _infer_output_shapes(attr, input_shapes, attr["output_shape"])
+            if self._has_constant_spatial_dims(input_shapes, output_shapes):
+                self.constant_spatial_nodes.append(name)
+            outputs[name] = output_shapes
+            expressions[name] = (
+                [[dim.expr for dim in shape] for shape in input_shapes],
+                [[dim.expr for dim in shape] for shape in output_shapes],
+            )
+        return expressions
+
+    @staticmethod
+    def _has_constant_spatial_dims(input_shapes, output_shapes):
+        """
+        whether an NHWC output has constant spatial dims while an input has symbolic spatial dims. The spatial dims of
+        1, e.g., of global pooling, are constant for any input shape.
+        """
+        if not any(len(shape) == 4 and not (shape[1].is_const and shape[2].is_const) for shape in input_shapes):
+            return False
+        return any(
+            len(shape) == 4 and any(dim.is_const and dim.expr != 1 for dim in shape[1:3]) for shape in output_shapes
+        )
+
+    def _compile(self):
+        def shapes_code(shapes):
+            return "[" + ", ".join("[" + ", ".join(str(dim) for dim in shape) + "]" for shape in shapes) + "]"
+
+        lines = [f"def shapes({', '.join(_SYMBOLS)}):", "    return {"]
+        for name, (input_shapes, output_shapes) in self.expressions.items():
+            lines.append(f"        {name!r}: ({shapes_code(input_shapes)}, {shapes_code(output_shapes)}),")
+        lines.append("    }")
+        namespace = {}
+        exec("\n".join(lines) + "\n", namespace)
+        return namespace["shapes"]
+
+    @property
+    def symbolic_nodes(self):
+        """
+        the names of the nodes whose shapes depend on the input dims
+        """
+        return [
+            name for name, (input_shapes, output_shapes) in self.expressions.items()
+            if any(not isinstance(dim, int) for shape in input_shapes + output_shapes for dim in shape)
+        ]
+
+    def instantiate(self, input_shape):
+        """
+        return the nn-Meter IR graph for the given input shape. The input shape follows the layout of the shape used
+        for conversion, i.e., NCHW for torch and onnx models and NHWC for tensorflow models.
+        """
+        given_shape, input_shape = tuple(input_shape), self._to_nhwc(input_shape)
+        if len(input_shape) != len(self.input_shape):
+            raise ValueError(f"The rank of input shape {given_shape} mismatches the converted input shape "
+                             f"{self.input_shape}.")
+        reference = self._to_nhwc(self.input_shape)
+        num_symbols = len(_SYMBOLS) if len(reference) == 4 else 1
+        if tuple(input_shape[num_symbols:]) != tuple(reference[num_symbols:]):
+            raise ValueError(f"Only the batch size and the spatial dims of the input shape can be changed, got "
+                             f"{given_shape} for the converted input shape {self.input_shape}.")
+        symbols = list(input_shape[:num_symbols]) + [None] * (len(_SYMBOLS) - num_symbols)
+        if self.constant_spatial_nodes and tuple(input_shape[1:3]) != tuple(reference[1:3]):
+            logging.warning(f"The spatial dims of {len(self.constant_spatial_nodes)} nodes are kept as in the converted "
+                            f"graph for input shape {given_shape}: {', '.join(self.constant_spatial_nodes[:10])}"
+                            f"{', ...' if len(self.constant_spatial_nodes) > 10 else ''}")
+        shapes = self._function(*symbols)
+        graph = {}
+        for name, node in self.graph.items():
+            if name in shapes:
+                input_shapes, output_shapes = shapes[name]
+                if any(dim <= 0 for shape in input_shapes + output_shapes for dim in shape):
+                    raise ValueError(f"Input shape {given_shape} is too small for node {name}.")
+                attr = dict(node["attr"], input_shape=input_shapes, output_shape=output_shapes)
+            else:
+                attr = node["attr"]
+            # the op attributes, inbounds and outbounds are shared with the symbolic graph
+            graph[name] = {"attr": attr, "inbounds": node["inbounds"], "outbounds": node["outbounds"]}
+        return graph
+
+
+def _find_input_shape(graph):
+    for node in graph.values():
+        if node["attr"].get("type") == "Placeholder" and node["attr"].get("output_shape"):
+            return node["attr"]["output_shape"][0]
+    for node in graph.values():
+        if not node["inbounds"] and node["attr"].get("input_shape"):
+            return node["attr"]["input_shape"][0]
+    raise ValueError("Failed to find the input shape of the nn-Meter IR graph.")
+
+
+def make_symbolic_graph(graph, input_shape=None, input_layout="NHWC"):
+    """
+    convert a nn-Meter IR graph to a symbolic IR graph, whose node shapes are expressions of the input dims
+    @params:
+
+    graph: the nn-Meter IR graph converted with the input shape `input_shape`
+
+    input_shape: the input shape used to convert the graph. If not specified, the output shape of the Placeholder of
+        tensorflow models, or the first input shape of the first op without inbound nodes of onnx and torch models, is
+        used. Constant and weight nodes have no input shapes and are skipped.
+
+    input_layout: the layout of `input_shape` and of the shapes given to `instantiate`, allowed items are ["NHWC",
+        "NCHW"]. The shapes in nn-Meter IR are NHWC, while torch and onnx models take NCHW input shapes.
+    """
+    if isinstance(graph, SymbolicIRGraph):
+        return graph
+    if input_layout not in ("NHWC", "NCHW"):
+        raise ValueError(f"Unsupported input layout: {input_layout}")
+    graph = dict(graph.items()) # decode lazy graphs, such as the binary nn-Meter IR, once
+    if input_shape is None:
+        input_shape = _find_input_shape(graph)
+        if len(input_shape) == 4 and input_layout == "NCHW":
+            input_shape = (input_shape[0], input_shape[3], input_shape[1], input_shape[2])
+    symbolic_graph = SymbolicIRGraph(graph, input_shape, input_layout)
+    logging.info(f"{len(symbolic_graph.symbolic_nodes)} of {len(graph)} nodes have symbolic shapes.")
+    return symbolic_graph
+
+
+def instantiate(graph, input_shape):
+    """
+    return the nn-Meter IR graph of a symbolic IR graph for the given input shape
+    @params:
+
+    graph: the symbolic IR graph returned by `make_symbolic_graph`, or by `model_to_graph` and `model_file_to_graph`
+        with `symbolic=True`
+
+    input_shape: the input shape in the layout used for conversion, i.e., NCHW for torch and onnx models and NHWC for
+        tensorflow models
+    """
+    return graph.instantiate(input_shape)
@@ -5,11 +5,13 @@ import logging
 from .onnx_converter import OnnxConverter
 from .frozenpb_converter import FrozenPbConverter
 from .torch_converter import NNIBasedTorchConverter, OnnxBasedTorchConverter, NNIIRConverter
+from .binary_ir import load_binary_ir, loads_binary_ir
+from .symbolic_shape import SymbolicIRGraph, make_symbolic_graph
 from nn_meter.utils.import_package import try_import_onnx, try_import_torch, try_import_torchvision_models
 logging = logging.getLogger("nn-Meter")
 
 
-def model_file_to_graph(filename: str, model_type: str, input_shape=(1, 3, 224, 224), apply_nni=False):
+def model_file_to_graph(filename: str, model_type: str, input_shape=(1, 3, 224, 224), apply_nni=False, symbolic=False):
     """
     read the given file and convert the model in the file content to nn-Meter IR graph object 
     @params:
@@ -20,9 +22,11 @@ def model_file_to_graph(filename: str, model_type: str, input_shape=(1, 3, 224,
         - string to specify the name of a built-in torch model from the torchvision model zoo, `model_type` must be set to "torch"
         - the path to a saved ONNX model file (*.onnx), `model_type` must be set to "onnx"
         - the path to a saved dictionary object following nn-Meter-IR format (*.json), `model_type` must be set to "nnmeter-ir"
+        - the path to a saved nn-Meter-IR graph in binary format (*.irb), `model_type` must be set to "nnmeter-irb". The file is
+          memory-mapped and the nodes are decoded lazily, until `graph.close()` is called or the graph is garbage collected.
         - the path to a saved dictionary object following NNI-IR format(*.json), `model_type` must be set to "nni-ir"
         
-    model_type:  string to specify the type of parameter model, allowed items are ["pb", "torch", "onnx", "nnmeter-ir", "nni-ir"]
+    model_type:  string to specify the type of parameter model, allowed items are ["pb", "torch", "onnx", "nnmeter-ir", "nnmeter-irb", "nni-ir"]
     
     input_shape: the shape of input tensor for inference (if necessary), a random tensor according to the shape will be generated and used. This parameter is only 
         accessed when model_type == 'torch'
@@ -32,7 +36,14 @@ def model_file_to_graph(filename: str, model_type: str, input_shape=(1, 3, 224,
         converter is used, which requires onnx installation (well tested version is onnx>=1.9.0). NNI-based converter is much faster while the conversion is unstable 
         as it could fail in some case. Onnx-based converter is much slower but stable compared to NNI-based converter. This parameter is only accessed when 
         model_type == 'torch'
+
+    symbolic: if True, return a symbolic IR graph, whose node shapes are expressions of the input dims. Call `instantiate(input_shape)`
+        of the returned graph to get the nn-Meter IR graph of any other batch size or input resolution without converting the model again.
     """
+    if symbolic:
+        graph = model_file_to_graph(filename, model_type, input_shape, apply_nni)
+        return _to_symbolic_graph(graph, model_type, input_shape)
+
     if model_type == "onnx":
         onnx = try_import_onnx()
         model = onnx.load(filename)
@@ -51,6 +62,9 @@ def model_file_to_graph(filename: str, model_type: str, input_shape=(1, 3, 224,
         with open(filename, "r") as fp:
             return json.load(fp)
 
+    elif model_type == "nnmeter-irb":
+        return load_binary_ir(filename)
+
     elif model_type == "torch":
         models = try_import_torchvision_models()
         torchvision_zoo_dict = {
@@ -78,7 +92,7 @@ def model_file_to_graph(filename: str, model_type: str, input_shape=(1, 3, 224,
         raise ValueError(f"Unsupported model type: {model_type}")
 
 
-def model_to_graph(model, model_type, input_shape=(1, 3, 224, 224), apply_nni=False):
+def model_to_graph(model, model_type, input_shape=(1, 3, 224, 224), apply_nni=False, symbolic=False):
     """
     convert the given model to nn-Meter IR graph object 
     @params:
@@ -86,12 +100,23 @@ def model_to_graph(model, model_type, input_shape=(1, 3, 224, 224), apply_nni=Fa
         - pytorch model object (nn.Module), `model_type` must be set to "torch"
         - ONNX model object, `model_type` must be set to "onnx"
         - dictionary object following NNI-IR format, `model_type` must be set to "nni-ir"
+        - bytes object of a nn-Meter-IR graph in binary format, `model_type` must be set to "nnmeter-irb"
+        - symbolic IR graph object returned with `symbolic=True`, `model_type` must be set to "nnmeter-ir"
         
-    model_type:  string to specify the type of parameter model, allowed items are ["torch", "onnx", "nnmeter-ir", "nni-ir"]
+    model_type:  string to specify the type of parameter model, allowed items are ["torch", "onnx", "nnmeter-ir", "nnmeter-irb", "nni-ir"]
     
     input_shape: the shape of input tensor for inference (if necessary), a random tensor according to the shape will be generated and used. This parameter is only 
-        accessed when model_type == 'torch'
+        accessed when model_type == 'torch', or when the model is a symbolic IR graph, which is instantiated with `input_shape`
+
+    symbolic: if True, return a symbolic IR graph, whose node shapes are expressions of the input dims. Call `instantiate(input_shape)`
+        of the returned graph to get the nn-Meter IR graph of any other batch size or input resolution without converting the model again.
     """
+    if isinstance(model, SymbolicIRGraph):
+        return model if symbolic else model.instantiate(input_shape)
+    if symbolic:
+        graph = model_to_graph(model, model_type, input_shape, apply_nni)
+        return _to_symbolic_graph(graph, model_type, input_shape)
+
     if model_type == "onnx":
         return onnx_model_to_graph(model)
     elif model_type == "torch":
@@ -100,10 +125,18 @@ def model_to_graph(model, model_type, input_shape=(1, 3, 224, 224), apply_nni=Fa
         return nni_model_to_graph(model)
     elif model_type == "nnmeter-ir":
         return model # nnmeter-ir doesn't need any post-process
+    elif model_type == "nnmeter-irb":
+        return loads_binary_ir(model)
     else:
         raise ValueError(f"Unsupported model type: {model_type}")
 
 
+def _to_symbolic_graph(graph, model_type, input_shape):
+    # torch and onnx models take NCHW input shapes, and only torch models are converted with the given input shape
+    input_layout = "NCHW" if model_type in ["torch", "onnx"] else "NHWC"
+    return make_symbolic_graph(graph, input_shape if model_type == "torch" else None, input_layout)
+
+
 def onnx_model_to_graph(model):
     converter = OnnxConverter(model)
     return converter.convert()
@@ -88,12 +88,16 @@ class nnMeterPredictor:
             - pytorch model object (nn.Module), `model_type` must be set to "torch"
             - ONNX model object or the path to a saved ONNX model file (*.onnx), `model_type` must be set to "onnx"
             - dictionary object following nn-Meter-IR format, `model_type` must be set to "nnmeter-ir"
+            - symbolic IR graph object returned by `model_to_graph` or `model_file_to_graph` with `symbolic=True`, `model_type`
+              must be set to "nnmeter-ir". The graph is instantiated with `input_shape`, so that the latency of different batch
+              sizes and input resolutions can be predicted without converting the model again
+            - the path to a saved nn-Meter-IR graph in binary format (*.irb), `model_type` must be set to "nnmeter-irb"
             - dictionary object following NNI-IR format, `model_type` must be set to "nni-ir"
             
-        model_type: string to specify the type of parameter model, allowed items are ["pb", "torch", "onnx", "nnmeter-ir", "nni-ir"]
+        model_type: string to specify the type of parameter model, allowed items are ["pb", "torch", "onnx", "nnmeter-ir", "nnmeter-irb", "nni-ir"]
       
         input_shape: the shape of input tensor for inference (if necessary), a random tensor according to the shape will be generated and used. This parameter is only 
-        accessed when model_type == 'torch'
+        accessed when model_type == 'torch' or the model is a symbolic IR graph
 
         apply_nni: switch the torch converter used for torch model parsing. If apply_nni==True, NNI-based converter is used for torch model conversion, which requires 
             nni>=2.4 installation and should use nn interface from NNI `import nni.retiarii.nn.pytorch as nn` to define the PyTorch modules. Otherwise Onnx-based torch 
@@ -108,7 +112,12 @@ class nnMeterPredictor:
             graph = model_to_graph(model, model_type, input_shape=input_shape, apply_nni=apply_nni)
         
         # logging.info(graph)
-        self.kd.load_graph(graph)
+        try:
+            self.kd.load_graph(graph)
+        finally:
+            if isinstance(model, str) and model_type == "nnmeter-irb":
+                # the kernel detector keeps a decoded copy of the graph, thus the memory-mapped file could be closed
+                graph.close()
 
         py = nn_predict(self.kernel_predictors, self.kd.get_kernels()) # in unit of ms
         logging.info(f"Predict latency: {py} ms")
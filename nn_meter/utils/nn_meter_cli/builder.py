@@ -91,3 +91,8 @@ def test_backend_connection_cli(args):
         backend.test_connection()
     else:
         logging.keyinfo('please run "nn-meter connect --help" to see guidance.')
+
+
+def benchmark_regressors_cli(args):
+    from nn_meter.builder.kernel_predictor_builder import benchmark_regressors
+    benchmark_regressors(args.kernel, (args.config, args.profiled), backend=args.backend, regressors=args.regressors)
@@ -6,7 +6,7 @@ import argparse
 from .registry import register_module_cli, unregister_module_cli
 from .predictor import list_latency_predictors_cli, apply_latency_predictor_cli, get_nnmeter_ir_cli
 from .builder import list_backends_cli, list_kernels_cli, list_operators_cli, list_special_testcases_cli, \
-    test_backend_connection_cli, create_workspace_cli
+    test_backend_connection_cli, create_workspace_cli, benchmark_regressors_cli
 
 
 def nn_meter_info(args):
@@ -96,7 +96,7 @@ def nn_meter_cli():
     model_type.add_argument(
         "--nn-meter-ir",
         type=str,
-        help="path to input nn-Meter IR model (*.json file or floder)"
+        help="path to input nn-Meter IR model (*.json or binary *.irb file or floder)"
     )
     model_type.add_argument(
         "--torchvision",        # --torchvision only can support the model object. The argument specifies 
@@ -116,17 +116,36 @@ def nn_meter_cli():
     model_type.add_argument(
         "--tensorflow",
         type = str,
-        help="path to input Tensorflow model (*.pb)"
+        help="path to input Tensorflow model (*.pb file, floder, or a text file listing one *.pb file per line)"
     )
     model_type.add_argument(
         "--onnx",
         type=str,
-        help="path to input ONNX model (*.onnx)"
+        help="path to input ONNX model (*.onnx file, floder, or a text file listing one *.onnx file per line)"
     )
     get_ir.add_argument(
         "-o", "--output",
         type=str,
-        help="path to save the output nn-meter ir graph for tensorflow and onnx (*.json), default to be /path/to/input/file/<input_file_name>_ir.json"
+        help="path to save the output nn-meter ir graph for tensorflow and onnx (*.json), default to be /path/to/input/file/<input_file_name>_ir.json. " \
+             "When converting a floder or a file list, the output floder to save all ir graphs and the summary, default to be the floder of the input."
+    )
+    get_ir.add_argument(
+        "--workers",
+        type=int,
+        help="number of worker processes when converting a floder or a file list, default to be the cpu count",
+        default=None
+    )
+    get_ir.add_argument(
+        "--overwrite",
+        help="convert all models when converting a floder or a file list, instead of skipping the models already converted in the output floder",
+        action="store_true",
+        default=False
+    )
+    get_ir.add_argument(
+        "--binary",
+        help="save the output nn-meter ir graph in binary format (*.irb), which is smaller and faster to load",
+        action="store_true",
+        default=False
     )
     get_ir.set_defaults(func=get_nnmeter_ir_cli)
 
@@ -253,7 +272,46 @@ def nn_meter_cli():
     )
     unregister.set_defaults(func=unregister_module_cli)
 
-    # Usage 7: change data folder
+    # Usage 7: benchmark the regressors for kernel predictors
+    # Usage: nn-meter benchmark_regressors --kernel <kernel-type> --config <path/to/config.json> --profiled <path/to/profiled.json>
+    benchmark = subparsers.add_parser(
+        'benchmark_regressors',
+        help='benchmark the accuracy, training time, predicting latency and model size of the regressors for a kernel predictor'
+    )
+    benchmark.add_argument(
+        "--kernel",
+        type=str,
+        required=True,
+        help="the type of the kernel"
+    )
+    benchmark.add_argument(
+        "--config",
+        type=str,
+        required=True,
+        help="path to the json file of the sampled kernel configs"
+    )
+    benchmark.add_argument(
+        "--profiled",
+        type=str,
+        required=True,
+        help="path to the json file of the profiled results of the kernel configs"
+    )
+    benchmark.add_argument(
+        "--backend",
+        type=str,
+        default=None,
+        help="the name of the backend, relative to the predictor initialization"
+    )
+    benchmark.add_argument(
+        "--regressors",
+        type=str,
+        nargs='+',
+        default=None,
+        help="the names of the regressors to benchmark (if not specified, benchmark all regressors)"
+    )
+    benchmark.set_defaults(func=benchmark_regressors_cli)
+
+    # Usage 8: change data folder
     # Usage: nn-meter set_data --data <path/to/new-folder>
     # TODO
 
@@ -24,7 +24,7 @@ def apply_latency_predictor_cli(args):
     elif args.onnx:
         input_model, model_type, model_suffix = args.onnx, "onnx", ".onnx"
     elif args.nn_meter_ir:
-        input_model, model_type, model_suffix = args.nn_meter_ir, "nnmeter-ir", ".json"
+        input_model, model_type, model_suffix = args.nn_meter_ir, "nnmeter-ir", [".json", ".irb"]
     elif args.torchvision: # torch model name from torchvision model zoo
         input_model_list, model_type = args.torchvision, "torch" 
     else:
@@ -44,7 +44,8 @@ def apply_latency_predictor_cli(args):
         if os.path.isfile(input_model):
             input_model_list = [input_model]
         elif os.path.isdir(input_model):
-            input_model_list = glob(os.path.join(input_model, "**" + model_suffix))
+            model_suffix = model_suffix if isinstance(model_suffix, list) else [model_suffix]
+            input_model_list = [model for suffix in model_suffix for model in glob(os.path.join(input_model, "**", "*" + suffix), recursive=True)]
             input_model_list.sort()
             logging.info(f'Found {len(input_model_list)} model in {input_model}. Start prediction ...')
         else:
@@ -53,7 +54,10 @@ def apply_latency_predictor_cli(args):
     # predict latency
     result = {}
     for model in input_model_list:
-        latency = predictor.predict(model, model_type) # in unit of ms
+        if model_type == "nnmeter-ir" and model.endswith(".irb"):
+            latency = predictor.predict(model, "nnmeter-irb") # in unit of ms
+        else:
+            latency = predictor.predict(model, model_type) # in unit of ms
         result[os.path.basename(model)] = latency
         logging.result(f'[RESULT] predict latency for {os.path.basename(model)}: {latency} ms')
     
@@ -65,24 +69,52 @@ def get_nnmeter_ir_cli(args):
     """
     import json
     from nn_meter.utils.utils import NumpyEncoder
+    from nn_meter.ir_converter import dump_binary_ir
+    suffix = ".irb" if args.binary else ".json"
+
+    # bulk conversion for a floder or a file list
+    for input_path, model_type, model_suffix in [(args.tensorflow, "pb", ".pb"), (args.onnx, "onnx", ".onnx")]:
+        if input_path and not input_path.endswith(model_suffix):
+            return get_nnmeter_ir_bulk_cli(args, input_path, model_type)
+
     if args.tensorflow:
         graph = model_file_to_graph(args.tensorflow, 'pb')
-        filename = args.output if args.output else args.tensorflow.replace(".pb", "_pb_ir.json") 
+        filename = args.output if args.output else args.tensorflow.replace(".pb", "_pb_ir" + suffix) 
     elif args.onnx:
         graph = model_file_to_graph(args.onnx, 'onnx')
-        filename = args.output if args.output else args.onnx.replace(".onnx", "_onnx_ir.json") 
+        filename = args.output if args.output else args.onnx.replace(".onnx", "_onnx_ir" + suffix) 
     else:
         logging.keyinfo('please run "nn-meter get_ir --help" to see guidance.')
         return
     
-    if not str.endswith(filename, '.json'): filename += '.json'
-    with open(filename, "w+") as fp:
-        json.dump(graph,
-            fp,
-            indent=4,
-            skipkeys=True,
-            sort_keys=True,
-            cls=NumpyEncoder,
-        )
+    if not str.endswith(filename, suffix): filename += suffix
+    if args.binary:
+        dump_binary_ir(graph, filename)
+    else:
+        with open(filename, "w+") as fp:
+            json.dump(graph,
+                fp,
+                indent=4,
+                skipkeys=True,
+                sort_keys=True,
+                cls=NumpyEncoder,
+            )
     
     logging.result(f'The nn-meter ir graph has been saved. Saved path: {os.path.abspath(filename)}')
+
+
+def get_nnmeter_ir_bulk_cli(args, input_path, model_type):
+    """convert all pb files or onnx files in a floder or a file list to nn-Meter IR graphs in parallel
+    """
+    from nn_meter.ir_converter.bulk_converter import list_model_files, convert_model_files
+    model_files = list_model_files(input_path, model_type)
+    if len(model_files) == 0:
+        logging.error(f'Cannot find any model satisfying the arguments.')
+        return
+
+    if args.output:
+        output_dir = args.output
+    else:
+        output_dir = input_path if os.path.isdir(input_path) else os.path.dirname(os.path.abspath(input_path))
+    return convert_model_files(model_files, model_type, output_dir, workers=args.workers, binary=args.binary,
+                               resume=not args.overwrite, root=input_path if os.path.isdir(input_path) else None)
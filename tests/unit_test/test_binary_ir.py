@@ -0,0 +1,78 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import json
+import pytest
+from nn_meter.ir_converter.binary_ir import dumps_binary_ir, loads_binary_ir, dump_binary_ir, load_binary_ir
+
+
+def build_graph():
+    """ build a nn-Meter IR graph covering the value types of the binary format
+    """
+    return {
+        "input_im_0": {
+            "inbounds": [],
+            "attr": {
+                "name": "input_im_0",
+                "type": "Placeholder",
+                "output_shape": [(1, 224, 224, 3)],
+                "attr": {},
+            },
+            "outbounds": ["conv/卷积_1"],
+        },
+        "conv/卷积_1": {
+            "inbounds": ["input_im_0"],
+            "attr": {
+                "name": "conv/卷积_1",
+                "type": "Conv2D",
+                "output_shape": [[1, 112, 112, 32]],
+                "input_shape": [(1, 224, 224, 3)],
+                "attr": {
+                    "strides": (1, 2, 2, 1),
+                    "dilations": [1, 1, 1, 1],
+                    "padding": "SAME",
+                    "use_bias": False,
+                    "alpha": 0.2,
+                    "seed": 2 ** 63 - 1,
+                    "offset": -2 ** 63,
+                    "pads": [],
+                    "note": "ünïcode ✓",
+                    "quant": {"scale": [0.5, 0.25], "zero_point": [0, 0], "axis": None, "nested": {"empty": {}}},
+                    "mixed": [1, "a", [2, 3], {"k": []}],
+                },
+            },
+            "outbounds": [],
+        },
+    }
+
+
+def test_roundtrip():
+    graph = build_graph()
+    # tuples are saved as lists, the same as in json IR files
+    expected = json.loads(json.dumps(graph))
+
+    loaded = loads_binary_ir(dumps_binary_ir(graph))
+    assert loaded.to_dict() == expected
+    assert list(loaded) == list(expected)
+    assert loaded["conv/卷积_1"] == expected["conv/卷积_1"]
+
+
+def test_roundtrip_file(tmp_path):
+    expected = json.loads(json.dumps(build_graph()))
+    filename = str(tmp_path / "graph.irb")
+    dump_binary_ir(build_graph(), filename)
+
+    with load_binary_ir(filename) as loaded:
+        assert loaded.to_dict() == expected
+        node = loaded["input_im_0"]
+    # the decoded nodes stay valid after the file is closed
+    assert node == expected["input_im_0"]
+    with pytest.raises(ValueError):
+        loaded["input_im_0"]
+
+
+@pytest.mark.parametrize("value", [2 ** 63, -2 ** 63 - 1, [1, 2 ** 64]])
+def test_int64_overflow(value):
+    graph = build_graph()
+    graph["input_im_0"]["attr"]["attr"]["value"] = value
+    with pytest.raises(OverflowError, match="int64"):
+        dumps_binary_ir(graph)
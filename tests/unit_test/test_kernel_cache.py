@@ -0,0 +1,97 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import time
+import numpy as np
+from nn_meter.builder import builder_config
+from nn_meter.builder.backend_meta.utils import Latency, dump_profiled_model, read_profiled_results
+from nn_meter.builder.kernel_cache import KernelCache, make_kernel_key
+from nn_meter.builder.nn_meter_builder import _read_kernel_cache
+
+CONFIG = {"HW": 28, "CIN": 16, "COUT": 32, "KERNEL_SIZE": 3, "STRIDES": 1}
+IDENTITY = {"backend": "TFLiteCPUBackend", "device": "test-device", "num_runs": 50}
+
+
+def test_hit_and_miss(tmp_path):
+    cache = KernelCache(str(tmp_path))
+    key = KernelCache.make_key("conv-bn-relu", CONFIG, "tensorflow", 1, IDENTITY)
+    assert cache.get(key) is None
+
+    cache.put(key, {"shapes": [[28, 28, 16]], "latency": "1.0 +- 0.1"})
+    assert cache.get(key)["latency"] == "1.0 +- 0.1"
+
+    # numpy values in the config give the same key
+    numpy_config = {name: np.int64(value) for name, value in CONFIG.items()}
+    assert KernelCache.make_key("conv-bn-relu", numpy_config, "tensorflow", 1, IDENTITY) == key
+
+    # any difference of the kernel, the device or the profiling arguments misses
+    for other_key in [
+        KernelCache.make_key("dwconv-bn-relu", CONFIG, "tensorflow", 1, IDENTITY),
+        KernelCache.make_key("conv-bn-relu", dict(CONFIG, CIN=32), "tensorflow", 1, IDENTITY),
+        KernelCache.make_key("conv-bn-relu", CONFIG, "torch", 1, IDENTITY),
+        KernelCache.make_key("conv-bn-relu", CONFIG, "tensorflow", 1, dict(IDENTITY, device="other-device")),
+        KernelCache.make_key("conv-bn-relu", CONFIG, "tensorflow", 1, IDENTITY, {"adaptive": True}),
+    ]:
+        assert other_key != key
+        assert cache.get(other_key) is None
+
+
+def test_expiry(tmp_path, monkeypatch):
+    key = KernelCache.make_key("conv-bn-relu", CONFIG, "tensorflow", 1, IDENTITY)
+    KernelCache(str(tmp_path)).put(key, {"latency": "1.0 +- 0.1"})
+    assert KernelCache(str(tmp_path), expire_days=1).get(key) is not None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2 * 86400)
+    assert KernelCache(str(tmp_path), expire_days=1).get(key) is None
+    assert KernelCache(str(tmp_path)).get(key) is not None
+
+    assert KernelCache(str(tmp_path)).clear(older_than_days=1) == 1
+    assert KernelCache(str(tmp_path)).get(key) is None
+
+
+class FakeBackend:
+    def identity(self):
+        return IDENTITY
+
+
+def test_generator_and_profiler_keys(tmp_path, monkeypatch):
+    monkeypatch.setattr(builder_config, "get", lambda name, module = '': {"IMPLEMENT": "tensorflow", "BATCH_SIZE": 1}.get(name))
+    cache = KernelCache(str(tmp_path))
+    profile_kwargs = {"adaptive": True, "target_error": 0.01}
+
+    # the kernel saved by profile_models is found by the key of the kernel generator with the same profiling arguments
+    models = {"conv-bn-relu": {"0": {"config": CONFIG}}}
+    cache_kernel = _read_kernel_cache(cache, models, [FakeBackend()], profile_kwargs)
+    assert "cached" not in models["conv-bn-relu"]["0"]
+    cache_kernel(0, "conv-bn-relu", {"config": CONFIG, "shapes": [[28, 28, 16]], "latency": Latency(1.0, 0.1, 40)})
+
+    assert cache.get(make_kernel_key("conv-bn-relu", CONFIG, IDENTITY, profile_kwargs)) is not None
+    assert cache.get(make_kernel_key("conv-bn-relu", CONFIG, IDENTITY)) is None
+
+    models = {"conv-bn-relu": {"0": {"config": CONFIG}}}
+    _read_kernel_cache(cache, models, [FakeBackend()], profile_kwargs)
+    assert models["conv-bn-relu"]["0"]["cached"]
+    assert models["conv-bn-relu"]["0"]["latency"].avg == 1.0
+    assert models["conv-bn-relu"]["0"]["latency"].runs == 40
+
+
+def test_skip_throttled(tmp_path, monkeypatch):
+    monkeypatch.setattr(builder_config, "get", lambda name, module = '': {"IMPLEMENT": "tensorflow", "BATCH_SIZE": 1}.get(name))
+    cache = KernelCache(str(tmp_path))
+    cache_kernel = _read_kernel_cache(cache, {}, [FakeBackend()], None)
+    cache_kernel(0, "conv-bn-relu", {"config": CONFIG, "latency": Latency(2.0, 0.1), "throttled": True})
+    assert cache.get(make_kernel_key("conv-bn-relu", CONFIG, IDENTITY)) is None
+
+    models = {"conv-bn-relu": {"0": {"config": CONFIG}}}
+    _read_kernel_cache(cache, models, [FakeBackend()], None)
+    assert "cached" not in models["conv-bn-relu"]["0"]
+
+
+def test_dump_runs():
+    # the number of runs is saved in its own field, and the latency string keeps its format
+    dumped = dump_profiled_model({"config": CONFIG, "latency": Latency(1.0, 0.1, 40)})
+    assert dumped == {"latency": "1.0 +- 0.1", "runs": 40}
+    assert dump_profiled_model({"latency": Latency(1.0, 0.1)}) == {"latency": "1.0 +- 0.1"}
+
+    latency = read_profiled_results({"conv-bn-relu": {"0": dumped}})["conv-bn-relu"]["0"]["latency"]
+    assert (latency.avg, latency.std, latency.runs) == (1.0, 0.1, 40)
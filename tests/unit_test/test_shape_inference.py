@@ -0,0 +1,38 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+from nn_meter.utils.graph_tool import ModelGraph
+from nn_meter.ir_converter.frozenpb_converter.shape_inference import ShapeInference
+
+
+class FakeFetcher:
+    """ a dynamic fetcher returning fixed shapes, and recording the nodes it is asked for
+    """
+    def __init__(self):
+        self.names = []
+
+    def get_shape_by_name(self, name):
+        self.names.append(name)
+        return [[1, 8, 8, 3]], [[1, 8, 8, 3]]
+
+
+def test_failed_handler_falls_back(monkeypatch):
+    def broken_handler(graph, node):
+        raise KeyError("shape")
+
+    monkeypatch.setitem(ShapeInference._handlers, "StridedSlice", broken_handler)
+    model_graph = ModelGraph()
+    model_graph.node("input", [])
+    model_graph.set_node_attr("input", {"name": "input", "type": "Placeholder", "attr": {"shape": [1, 8, 8, 3]}})
+    model_graph.node("slice", ["input"])
+    model_graph.set_node_attr("slice", {"name": "slice", "type": "StridedSlice", "attr": {}})
+    model_graph.refresh()
+
+    fetcher = FakeFetcher()
+    ShapeInference(model_graph, fetcher)
+
+    # the exception of the static handler is not raised, the node gets the shapes of the dynamic fetcher in pass #1 and keeps
+    # them in pass #2
+    graph = model_graph.get_graph()
+    assert fetcher.names == ["slice"]
+    assert graph["slice"]["attr"]["output_shape"] == ((1, 8, 8, 3),)
+    assert graph["input"]["attr"]["output_shape"] == ((1, 8, 8, 3),)
@@ -0,0 +1,30 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+import sys
+import json
+import subprocess
+from nn_meter.builder.backend_meta.fusion_rule_tester.utils import SingleOpModelCache
+
+
+def test_reclaim_dead_marker(tmp_path, monkeypatch):
+    # a worker died while generating the model, leaving its in-progress marker in the shared dict
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    key = json.dumps(["conv", [28, 28, 16], {"COUT": 32}, "tensorflow"], sort_keys=True, default=str)
+    shared = {key: f"generating by {dead.pid}"}
+
+    generated = []
+    def generate(self, key, op, input_shape, config, implement):
+        generated.append(key)
+        return {"model": str(tmp_path / "SingleOp_conv"), "shapes": [list(input_shape)]}
+    monkeypatch.setattr(SingleOpModelCache, "_generate", generate)
+
+    cache = SingleOpModelCache(str(tmp_path), shared, poll_interval=0.01)
+    model = cache.get("conv", [28, 28, 16], {"COUT": 32}, "tensorflow")
+
+    # the waiting process takes over the model instead of polling forever
+    assert model == {"model": str(tmp_path / "SingleOp_conv"), "shapes": [[28, 28, 16]]}
+    assert generated == [key]
+    assert shared[key] == model
+    # the reclaim token is not counted as a model
+    assert len(cache) == 1
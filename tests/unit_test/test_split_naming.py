@@ -0,0 +1,121 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+# Regression test for `FrozenPbParser.fix_split_naming` on a ShuffleNet-style graph with many splits. The output ports are
+# indexed once for the whole graph, instead of scanning the graph for each split node.
+from nn_meter.utils.graph_tool import ModelGraph
+from nn_meter.ir_converter.frozenpb_converter.frozenpb_parser import FrozenPbParser
+
+
+def build_split_graph(num_splits):
+    """ build a parsed graph with `num_splits` chained Split nodes, each of which has two outputs
+    """
+    model_graph = ModelGraph()
+    inputs_seen = []
+
+    def add_node(name, op, inputs):
+        model_graph.node(name, inputs)
+        inputs_seen.extend(inputs)
+        model_graph.set_node_attr(name, {"name": name, "type": op, "output_shape": [], "attr": {}})
+
+    add_node("input", "Placeholder", [])
+    last = "input"
+    for i in range(num_splits):
+        split = f"stage{i}/split"
+        add_node(split, "Split", [last])
+        add_node(f"stage{i}/branch0/Relu", "Relu", [split])
+        add_node(f"stage{i}/branch1/Relu", "Relu", [f"{split}:1"])
+        add_node(f"stage{i}/concat", "ConcatV2", [f"stage{i}/branch0/Relu", f"stage{i}/branch1/Relu"])
+        last = f"stage{i}/concat"
+    return model_graph, FrozenPbParser.index_output_ports(inputs_seen)
+
+
+def count_calls(monkeypatch, cls, name):
+    """ wrap the static method `cls.name` to count its calls
+    """
+    calls = []
+    func = getattr(cls, name)
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return func(*args, **kwargs)
+    monkeypatch.setattr(cls, name, staticmethod(wrapper))
+    return calls
+
+
+def check_renaming(model_graph, num_splits):
+    graph = model_graph.get_graph()
+    assert not any(":" in name for name in graph)
+    for i in range(num_splits):
+        assert sorted(graph[f"stage{i}/split"]["outbounds"]) == [f"stage{i}/branch0/Relu", f"stage{i}/branch1/Relu"]
+        assert graph[f"stage{i}/branch1/Relu"]["inbounds"] == [f"stage{i}/split"]
+        assert graph[f"stage{i}/concat"]["inbounds"] == [f"stage{i}/branch0/Relu", f"stage{i}/branch1/Relu"]
+
+
+def test_fix_split_naming(monkeypatch):
+    num_splits = 200
+    for use_index in [True, False]:
+        model_graph, output_ports = build_split_graph(num_splits)
+        index_calls = count_calls(monkeypatch, FrozenPbParser, "index_output_ports")
+        refresh_calls = []
+        refresh = model_graph.refresh
+        monkeypatch.setattr(model_graph, "refresh", lambda: refresh_calls.append(1) or refresh())
+
+        FrozenPbParser.fix_split_naming(model_graph, output_ports if use_index else None)
+
+        check_renaming(model_graph, num_splits)
+        # the index from parsing is reused, otherwise it is built once from the graph
+        assert len(index_calls) == (0 if use_index else 1)
+        assert len(refresh_calls) == 1
+
+
+class CountingDict(dict):
+    """ a graph dict counting the lookups of its nodes
+    """
+    lookups = 0
+
+    def __getitem__(self, key):
+        self.lookups += 1
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.lookups += 1
+        return super().__contains__(key)
+
+
+def test_linear_lookups(monkeypatch):
+    # the lookups of graph nodes grow linearly with the number of split nodes, instead of scanning the graph for each split
+    lookups = []
+    for num_splits in [100, 200, 400, 800]:
+        model_graph, _ = build_split_graph(num_splits)
+        model_graph.graph = CountingDict(model_graph.graph)
+        monkeypatch.setattr(model_graph, "refresh", lambda: None)
+        FrozenPbParser.fix_split_naming(model_graph)
+        lookups.append(model_graph.graph.lookups)
+    steps = [b - a for a, b in zip(lookups, lookups[1:])]
+    assert steps == [steps[0], 2 * steps[0], 4 * steps[0]]
+
+
+def test_shared_port():
+    # a port consumed by several nodes connects the split node to all of them
+    model_graph = ModelGraph()
+    for name, op, inputs in [
+        ("input", "Placeholder", []),
+        ("split", "Split", ["input"]),
+        ("branch0/Relu", "Relu", ["split"]),
+        ("branch1/Relu", "Relu", ["split:1"]),
+        ("branch2/Relu", "Relu", ["split:1"]),
+    ]:
+        model_graph.node(name, inputs)
+        model_graph.set_node_attr(name, {"name": name, "type": op, "output_shape": [], "attr": {}})
+
+    FrozenPbParser.fix_split_naming(model_graph)
+
+    graph = model_graph.get_graph()
+    assert "split:1" not in graph
+    assert sorted(graph["split"]["outbounds"]) == ["branch0/Relu", "branch1/Relu", "branch2/Relu"]
+    assert graph["branch1/Relu"]["inbounds"] == ["split"]
+    assert graph["branch2/Relu"]["inbounds"] == ["split"]
@@ -0,0 +1,83 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+# Instantiating a symbolic IR graph for a new input shape should give the shapes of the model converted with that shape.
+import logging
+from nn_meter.ir_converter import make_symbolic_graph, instantiate
+
+
+def node(op, input_shape, output_shape, inbounds, outbounds, **attr):
+    return {
+        "attr": {"name": op, "type": op, "input_shape": input_shape, "output_shape": output_shape, "attr": attr},
+        "inbounds": inbounds,
+        "outbounds": outbounds,
+    }
+
+
+def build_graph(n, h, w):
+    """ build the nn-Meter IR graph of a small onnx-style model converted with the NCHW input shape (n, 3, h, w)
+    """
+    h1, w1 = (h - 1) // 2 + 1, (w - 1) // 2 + 1
+    h2, w2 = (h1 - 1) // 2 + 1, (w1 - 1) // 2 + 1
+    return {
+        "conv": node("Conv", [[n, h, w, 3]], [[n, h1, w1, 32]], [], ["relu"],
+                     kernel_shape=[3, 3], strides=[2, 2], pads=[1, 1, 1, 1], dilations=[1, 1], group=1),
+        "relu": node("Relu", [[n, h1, w1, 32]], [[n, h1, w1, 32]], ["conv"], ["pool", "conv_1x1"]),
+        "pool": node("MaxPool", [[n, h1, w1, 32]], [[n, h2, w2, 32]], ["relu"], ["concat"],
+                     kernel_shape=[3, 3], strides=[2, 2], pads=[1, 1, 1, 1]),
+        "conv_1x1": node("Conv", [[n, h1, w1, 32]], [[n, h2, w2, 16]], ["relu"], ["concat"],
+                         kernel_shape=[1, 1], strides=[2, 2], pads=[0, 0, 0, 0]),
+        "concat": node("Concat", [[n, h2, w2, 32], [n, h2, w2, 16]], [[n, h2, w2, 48]], ["pool", "conv_1x1"], ["gap"], axis=1),
+        "gap": node("GlobalAveragePool", [[n, h2, w2, 48]], [[n, 1, 1, 48]], ["concat"], ["flatten"]),
+        "flatten": node("Flatten", [[n, 1, 1, 48]], [[n, 48]], ["gap"], ["fc"]),
+        "fc": node("Gemm", [[n, 48]], [[n, 1000]], ["flatten"], []),
+    }
+
+
+def build_tf_graph(n, h, w):
+    """ build the nn-Meter IR graph of a small tensorflow-style model converted with the NHWC input shape (n, h, w, 3), where
+    a weight node without inbound nodes comes before the input placeholder
+    """
+    h1, w1 = (h + 1) // 2, (w + 1) // 2
+    h2, w2 = (h1 - 3) // 2 + 1, (w1 - 3) // 2 + 1
+    return {
+        "conv/weights": node("Const", [], [[3, 3, 3, 16]], [], ["conv"]),
+        "input": node("Placeholder", [], [[n, h, w, 3]], [], ["conv"]),
+        "conv": node("Conv2D", [[n, h, w, 3]], [[n, h1, w1, 16]], ["input", "conv/weights"], ["pool"],
+                     strides=[1, 2, 2, 1], padding="SAME", dilations=[1, 1, 1, 1]),
+        "pool": node("MaxPool", [[n, h1, w1, 16]], [[n, h2, w2, 16]], ["conv"], [],
+                     ksize=[1, 3, 3, 1], strides=[1, 2, 2, 1], padding="VALID"),
+    }
+
+
+def test_instantiate():
+    graph = make_symbolic_graph(build_graph(1, 224, 224), (1, 3, 224, 224), input_layout="NCHW")
+    for n, h, w in [(1, 224, 224), (1, 160, 160), (4, 193, 127)]:
+        assert instantiate(graph, (n, 3, h, w)) == build_graph(n, h, w)
+
+
+def test_instantiate_tf():
+    # the input shape is found from the placeholder instead of the weight node
+    graph = make_symbolic_graph(build_tf_graph(1, 224, 224))
+    assert graph.input_shape == (1, 224, 224, 3)
+    assert graph.constant_spatial_nodes == []
+    for n, h, w in [(1, 224, 224), (2, 161, 97)]:
+        assert instantiate(graph, (n, h, w, 3)) == build_tf_graph(n, h, w)
+
+
+def test_constant_spatial_dims(caplog):
+    # the pool misses its attributes, thus its output shape can not be derived from the input dims
+    converted = build_tf_graph(1, 224, 224)
+    converted["pool"]["attr"]["attr"] = {}
+    with caplog.at_level(logging.WARNING, logger="nn-Meter"):
+        graph = make_symbolic_graph(converted)
+    assert graph.constant_spatial_nodes == ["pool"]
+    assert "pool" in caplog.text
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="nn-Meter"):
+        instantiated = instantiate(graph, (1, 160, 160, 3))
+    assert "pool" in caplog.text
+    assert instantiated["conv"]["attr"]["output_shape"] == [[1, 80, 80, 16]]
+    assert instantiated["pool"]["attr"]["output_shape"] == [[1, 55, 55, 16]]
+